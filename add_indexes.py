@@ -1,8 +1,8 @@
 # add_indexes.py
-import sqlite3
+from db import connect
 
 # Connect to your DB
-conn = sqlite3.connect("data/ngx_equities.db")
+conn = connect("data/ngx_equities.db")
 cursor = conn.cursor()
 
 # Create indexes if they don't exist
@@ -1,11 +1,16 @@
 # analyser.py
-import sqlite3
+from db import connect
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import smtplib
 import os
 from dotenv import load_dotenv
 from collections import Counter
+from price_store import load_equities
+from equity_features import FEATURE_COLUMNS, update_features, load_features
+from scoring import format_reason_text, score_signals, decode_reasons, signal_tier
+from signals_grid import refresh_row_category
 
 # === CONFIG ===
 DB_PATH = "data/ngx_equities.db"
@@ -16,9 +21,8 @@ DB_PATH = "data/ngx_equities.db"
 #  exit()
 
 # === LOAD DATA ===
-conn = sqlite3.connect(DB_PATH)
-df = pd.read_sql("SELECT * FROM equities", conn)
-df["date"] = pd.to_datetime(df["date"])
+conn = connect(DB_PATH)
+df = load_equities(DB_PATH)
 df = df.sort_values(by=["name", "date"])
 
 df["previous_close"] = df.groupby("name")["close"].shift(1)
@@ -28,6 +32,15 @@ df["change"] = ((df["close"] - df["previous_close"]) / df["previous_close"]) * 1
 df["change"] = df["change"].round(2)
 change_pct = ((df["close"] - df["previous_close"]) / df["previous_close"]) * 100
 
+# === ROLLING FEATURES ===
+# Only newly scraped dates are computed; see equity_features.py
+update_features(conn)
+features = load_features(conn).drop(columns=["previous_close"])
+df = df.drop(
+    columns=[c for c in FEATURE_COLUMNS if c in df.columns and c != "previous_close"]
+)
+df = df.merge(features, on=["name", "date"], how="left")
+
 
 # === MARKET SUMMARY ===
 latest_day = df["date"].max()
@@ -66,407 +79,190 @@ except Exception as e:
     print("⚠️ Could not load memory from DB:", e)
 
 
-def format_reason_text(reasons, row):
-    expl = []
-
-    if any("Limit-Up" in r for r in reasons):
-        days = row.get("limit_up_streak", 1)
-        expl.append(
-            f"The stock has hit its daily 10% limit for {int(days)} consecutive day(s)."
-        )
-
-    if "Volume Clustering" in reasons:
-        expl.append("Repeated volume spikes detected — institutional loading likely.")
-
-    if "Volume Spike" in reasons or "Moon Volume" in reasons:
-        expl.append("Today's volume surged above normal levels.")
-
-    if "Low Trade Count" in reasons:
-        expl.append("Few trades despite volume — signs of big buyers entering quietly.")
-
-    if "High Trade Count" in reasons:
-        expl.append("Many trades with low value — likely retail-driven action.")
-
-    if "Breakout Above Recent Range" in reasons:
-        expl.append(
-            "Price broke above recent 5-day high — potential breakout underway."
-        )
-
-    if "Higher High & Higher Low" in reasons:
-        expl.append("Uptrend confirmed — forming stronger highs and lows.")
-
-    if "Gap Up with Volume" in reasons:
-        expl.append("Opened significantly higher with strong volume.")
-
-    if "Weak Candle" in reasons and "Volume Spike" in reasons:
-        expl.append("Big volume but small price move — accumulation in progress.")
-
-    if "Price Up" in reasons and "Volume Spike" in reasons:
-        expl.append("Strong bullish move with high demand.")
-
-    if "Price Down" in reasons:
-        expl.append("Price declined — caution or exit may be needed.")
-
-    if "15-Day Volume Uptrend" in reasons:
-        expl.append("Sustained 15-day volume uptrend. Strong interest building.")
-
-    if "10 of 30 Days Institutional Pattern" in reasons:
-        expl.append(
-            "Institutional accumulation footprint seen 10+ times in last 30 days."
-        )
-
-    if "Stealth Accumulation (Volume Up, Price Flat)" in reasons:
-        expl.append(
-            "Volume rising steadily, but price stayed flat — signs of smart entry."
-        )
-
-    if "volume_uptrend" in row and row["volume_uptrend"]:
-        expl.append("15-day volume uptrend in progress.")
-
-    if "inst_accum_30" in row and row["inst_accum_30"] >= 10:
-        expl.append("Institutional footprint over 30 days.")
-
-    if "stealth_accum" in row and row["stealth_accum"]:
-        expl.append("Stealth accumulation detected.")
-
-    if "Previously detected setup now showing stronger behavior." in reasons:
-        expl.append(
-            "This stock was previously flagged. Now showing stronger momentum — time to scale in."
-        )
-
-    if "Full institutional move confirmed." in reasons:
-        expl.append("Full bullish confirmation. Strong buy signal.")
-
-    if "Repeated weak signals — likely noise." in reasons:
-        expl.append(
-            "Several weak alerts without follow-through. Likely false positive."
-        )
-
-    if not expl:
-        return ", ".join(reasons)  # fallback
-
-    return " ".join(expl)
-
-
-def smart_score(row):
-    score = 0
-    reasons = []
-    signal = None
-    action = None
-
-    # === Price action ===
-    if row["close"] > row["open"]:
-        score += 20
-        reasons.append("Price Up")
-    elif row["close"] < row["open"]:
-        score -= 10
-        reasons.append("Price Down")
-
-    # === Volume vs average ===
-    if row["volume"] > 1.5 * row["volume_5_avg"]:
-        score += 30
-        reasons.append("Volume Spike")
-    elif row["volume"] < 0.5 * row["volume_5_avg"]:
-        score -= 10
-
-    # === Trade count vs average ===
-    if row["trades"] < row["avg_trades_5"]:
-        score += 30
-        reasons.append("Low Trade Count")
-    elif row["trades"] > 2 * row["avg_trades_5"]:
-        score -= 10
-        reasons.append("High Trade Count")
-
-    # === Money flow value ===
-    if row["value"] > 50_000_000:
-        score += 20
-    elif row["value"] < 10_000_000:
-        score -= 10
-
-    # === Candle shape ===
-    body = abs(row["close"] - row["open"])
-    range_ = row["high"] - row["low"] + 1e-6
-    body_strength = body / range_
-    if body_strength > 0.6:
-        score += 10
-        reasons.append("Strong Candle")
-    elif body_strength < 0.3:
-        score -= 5
-        reasons.append("Weak Candle")
-
-    # === Combo behavior ===
-    if (
-        "Price Up" in reasons
-        and "Low Trade Count" in reasons
-        and "Volume Spike" in reasons
-    ):
-        reasons.append("Stealth Accumulation")
-        score += 20
-        signal = "Institutional Accumulation"
-        action = "BUY"
-    elif "Weak Candle" in reasons and "Volume Spike" in reasons:
-        reasons.append("Accumulation Under Cover")
-        score += 15
-    elif "Volume Spike" in reasons and "High Trade Count" in reasons:
-        reasons.append("Retail Buying Frenzy")
-        score += 10
-        signal = "Retail Buying Frenzy"
-        action = "AVOID"
-
-    # === 🧠 Memory-Based Signal Progression Logic ===
-    memory = row.get("memory", [])
-    recent_signals = memory[-3:] if memory else []
-
-    # 1️⃣ Progressing setup → BUY
-    if "⚠️ Setup Detected" in recent_signals and signal == "👀 Watchlist Setup":
-        signal = "📈 Progressing Setup"
-        action = "BUY SMALL"
-        reasons.append("Previously detected setup is strengthening — time to scale in.")
-
-    if (
-        "📈 Progressing Setup" in recent_signals
-        and signal == "Institutional Accumulation"
-    ):
-        signal = "💥 Institution Moon Alert"
-        action = "BUY CONFIRMED"
-        reasons.append("Full institutional move confirmed.")
-
-    # 3️⃣ Avoid Decaying Setup
-    if (
-        signal in ["👀 Watchlist Setup", "⚠️ Setup Detected"]
-        and "👀 Watchlist Setup" in recent_signals
-        and "⚠️ Setup Detected" in recent_signals
-    ):
-        score -= 20
-        reasons.append("Repeated weak signals — likely noise.")
-        action = "AVOID"
-
-    # 4️⃣ Handle potential retest at key level (if signal re-emerges with better volume)
-    if signal == "Institutional Accumulation" and "BUY" not in str(action):
-        if (
-            "⚠️ Setup Detected" in recent_signals
-            or "👀 Watchlist Setup" in recent_signals
-        ):
-            reasons.append("Signal re-emerging — possible retest.")
-            score += 10
-            action = "BUY SMALL"
-
-    # === Signal tier fallback ===
-    if not signal:
-        if score >= 75:
-            signal = "Institutional Accumulation"
-            action = "BUY"
-        elif score >= 60:
-            signal = "⚠️ Setup Detected"
-            action = "WATCH"
-        elif score >= 40:
-            signal = "👀 Watchlist Setup"
-            action = "WATCH"
-
-    return score, reasons, signal, action
-
-
 # === SIGNALS LOGIC ===
 signals = []
 
-for name, group in df.groupby("name"):
-    group = group.sort_values("date").copy()
-
-    # ✅ Determine lookback window based on data length
-    lookback = 5 if len(group) >= 5 else 3
-
-    # === 🔁 Load Memory From DB
-    memory_cursor = conn.cursor()
-    memory_cursor.execute(
-        "CREATE TABLE IF NOT EXISTS signal_memory (name TEXT, last_signal TEXT, last_action TEXT, last_close REAL, last_high5 REAL, date TEXT)"
-    )
-    memory_cursor.execute(
-        "SELECT last_signal, last_action, last_close, last_high5 FROM signal_memory WHERE name = ?",
-        (name,),
+# === 🔁 Load Memory From DB
+memory_cursor = conn.cursor()
+memory_cursor.execute(
+    "CREATE TABLE IF NOT EXISTS signal_memory (name TEXT, last_signal TEXT, last_action TEXT, last_close REAL, last_high5 REAL, date TEXT)"
+)
+# First stored row per stock, as the old per-stock fetchone() returned
+stored_memory = {
+    name: (last_signal, last_action, last_close, last_high5)
+    for name, last_signal, last_action, last_close, last_high5 in memory_cursor.execute(
+        """
+        SELECT name, last_signal, last_action, last_close, last_high5
+        FROM signal_memory
+        WHERE rowid IN (SELECT MIN(rowid) FROM signal_memory GROUP BY name)
+        """
     )
-    memory_row = memory_cursor.fetchone()
-
-    last_signal, last_action, last_close, last_high5 = (
-        memory_row if memory_row else (None, None, None, None)
+}
+
+# === Score every (stock, day) in one pass (see scoring.py)
+scored = df[df["volume_5_avg"].notna()].sort_values(by=["name", "date"])
+scored = scored.reset_index(drop=True)
+remembered = [stored_memory.get(n, (None, None, None, None)) for n in scored["name"]]
+result = score_signals(
+    scored,
+    memory=signal_memory,
+    last_close=[m[2] for m in remembered],
+    last_action=[m[1] for m in remembered],
+)
+memory_updates = []
+
+# === Only rows that raised a signal need reason text
+for i in np.flatnonzero(result["signal"] != None):  # noqa: E711
+    row = scored.iloc[i]
+    signal = result["signal"][i]
+    action = result["action"][i]
+    score = int(result["score"][i])
+    streak = int(result["limit_up_streak"][i])
+    reasons = decode_reasons(result["reasons"][i], streak)
+
+    low_price = min(row["open"], row["close"])
+    high_price = max(row["open"], row["close"])
+    buy_range = (
+        f"₦{low_price:.2f} – ₦{high_price:.2f}" if action and "BUY" in action else "—"
     )
 
-    group["memory"] = [signal_memory.get(name, [])] * len(group)
-
-    # === Rolling Calculations with dynamic lookback ===
-    group["volume_5_avg"] = group["volume"].rolling(lookback, min_periods=1).mean()
-    group["is_spike"] = group["volume"] > 1.5 * group["volume_5_avg"]
-    group["spike_count_5"] = group["is_spike"].rolling(lookback, min_periods=1).sum()
-
-    group["avg_trades_5"] = group["trades"].rolling(lookback, min_periods=1).mean()
-    group["price_5_high"] = group["high"].rolling(lookback, min_periods=1).max()
-    group["low_5"] = group["low"].rolling(lookback, min_periods=1).min()
-
-    # === 📈 Trend Features (Longer-Term View) ===
-    group["volume_15_avg"] = group["volume"].rolling(15, min_periods=5).mean()
-    group["volume_uptrend"] = group["volume_15_avg"] > group["volume_15_avg"].shift(5)
-
-    group["inst_footprint"] = (group["volume"] > group["volume_5_avg"]) & (
-        group["trades"] < group["avg_trades_5"]
+    signals.append(
+        {
+            "name": row["name"],
+            "date": row["date"].strftime("%Y-%m-%d"),
+            "signal": signal,
+            "confidence_score": score,
+            "volume": row["volume"],
+            "trades": row["trades"],
+            "value": row["value"],
+            "close": row["close"],
+            "change": row["change"],
+            "action": action,
+            "buy_range": buy_range,
+            "explanation": format_reason_text(reasons, row),
+            "limit_up_streak": streak,
+            "signal_tier": signal_tier(score),
+            "volume_uptrend": row.get("volume_uptrend", False),
+            "inst_accum_30": row.get("inst_accum_30", 0),
+            "stealth_accum": row.get("stealth_accum", False),
+        }
     )
-    group["inst_accum_30"] = group["inst_footprint"].rolling(30, min_periods=10).sum()
 
-    group["price_change_15"] = group["close"].pct_change(periods=15)
-    group["volume_change_15"] = group["volume"].pct_change(periods=15)
-    group["stealth_accum"] = (group["volume_change_15"] > 0.3) & (
-        group["price_change_15"] < 0.05
+    memory_updates.append(
+        (
+            row["name"],
+            signal,
+            action,
+            row["close"],
+            row.get("price_5_high", row["high"]),
+            row["date"].strftime("%Y-%m-%d"),
+        )
     )
 
-    # === Daily Comparisons ===
-    group["prev_high"] = group["high"].shift(1)
-    group["prev_low"] = group["low"].shift(1)
-
-    group["higher_high"] = group["high"] > group["prev_high"]
-    group["higher_low"] = group["low"] > group["prev_low"]
+memory_cursor.executemany(
+    """
+    INSERT OR REPLACE INTO signal_memory (name, last_signal, last_action, last_close, last_high5, date)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    memory_updates,
+)
 
-    group["gap_up"] = group["open"] > group["previous_close"] * 1.02
-    group["gap_down"] = group["open"] < group["previous_close"] * 0.98
+# === SAVE SIGNALS TO DB ===
+SIGNAL_COLUMNS = [
+    ("name", "TEXT"),
+    ("date", "TEXT"),
+    ("signal", "TEXT"),
+    ("confidence_score", "INTEGER"),
+    ("volume", "INTEGER"),
+    ("trades", "INTEGER"),
+    ("value", "REAL"),
+    ("close", "REAL"),
+    ("change", "REAL"),
+    ("action", "TEXT"),
+    ("buy_range", "TEXT"),
+    ("explanation", "TEXT"),
+    ("limit_up_streak", "INTEGER"),
+    ("signal_tier", "TEXT"),
+    ("volume_uptrend", "INTEGER"),
+    ("inst_accum_30", "REAL"),
+    ("stealth_accum", "INTEGER"),
+]
 
-    group["limit_up"] = (
-        (group["close"] - group["previous_close"]) / group["previous_close"]
-    ).round(4) >= 0.099
 
-    group["limit_up_streak"] = group["limit_up"].astype(int)
-    group["limit_up_streak"] = (
-        group["limit_up_streak"]
-        .groupby(
-            (group["limit_up_streak"] != group["limit_up_streak"].shift()).cumsum()
-        )
-        .cumsum()
+def ensure_signals_table(conn):
+    """Create signals with PRIMARY KEY(name, date), migrating an old table."""
+    existing = conn.execute("PRAGMA table_info(signals)").fetchall()
+    if not existing:
+        cols = ", ".join(f"{c} {t}" for c, t in SIGNAL_COLUMNS)
+        conn.execute(f"CREATE TABLE signals ({cols}, PRIMARY KEY(name, date))")
+        return
+    if any(pk for *_, pk in existing):
+        # Pick up columns added since the table was created
+        have = {col for _, col, *_ in existing}
+        for col, col_type in SIGNAL_COLUMNS:
+            if col not in have:
+                conn.execute(f"ALTER TABLE signals ADD COLUMN {col} {col_type}")
+        return
+
+    # Old heap table: keep every column it had, latest row per (name, date) wins
+    print("🛠 Migrating signals table to PRIMARY KEY(name, date)...")
+    columns = [(col, col_type or "") for _, col, col_type, *_ in existing]
+    have = {col for col, _ in columns}
+    columns += [(c, t) for c, t in SIGNAL_COLUMNS if c not in have]
+    old_cols = ", ".join(col for col, _ in columns if col in have)
+    conn.execute(
+        f"CREATE TABLE signals_new ({', '.join(f'{c} {t}' for c, t in columns)}, "
+        "PRIMARY KEY(name, date))"
     )
-    group.loc[~group["limit_up"], "limit_up_streak"] = 0
-
-    # === Process each row ===
-    for i in range(len(group)):
-        row = group.iloc[i]
-        if pd.isna(row["volume_5_avg"]):
-            continue
-
-        # ⬅️ Signal scoring logic begins
-        score, reasons, signal, action = smart_score(row)
-
-        # === 🔍 Trend Signal Boosters ===
-        if row.get("volume_uptrend", False):
-            score += 10
-            reasons.append("15-Day Volume Uptrend")
-
-        if row.get("inst_accum_30", 0) >= 10:
-            score += 15
-            reasons.append("10 of 30 Days Institutional Pattern")
-
-        if row.get("stealth_accum", False):
-            score += 20
-            reasons.append("Stealth Accumulation (Volume Up, Price Flat)")
-
-        streak = int(row.get("limit_up_streak", 0))
-
-        # === Override for Limit-Up
-        if streak >= 1:
-            score += 40
-            reasons.append(f"Limit-Up Streak: {streak} day(s)")
-            if streak == 1:
-                signal = "🚨 Limit-Up Watch"
-                action = "WATCH"
-            elif streak == 2:
-                signal = "💡 Limit-Up Accumulation"
-                action = "BUY SMALL"
-            elif streak >= 3:
-                signal = "🚀 Limit-Up Breakout"
-                action = "BUY CONFIRMED"
-
-        # === NEW: Retest Memory Logic
-        if last_close and abs(row["close"] - last_close) <= 0.02 * last_close:
-            score += 5
-            reasons.append("Retesting key level")
-
-        if last_action == "BUY" and signal == "WATCH":
-            reasons.append("Signal weakening")
-            signal = "EXIT"
-            action = "EXIT"
-
-        # === Final check before saving
-        if signal:
-            low_price = min(row["open"], row["close"])
-            high_price = max(row["open"], row["close"])
-            buy_range = (
-                f"₦{low_price:.2f} – ₦{high_price:.2f}"
-                if action and "BUY" in action
-                else "—"
-            )
-
-            signals.append(
-                {
-                    "name": row["name"],
-                    "date": row["date"].strftime("%Y-%m-%d"),
-                    "signal": signal,
-                    "confidence_score": score,
-                    "volume": row["volume"],
-                    "trades": row["trades"],
-                    "value": row["value"],
-                    "close": row["close"],
-                    "change": row["change"],
-                    "action": action,
-                    "buy_range": buy_range,
-                    "explanation": format_reason_text(reasons, row),
-                    "limit_up_streak": streak,
-                    "signal_tier": (
-                        "confirmed"
-                        if score >= 75
-                        else (
-                            "setup"
-                            if score >= 60
-                            else "watchlist" if score >= 40 else "none"
-                        )
-                    ),
-                    "volume_uptrend": row.get("volume_uptrend", False),
-                    "inst_accum_30": row.get("inst_accum_30", 0),
-                    "stealth_accum": row.get("stealth_accum", False),
-                }
-            )
-
-            memory_cursor.execute(
-                """
-                INSERT OR REPLACE INTO signal_memory (name, last_signal, last_action, last_close, last_high5, date)
-                VALUES (?, ?, ?, ?, ?, ?)
+    conn.execute(
+        f"INSERT OR REPLACE INTO signals_new ({old_cols}) "
+        f"SELECT {old_cols} FROM signals WHERE name IS NOT NULL AND date IS NOT NULL "
+        "ORDER BY rowid"
+    )
+    conn.execute("DROP TABLE signals")
+    conn.execute("ALTER TABLE signals_new RENAME TO signals")
+
+
+signals_df = pd.DataFrame(signals)
+save_started = datetime.now()
+saved_rows = 0
+
+if not signals_df.empty:
+    # Drop open if exists
+    signals_df.drop(columns=["open"], inplace=True, errors="ignore")
+
+    # Format date column
+    signals_df["date"] = pd.to_datetime(signals_df["date"]).dt.strftime("%Y-%m-%d")
+
+    cols = [c for c, _ in SIGNAL_COLUMNS if c in signals_df.columns]
+    updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c not in ("name", "date"))
+    rows = signals_df[cols].astype(object).where(signals_df[cols].notna(), None)
+    rows = [
+        tuple(v.item() if isinstance(v, np.generic) else v for v in row)
+        for row in rows.itertuples(index=False, name=None)
+    ]
+
+    # One transaction: the table never shows a half-written run
+    with conn:
+        ensure_signals_table(conn)
+        conn.executemany(
+            f"""
+            INSERT INTO signals ({", ".join(cols)})
+            VALUES ({", ".join("?" for _ in cols)})
+            ON CONFLICT(name, date) DO UPDATE SET {updates}
             """,
-                (
-                    row["name"],
-                    signal,
-                    action,
-                    row["close"],
-                    row.get("price_5_high", row["high"]),
-                    row["date"].strftime("%Y-%m-%d"),
-                ),
-            )
-
-    # === SAVE SIGNALS TO DB ===
-    signals_df = pd.DataFrame(signals)
-
-    if not signals_df.empty:
-        # Drop open if exists
-        signals_df.drop(columns=["open"], inplace=True, errors="ignore")
-
-        # Format date column
-        signals_df["date"] = pd.to_datetime(signals_df["date"]).dt.strftime("%Y-%m-%d")
-
-        # Delete only existing rows with the same name + date
-        for _, row in signals_df.iterrows():
-            conn.execute(
-                "DELETE FROM signals WHERE name = ? AND date = ?",
-                (row["name"], row["date"]),
-            )
-
-        # Insert the new clean rows
-        signals_df.to_sql("signals", conn, if_exists="append", index=False)
+            rows,
+        )
+        # Dashboard highlight category for new/changed rows
+        refresh_row_category(conn)
+    saved_rows = len(rows)
 
-        print(f"✅ {len(signals_df)} signals stored in 'signals' table.")
-        print(signals_df.head(3))
-    else:
-        print("⚠️ No signals found (need more days of data).")
+    print(f"✅ {saved_rows} signals stored in 'signals' table.")
+    print(signals_df.head(3))
+else:
+    conn.commit()
+    print("⚠️ No signals found (need more days of data).")
+save_elapsed = (datetime.now() - save_started).total_seconds()
 
 
 conn.close()
@@ -475,17 +271,17 @@ conn.close()
 try:
     with open("analyser_log.txt", "a") as f:
         f.write(
-            f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Ran analyser.py - {len(signals_df)} signal(s)\n"
+            f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Ran analyser.py - {len(signals_df)} signal(s)"
+            f" - upserted {saved_rows} row(s) in {save_elapsed:.2f}s\n"
         )
 except Exception as e:
     print(f"⚠️ Could not write to log file: {e}")
 
 
 def save_daily_summary(summary_text, action_notes):
-    import sqlite3
     from datetime import datetime
 
-    conn = sqlite3.connect("data/ngx_equities.db")
+    conn = connect("data/ngx_equities.db")
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -1,13 +1,65 @@
-def run_analyzer_on_dataframe(df, db_path, skip_summary=False):
-    from analyser import smart_score, format_reason_text
-    import sqlite3
-    import pandas as pd
+from db import connect
+
+
+class SignalMemoryCache:
+    """signal_memory held in a dict keyed by name.
+
+    Loaded with one query, read and updated in memory while scoring, and
+    written back with one executemany. Pass the same cache to successive
+    run_analyzer_on_dataframe() calls to keep it alive across days.
+    """
+
+    COLUMNS = ["name", "last_signal", "last_action", "last_close", "last_high5", "date"]
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+        self.dirty = set()
+
+    @classmethod
+    def load(cls, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS signal_memory (name TEXT, last_signal TEXT, last_action TEXT, last_close REAL, last_high5 REAL, date TEXT)"
+        )
+        entries = {}
+        # Later dates overwrite earlier ones: same answer as ORDER BY date DESC LIMIT 1
+        for values in conn.execute(
+            f"SELECT {', '.join(cls.COLUMNS)} FROM signal_memory ORDER BY date, rowid"
+        ):
+            entries[values[0]] = dict(zip(cls.COLUMNS, values))
+        return cls(entries)
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def update(self, name, last_signal, last_action, last_close, last_high5, date):
+        current = self.entries.get(name)
+        if current is not None and current["date"] is not None and current["date"] > date:
+            return
+        self.entries[name] = dict(
+            zip(self.COLUMNS, (name, last_signal, last_action, last_close, last_high5, date))
+        )
+        self.dirty.add(name)
+
+    def flush(self, conn):
+        if not self.dirty:
+            return 0
+        rows = [
+            tuple(self.entries[name][col] for col in self.COLUMNS)
+            for name in sorted(self.dirty)
+        ]
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO signal_memory ({', '.join(self.COLUMNS)})
+            VALUES ({', '.join('?' for _ in self.COLUMNS)})
+            """,
+            rows,
+        )
+        self.dirty.clear()
+        return len(rows)
 
-    conn = sqlite3.connect(db_path)
-    memory_cursor = conn.cursor()
-    signals = []
 
-    # === Rolling Features ===
+def add_rolling_features(df):
+    """Per-stock rolling features; pass the full history, not a single day."""
     df = df.sort_values(by=["name", "date"]).copy()
     df["volume_5_avg"] = df.groupby("name")["volume"].rolling(5, min_periods=1).mean().reset_index(level=0, drop=True).round(2)
     df["avg_trades_5"] = df.groupby("name")["trades"].rolling(5, min_periods=1).mean().reset_index(level=0, drop=True).round(2)
@@ -30,6 +82,15 @@ def run_analyzer_on_dataframe(df, db_path, skip_summary=False):
 
     df["gap_up"] = df["open"] > df["previous_close"] * 1.02
     df["gap_down"] = df["open"] < df["previous_close"] * 0.98
+    return df
+
+
+def score_rows(df, memory):
+    """Score a frame from add_rolling_features() row by row, updating memory."""
+    from scoring import smart_score, format_reason_text
+    import pandas as pd
+
+    signals = []
 
     for _, row in df.iterrows():
         if pd.isna(row["volume_5_avg"]):
@@ -73,13 +134,10 @@ def run_analyzer_on_dataframe(df, db_path, skip_summary=False):
                 action = "BUY CONFIRMED"
 
         # === Memory Logic ===
-        memory_row = pd.read_sql_query(
-            "SELECT * FROM signal_memory WHERE name = ? ORDER BY date DESC LIMIT 1",
-            conn, params=(row["name"],)
-        )
+        memory_row = memory.get(row["name"])
 
-        last_close = memory_row["last_close"].iloc[0] if not memory_row.empty else None
-        last_action = memory_row["last_action"].iloc[0] if not memory_row.empty else None
+        last_close = memory_row["last_close"] if memory_row else None
+        last_action = memory_row["last_action"] if memory_row else None
 
         if last_close and abs(row["close"] - last_close) <= 0.02 * last_close:
             score += 5
@@ -115,17 +173,25 @@ def run_analyzer_on_dataframe(df, db_path, skip_summary=False):
                 "stealth_accum": row.get("stealth_accum", False)
             })
 
-            memory_cursor.execute("""
-                INSERT OR REPLACE INTO signal_memory (name, last_signal, last_action, last_close, last_high5, date)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
+            memory.update(
                 row["name"],
                 signal,
                 action,
                 row["close"],
                 row.get("price_5_high", row["high"]),
                 row["date"].strftime("%Y-%m-%d")
-            ))
+            )
+
+    return signals
+
+
+def run_analyzer_on_dataframe(df, db_path, skip_summary=False, memory=None):
+    conn = connect(db_path)
+    if memory is None:
+        memory = SignalMemoryCache.load(conn)
+
+    df = add_rolling_features(df)
+    signals = score_rows(df, memory)
 
     # === 💾 Optional summary writing ===
     if not skip_summary:
@@ -136,6 +202,7 @@ def run_analyzer_on_dataframe(df, db_path, skip_summary=False):
         except Exception as e:
             print("⚠️ Skipping summary write due to error:", e)
 
+    memory.flush(conn)
     conn.commit()
     conn.close()
     return signals
@@ -1,16 +1,20 @@
 # app.py
-import streamlit as st
-import pandas as pd
-import sqlite3
+import time
 from datetime import datetime
-import plotly.express as px
-import os
-import plotly.graph_objects as go
 
+import pandas as pd
+import streamlit as st
+
+from dashboard_data import cached, dataset, read_csv, read_sql
+
+# Each section imports its own heavy modules (plotly, matplotlib, sector_cube,
+# buy_ratio_bulk_runner) and loads its own data, so a rerun only pays for the
+# section on screen.
 
 st.set_page_config(page_title="NGX Signal Dashboard", layout="wide")
 
 DB_PATH = "data/ngx_equities.db"
+render_started = time.perf_counter()
 
 
 def highlight_row(row):
@@ -20,117 +24,109 @@ def highlight_row(row):
         return [""] * len(row)
 
 
-# === Filters ===
-st.title("📈 NGX Signal Tracker")
-st.caption("Last updated: " + datetime.now().strftime("%Y-%m-%d %H:%M"))
-
-st.subheader("📈 3-Day Accumulation / Distribution Signals")
-
-# Load new signal table
-conn = sqlite3.connect("data/ngx_equities.db")
-df = pd.read_sql("SELECT * FROM accumulation_signals_3day  ", conn)
-conn.close()
+# Highlight signal
+def highlight_signal(row):
+    color = {
+        "accumulation": "lightgreen",
+        "distribution": "lightcoral",
+        "neutral": "",
+    }.get(row["signal"], "")
+    return [f"background-color: {color}" for _ in row]
 
-# Detect price flatness (same value for all 3 days)
-price_cols = [col for col in df.columns if col.startswith("price_")]
-df["price_flat"] = df[price_cols].nunique(axis=1) == 1
 
-# Check that volume data exists
-volume_cols = [col for col in df.columns if col.startswith("volume_")]
-df["volume_nonnull"] = df[volume_cols].apply(
-    lambda row: all(x > 0 for x in row), axis=1
-)
+# === 3-Day Accumulation ===
+def show_accumulation():
+    st.subheader("📈 3-Day Accumulation / Distribution Signals")
 
-# Optional: sort by value or volume for better signal visibility
-volume_cols = [col for col in df.columns if col.startswith("volume_")]
-df["avg_volume"] = df[volume_cols].mean(axis=1)
-df = df.sort_values(by="avg_volume", ascending=False)
+    df = dataset("accumulation")
 
-# Add implied price and discrepancy calculations first
-df["implied_price"] = df["value_total"] / df["volume_total"]
-df["price_discrepancy_ratio"] = df["implied_price"] / df["price"]
+    # Detect price flatness (same value for all 3 days)
+    price_cols = [col for col in df.columns if col.startswith("price_")]
+    df["price_flat"] = df[price_cols].nunique(axis=1) == 1
 
-# Optional flag column
-df["discrepancy_flag"] = df["price_discrepancy_ratio"].apply(
-    lambda x: (
-        "High Implied Price" if x > 1.5 else "Low Implied Price" if x < 0.5 else ""
+    # Check that volume data exists
+    volume_cols = [col for col in df.columns if col.startswith("volume_")]
+    df["volume_nonnull"] = df[volume_cols].apply(
+        lambda row: all(x > 0 for x in row), axis=1
     )
-)
-# 2. 🧠 Reorder columns: move implied and discrepancy fields right after 'signal'
-reorder_cols = df.columns.tolist()
-signal_index = reorder_cols.index("signal") if "signal" in reorder_cols else -1
 
-if signal_index != -1:
-    extra_cols = ["implied_price", "price_discrepancy_ratio", "discrepancy_flag"]
-    extra_cols_present = [col for col in extra_cols if col in df.columns]
+    # Optional: sort by value or volume for better signal visibility
+    volume_cols = [col for col in df.columns if col.startswith("volume_")]
+    df["avg_volume"] = df[volume_cols].mean(axis=1)
+    df = df.sort_values(by="avg_volume", ascending=False)
 
-    # Remove them first
-    for col in extra_cols_present:
-        reorder_cols.remove(col)
+    # Add implied price and discrepancy calculations first
+    df["implied_price"] = df["value_total"] / df["volume_total"]
+    df["price_discrepancy_ratio"] = df["implied_price"] / df["price"]
 
-    # Insert after 'signal'
-    for i, col in enumerate(extra_cols_present):
-        reorder_cols.insert(signal_index + 1 + i, col)
-
-    df = df[reorder_cols]
+    # Optional flag column
+    df["discrepancy_flag"] = df["price_discrepancy_ratio"].apply(
+        lambda x: (
+            "High Implied Price" if x > 1.5 else "Low Implied Price" if x < 0.5 else ""
+        )
+    )
+    # 2. 🧠 Reorder columns: move implied and discrepancy fields right after 'signal'
+    reorder_cols = df.columns.tolist()
+    signal_index = reorder_cols.index("signal") if "signal" in reorder_cols else -1
 
-flat_price_only = st.checkbox("📉 Show only flat-price stocks with volume activity")
+    if signal_index != -1:
+        extra_cols = ["implied_price", "price_discrepancy_ratio", "discrepancy_flag"]
+        extra_cols_present = [col for col in extra_cols if col in df.columns]
 
+        # Remove them first
+        for col in extra_cols_present:
+            reorder_cols.remove(col)
 
-if flat_price_only:
+        # Insert after 'signal'
+        for i, col in enumerate(extra_cols_present):
+            reorder_cols.insert(signal_index + 1 + i, col)
 
-    # Now apply the filters
-    df = df[
-        df["price_flat"].astype(bool)
-        & df["volume_nonnull"].astype(bool)
-        & ~df["signal"].isin(["accumulation", "distribution"])
-    ]
+        df = df[reorder_cols]
 
+    flat_price_only = st.checkbox("📉 Show only flat-price stocks with volume activity")
 
-# Format numbers
-volume_cols = [col for col in df.columns if col.startswith("volume_")]
-value_cols = [col for col in df.columns if col.startswith("value_")]
-price_cols = [col for col in df.columns if col.startswith("price_")]
+    if flat_price_only:
 
-# Format volume: integer with commas
-for col in volume_cols:
-    df[col] = df[col].astype(int).apply(lambda x: f"{x:,}")
-
-# Format value and price: 2 decimal places with commas
-for col in value_cols + price_cols:
-    df[col] = df[col].apply(lambda x: f"{x:,.2f}")
+        # Now apply the filters
+        df = df[
+            df["price_flat"].astype(bool)
+            & df["volume_nonnull"].astype(bool)
+            & ~df["signal"].isin(["accumulation", "distribution"])
+        ]
 
+    # Format numbers
+    volume_cols = [col for col in df.columns if col.startswith("volume_")]
+    value_cols = [col for col in df.columns if col.startswith("value_")]
+    price_cols = [col for col in df.columns if col.startswith("price_")]
 
-# Highlight signal
-def highlight_signal(row):
-    color = {
-        "accumulation": "lightgreen",
-        "distribution": "lightcoral",
-        "neutral": "",
-    }.get(row["signal"], "")
-    return [f"background-color: {color}" for _ in row]
+    # Format volume: integer with commas
+    for col in volume_cols:
+        df[col] = df[col].astype(int).apply(lambda x: f"{x:,}")
 
+    # Format value and price: 2 decimal places with commas
+    for col in value_cols + price_cols:
+        df[col] = df[col].apply(lambda x: f"{x:,.2f}")
 
-# Dropdown filter by sub_sector (optional)
-# Dropdown for subsector filter
-sector_filter = st.selectbox(
-    "📂 Filter by Sub-Sector", ["All"] + sorted(df["sub_sector"].dropna().unique())
-)
+    # Dropdown filter by sub_sector (optional)
+    # Dropdown for subsector filter
+    sector_filter = st.selectbox(
+        "📂 Filter by Sub-Sector", ["All"] + sorted(df["sub_sector"].dropna().unique())
+    )
 
-# Dropdown for signal type filter
-signal_filter = st.selectbox(
-    "📶 Filter by the Signal", ["All", "accumulation", "distribution", "neutral"]
-)
+    # Dropdown for signal type filter
+    signal_filter = st.selectbox(
+        "📶 Filter by the Signal", ["All", "accumulation", "distribution", "neutral"]
+    )
 
-# Apply filters
-if sector_filter != "All":
-    df = df[df["sub_sector"] == sector_filter]
+    # Apply filters
+    if sector_filter != "All":
+        df = df[df["sub_sector"] == sector_filter]
 
-if signal_filter != "All":
-    df = df[df["signal"] == signal_filter]
+    if signal_filter != "All":
+        df = df[df["signal"] == signal_filter]
 
-# Display styled table
-st.dataframe(df.style.apply(highlight_signal, axis=1), use_container_width=True)
+    # Display styled table
+    st.dataframe(df.style.apply(highlight_signal, axis=1), use_container_width=True)
 
 
 def human_readable(num):
@@ -150,21 +146,27 @@ def format_percent(x):
     return f"{x:.2f}%" if pd.notna(x) else ""
 
 
-# === Load signals ===
-@st.cache_data
-def load_signals():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql("SELECT * FROM signals where date >= '2025-11-01' ORDER BY date DESC", conn)
-    conn.close()
-    return df
+def recent_series():
+    """Last 15 traded dates of every stock, pivoted to (metric, name) columns."""
+    df = dataset("recent_series")
+    return df.pivot(index="date", columns="name", values=["Price", "Volume", "Value"]).sort_index()
 
 
-df = load_signals()
+def stock_series(wide, stock):
+    """One stock's rows (date, Price, Volume, Value) from recent_series()."""
+    df = wide.xs(stock, axis=1, level="name").dropna(how="all")
+    return df.rename_axis(columns=None).reset_index()
+
+
+# === Page ===
+st.title("📈 NGX Signal Tracker")
+st.caption("Last updated: " + datetime.now().strftime("%Y-%m-%d %H:%M"))
 
 page = st.radio(
     "Choose a section:",
     [
         "🔍 Signals",
+        "📈 3-Day Accumulation",
         "📈 Price Change Patterns",
         "📊 Weekly Intelligence",
         "📘 Weekly Intelligence (10-Day)",
@@ -177,86 +179,106 @@ page = st.radio(
 )
 
 if page == "🔍 Signals":
-    col1, col2, col3, col4, col5 = st.columns(5)
+    from signals_grid import (
+        SORT_COLUMNS,
+        category_styles,
+        count_signals,
+        filter_options,
+        signals_page,
+    )
+
+    options = cached(filter_options)
+    if options["first_date"] is None:
+        st.info("No signals since the cutoff yet. Run analyser.py first.")
+        st.stop()
+    first_date = pd.to_datetime(options["first_date"]).date()
+    last_date = pd.to_datetime(options["last_date"]).date()
+
+    col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        selected_signal = st.selectbox(
-            "Filter by Signal Type", ["All"] + sorted(df["signal"].unique().tolist())
+        date_range = st.date_input(
+            "Date range",
+            value=(first_date, last_date),
+            min_value=first_date,
+            max_value=last_date,
         )
 
     with col2:
-        selected_action = st.selectbox(
-            "Filter by Action", ["All"] + sorted(df["action"].unique().tolist())
-        )
+        selected_tiers = st.multiselect("Signal Tier", options["tiers"])
 
     with col3:
-        selected_date = st.selectbox(
-            "Filter by Date",
-            ["All"] + sorted(df["date"].unique().tolist(), reverse=True),
-        )
+        selected_actions = st.multiselect("Action", options["actions"])
 
     with col4:
-        selected_name = st.selectbox(
-            "Filter by Name", ["All"] + sorted(df["name"].unique().tolist())
-        )
+        selected_sector = st.selectbox("Sector", ["All"] + options["sectors"])
 
-    with col5:
-        selected_confidence_score = st.selectbox(
-            "Filter by Confidence Score",
-            ["All"] + sorted(df["confidence_score"].unique().tolist(), reverse=True),
-        )
+    col5, col6, col7, col8 = st.columns(4)
 
-    # === Apply filters ===
-    filtered_df = df.copy()
-
-    if selected_signal != "All":
-        filtered_df = filtered_df[filtered_df["signal"] == selected_signal]
-
-    if selected_action != "All":
-        filtered_df = filtered_df[filtered_df["action"] == selected_action]
-
-    if selected_date != "All":
-        filtered_df = filtered_df[filtered_df["date"] == selected_date]
-
-    if selected_name != "All":
-        filtered_df = filtered_df[filtered_df["name"] == selected_name]
-
-    if selected_confidence_score != "All":
-        filtered_df = filtered_df[
-            filtered_df["confidence_score"] == selected_confidence_score
-        ]
+    with col5:
+        selected_signals = st.multiselect("Signal Type", options["signals"])
+
+    with col6:
+        selected_name = st.selectbox("Name", ["All"] + options["names"])
+
+    with col7:
+        min_confidence = st.number_input("Min Confidence Score", min_value=0, value=0, step=5)
+
+    with col8:
+        sort_by = st.selectbox("Sort by", SORT_COLUMNS)
+        descending = st.toggle("Descending", value=True)
+
+    # === Filters go to SQLite; only the visible page is fetched ===
+    filters = {
+        "start": str(date_range[0]) if len(date_range) > 0 else None,
+        "end": str(date_range[1]) if len(date_range) > 1 else None,
+        "tiers": tuple(selected_tiers),
+        "actions": tuple(selected_actions),
+        "signals": tuple(selected_signals),
+        "name": None if selected_name == "All" else selected_name,
+        "sector": None if selected_sector == "All" else selected_sector,
+        "min_confidence": min_confidence or None,
+    }
+    per_page = st.selectbox("Rows per page", [50, 100, 250], index=1)
+    total = cached(count_signals, filters)
+    page_count = max(1, -(-total // per_page))
+    # Keyed on the filters so a new filter starts again at page 1
+    signals_page_no = st.number_input(
+        f"Page (of {page_count})",
+        min_value=1,
+        max_value=page_count,
+        value=1,
+        key=f"signals_page_{hash((tuple(filters.items()), sort_by, descending, per_page))}",
+    )
+    page_df = cached(
+        signals_page,
+        filters,
+        sort_by,
+        descending,
+        limit=per_page,
+        offset=(signals_page_no - 1) * per_page,
+    )
 
     # === Display ===
-    st.subheader(f"📊 Showing {len(filtered_df)} signals")
+    st.subheader(f"📊 Showing {len(page_df)} of {total} signals")
 
     if st.button("🔄 Refresh Signals"):
-        st.cache_data.clear()
+        # Cached reads are keyed by the data version, so a rerun picks up new rows
         st.rerun()
 
     st.dataframe(
-        filtered_df[
-            [
-                "name",
-                "date",
-                "signal",
-                "confidence_score",
-                "action",
-                "buy_range",
-                "explanation",
-                "signal_tier",
-            ]
-        ].style.apply(highlight_row, axis=1),
+        page_df.style.apply(category_styles, axis=None).hide(["row_category"], axis=1),
         use_container_width=True,
+        hide_index=True,
     )
+elif page == "📈 3-Day Accumulation":
+    show_accumulation()
+
 elif page == "📈 Price Change Patterns":
     st.subheader("📈 Price Change (%) Over Time")
 
-    conn = sqlite3.connect(DB_PATH)
-    df_pct = pd.read_sql(
-        "SELECT name, date, change_pct, close, volume FROM equities where volume > 0 AND date >= '2025-09-01' ORDER BY date DESC",
-        conn,
-    )
-    conn.close()
+    df_pct = dataset("equities_recent")
+    df_pct = df_pct.loc[df_pct["volume"] > 0, ["name", "date", "change_pct", "close", "volume"]]
 
     # Format and clean
     df_pct["date"] = pd.to_datetime(df_pct["date"])
@@ -270,11 +292,12 @@ elif page == "📈 Price Change Patterns":
 
     filtered_df = df_pct[df_pct["name"] == selected_name].sort_values("date")
 
-    # Date slider to narrow view
-    from datetime import datetime
+    # Date slider to narrow view (spans the signals table's dates)
+    from signals_grid import filter_options
 
-    min_date = pd.to_datetime(df["date"].min()).to_pydatetime()
-    max_date = pd.to_datetime(df["date"].max()).to_pydatetime()
+    options = cached(filter_options)
+    min_date = pd.to_datetime(options["first_date"]).to_pydatetime()
+    max_date = pd.to_datetime(options["last_date"]).to_pydatetime()
 
     start_date, end_date = st.slider(
         "🗓 Select date range to zoom in",
@@ -324,6 +347,19 @@ elif page == "📈 Price Change Patterns":
     fig.tight_layout()
     st.pyplot(fig)
 
+    # Estimated buy/sell split for the zoomed range, computed on demand
+    if st.checkbox("🧮 Show estimated buy ratio for this range"):
+        from buy_ratio_bulk_runner import buy_ratio_range
+
+        df_ratio = cached(
+            buy_ratio_range,
+            start_date.strftime("%Y-%m-%d"),
+            end_date.strftime("%Y-%m-%d"),
+            names=(selected_name,),
+        )
+        df_ratio["date"] = pd.to_datetime(df_ratio["date"])
+        st.line_chart(df_ratio.set_index("date")["buy_ratio"])
+
     st.markdown("## 🧭 Quick View: All Stock Graphs")
 
     # Show all stocks in compact form
@@ -379,17 +415,7 @@ elif page == "📊 Weekly Intelligence":
     st.subheader("📊 Weekly Trade Intelligence (Last 30 Days)")
     col1, col2, col3 = st.columns(3)
 
-    conn = sqlite3.connect(DB_PATH)
-    df_intel = pd.read_sql(
-        """
-        SELECT * FROM weekly_intel
-        WHERE score >= 1 and avg_change_1 > avg_change_0 and volume_1 > volume_0 and close_end_1 > close_start_1 and date_generated >= '2025-09-01'
-        ORDER BY name ASC
-    """,
-        conn,
-    )
-
-    conn.close()
+    df_intel = dataset("weekly_intel")
 
     if df_intel.empty:
         st.info("No weekly intelligence data available. Run weekly_intel.py first.")
@@ -510,16 +536,7 @@ elif page == "📘 Weekly Intelligence (10-Day)":
     st.subheader("📘 Weekly Trade Intelligence (Last 10 Days)")
     col1, col2, col3 = st.columns(3)
 
-    conn = sqlite3.connect(DB_PATH)
-    df_intel_short = pd.read_sql(
-        """
-        SELECT * FROM weekly_intel_short
-        WHERE score >= 1 and avg_change_1 > avg_change_0 and volume_1 > volume_0 and close_end_1 > close_start_1 and date_generated >= '2025-11-01'
-        ORDER BY name ASC
-    """,
-        conn,
-    )
-    conn.close()
+    df_intel_short = dataset("weekly_intel_short")
 
     if df_intel_short.empty:
         st.info(
@@ -677,6 +694,10 @@ Don’t let a short-term flicker override the long-term map.
     )
 elif page == "📊 Volume–Value Visualizer":
     st.subheader("📊 Volume–Value Visualizer")
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    from sector_cube import frame_cube_dates, frame_sector_totals
 
     view_mode = st.radio(
         "Select View:",
@@ -688,29 +709,18 @@ elif page == "📊 Volume–Value Visualizer":
         ],
         horizontal=True,
     )
-    conn = sqlite3.connect("data/ngx_equities.db")
+    df_equities = dataset("equities_recent")
+    cube = dataset("sector_daily")
 
     if view_mode == "📈 Stock Trend (Last 20 Days)":
         stock_name = st.selectbox(
             "Select Stock",
-            pd.read_sql(
-                "SELECT DISTINCT name FROM equities WHERE volume > 0  and date >= '2025-09-01' ORDER BY name ",
-                conn,
-            )["name"],
+            sorted(df_equities.loc[df_equities["volume"] > 0, "name"].unique()),
         )
 
-        # Query last 20 days for selected stock
-        # Correct query
-        query = """
-            SELECT date, MAX(close) as Price, SUM(volume) as Volume, SUM(value) as Value
-            FROM equities
-            WHERE name = ? AND volume > 0 
-            GROUP BY date
-            ORDER BY date DESC
-            LIMIT 15
-        """
-        df_stock = pd.read_sql(query, conn, params=(stock_name,))
-        df_stock = df_stock.sort_values("date")
+        # Last 15 traded days of every stock
+        recent = recent_series()
+        df_stock = stock_series(recent, stock_name)
 
         # Scale values
         df_stock["volume_b"] = df_stock["Volume"]
@@ -772,26 +782,27 @@ elif page == "📊 Volume–Value Visualizer":
         st.markdown("---")
         st.subheader("🔍 Quick View: All Stocks (Mini Charts)")
 
-        # Get list of all stocks with volume > 0
-        all_stocks = pd.read_sql(
-            "SELECT DISTINCT name FROM equities WHERE volume > 0 ORDER BY name", conn
-        )["name"].tolist()
+        # Every stock with volume > 0
+        all_stocks = sorted(recent.columns.get_level_values("name").unique())
+
+        # Only the charts on the current page are built
+        per_page_col, page_col = st.columns(2)
+        with per_page_col:
+            per_page = st.selectbox("Charts per page", [10, 20, 50], index=1)
+        page_count = max(1, -(-len(all_stocks) // per_page))
+        with page_col:
+            chart_page = st.number_input(
+                f"Page (of {page_count})", min_value=1, max_value=page_count, value=1
+            )
+        visible_stocks = all_stocks[(chart_page - 1) * per_page : chart_page * per_page]
+        st.caption(f"Showing {len(visible_stocks)} of {len(all_stocks)} stocks")
 
         # Columns: 2 per row
         col1, col2 = st.columns(2)
 
         # Helper function to build mini chart
         def plot_mini_chart(stock):
-            query = """
-                SELECT date, MAX(close) as Price, SUM(volume) as Volume, SUM(value) as Value
-                FROM equities
-                WHERE name = ? AND volume > 0 
-                GROUP BY date
-                ORDER BY date DESC
-                LIMIT 15
-            """
-            df = pd.read_sql(query, conn, params=(stock,))
-            df = df.sort_values("date")
+            df = stock_series(recent, stock)
             df["Price_Change"] = df["Price"].diff()
             df["Value_Color"] = df["Price_Change"].apply(
                 lambda x: "green" if x >= 0 else "blue"
@@ -844,8 +855,8 @@ elif page == "📊 Volume–Value Visualizer":
 
             return fig
 
-        # Loop through stocks and display in two columns
-        for i, stock in enumerate(all_stocks):
+        # Loop through this page's stocks and display in two columns
+        for i, stock in enumerate(visible_stocks):
             if i % 2 == 0:
                 with col1:
                     st.plotly_chart(plot_mini_chart(stock), use_container_width=True)
@@ -856,17 +867,12 @@ elif page == "📊 Volume–Value Visualizer":
     elif view_mode == "🔍 Divergence by Date":
         selected_day = st.selectbox(
             "Select Date",
-            pd.read_sql("SELECT DISTINCT date FROM equities where date >= 2025-09-01 ORDER BY date DESC", conn)[
-                "date"
-            ],
+            sorted(df_equities["date"].unique(), reverse=True),
         )
 
-        query = f"""
-        SELECT name, close as Price, volume as Volume, value as Value
-        FROM equities
-        WHERE date = ?
-        """
-        df_day = pd.read_sql(query, conn, params=(selected_day,))
+        df_day = df_equities[df_equities["date"] == selected_day].rename(
+            columns={"close": "Price", "volume": "Volume", "value": "Value"}
+        )[["name", "Price", "Volume", "Value"]]
 
         # Calculate % difference
         df_day["divergence_pct"] = (
@@ -897,11 +903,11 @@ elif page == "📊 Volume–Value Visualizer":
     elif view_mode == "📊 Sector Divergence":
         selected_day = st.selectbox(
             "Select Date",
-            pd.read_sql("SELECT DISTINCT date FROM equities ORDER BY date DESC", conn)[
-                "date"
-            ],
+            frame_cube_dates(cube),
             key="sector_divergence_date",
         )
+        if selected_day is None:
+            st.info("sector_daily is empty — run `python sector_cube.py --rebuild`.")
 
         # Toggle divergence metric
         divergence_type = st.radio(
@@ -936,16 +942,9 @@ elif page == "📊 Volume–Value Visualizer":
                 return df
 
             # --- MAIN: totals per sector on selected day ---
-            df_sector = pd.read_sql(
-                """
-                SELECT main_sector, SUM(volume) as total_volume, SUM(value) as total_value
-                FROM equities
-                WHERE date = ?
-                GROUP BY main_sector
-                """,
-                conn,
-                params=(selected_day,),
-            )
+            df_sector = frame_sector_totals(cube, [selected_day])[
+                ["main_sector", "total_volume", "total_value"]
+            ]
             df_sector = add_divergence_cols(df_sector)
 
             # Sort & take Top 10 by chosen metric (pct or raw)
@@ -993,41 +992,10 @@ elif page == "📊 Volume–Value Visualizer":
             st.subheader("Fast Rotation — Volume (1d vs trailing 3d)")
 
             # Get the previous 3 trading days before the selected day
-            prev3 = pd.read_sql(
-                """
-                SELECT DISTINCT date
-                FROM equities
-                WHERE date < ?
-                ORDER BY date DESC
-                LIMIT 3
-                """,
-                conn,
-                params=(selected_day,),
-            )["date"].tolist()
-
-            def sector_volume_share(dates_list):
-                """Return sector volume share (%) aggregated over the given dates."""
-                if not dates_list:
-                    return pd.DataFrame(
-                        columns=["main_sector", "total_volume", "vol_share"]
-                    )
-                placeholders = ",".join(["?"] * len(dates_list))
-                dfv = pd.read_sql(
-                    f"""
-                    SELECT main_sector, SUM(volume) AS total_volume
-                    FROM equities
-                    WHERE date IN ({placeholders})
-                    GROUP BY main_sector
-                    """,
-                    conn,
-                    params=dates_list,
-                )
-                total = dfv["total_volume"].sum()
-                dfv["vol_share"] = (dfv["total_volume"] / total * 100) if total else 0.0
-                return dfv
+            prev3 = frame_cube_dates(cube, before=selected_day, limit=3)
 
-            df_today = sector_volume_share([selected_day])
-            df_trail3 = sector_volume_share(prev3)
+            df_today = frame_sector_totals(cube, [selected_day])
+            df_trail3 = frame_sector_totals(cube, prev3)
 
             if df_today.empty or df_trail3.empty:
                 st.info("Not enough data for 1d vs trailing 3d volume view.")
@@ -1098,39 +1066,8 @@ elif page == "📊 Volume–Value Visualizer":
 
         st.subheader("Fast Rotation — Volume (3d vs prior 3d) & Standard (5d vs 6–10)")
 
-        def sector_volume_share(dates_list):
-            """Return sector volume share (%) aggregated over given dates."""
-            if not dates_list:
-                return pd.DataFrame(
-                    columns=["main_sector", "total_volume", "vol_share"]
-                )
-            placeholders = ",".join(["?"] * len(dates_list))
-            dfv = pd.read_sql(
-                f"""
-                SELECT main_sector, SUM(volume) AS total_volume
-                FROM equities
-                WHERE date IN ({placeholders})
-                GROUP BY main_sector
-                """,
-                conn,
-                params=dates_list,
-            )
-            total = dfv["total_volume"].sum()
-            dfv["vol_share"] = (dfv["total_volume"] / total * 100) if total else 0.0
-            return dfv
-
         # Get up to last 10 trading days up to selected_day (inclusive)
-        dates_10_all = pd.read_sql(
-            """
-            SELECT DISTINCT date
-            FROM equities
-            WHERE date <= ?
-            ORDER BY date DESC
-            LIMIT 10
-            """,
-            conn,
-            params=(selected_day,),
-        )["date"].tolist()
+        dates_10_all = frame_cube_dates(cube, through=selected_day, limit=10)
 
         # Helper to pick display order (prefer your Top 10 sectors if available)
         def choose_keep(df_pref, fallback=10):
@@ -1149,8 +1086,8 @@ elif page == "📊 Volume–Value Visualizer":
             recent3 = dates_10_all[:3]  # selected day back 2 more
             prior3 = dates_10_all[3:6]  # the 3 days before that
 
-            df_recent3 = sector_volume_share(recent3)
-            df_prior3 = sector_volume_share(prior3)
+            df_recent3 = frame_sector_totals(cube, recent3)
+            df_prior3 = frame_sector_totals(cube, prior3)
 
             keep_3 = choose_keep(df_recent3, fallback=10)
             if keep_3:
@@ -1201,8 +1138,8 @@ elif page == "📊 Volume–Value Visualizer":
             recent5 = dates_10_all[:5]
             base5 = dates_10_all[5:10]
 
-            df_recent5 = sector_volume_share(recent5)
-            df_base5 = sector_volume_share(base5)
+            df_recent5 = frame_sector_totals(cube, recent5)
+            df_base5 = frame_sector_totals(cube, base5)
 
             keep_5 = choose_keep(df_recent5, fallback=10)
             if keep_5:
@@ -1249,37 +1186,24 @@ elif page == "📊 Volume–Value Visualizer":
             st.info("Not enough history for Standard (5d vs 6–10) volume view.")
 
     elif view_mode == "🔍 Sector Stock Divergence":
+        # Per-stock rows only go back as far as the equities_recent dataset
+        first_day = df_equities["date"].min()
         selected_day = st.selectbox(
             "Select Date",
-            pd.read_sql("SELECT DISTINCT date FROM equities ORDER BY date DESC", conn)[
-                "date"
-            ],
+            [d for d in frame_cube_dates(cube) if d >= first_day],
             key="sector_stock_date",
         )
 
         # Sector & Top-N
-        sectors = pd.read_sql(
-            "SELECT DISTINCT main_sector FROM equities ORDER BY main_sector", conn
-        )["main_sector"].dropna()
+        sectors = sorted(cube["main_sector"].dropna().unique())
         selected_sector = st.selectbox("Select Sector", sectors)
         top_n = st.radio("Number of Stocks", [5, 10], horizontal=True)
 
         # ===== MAIN (TODAY) — VOLUME ONLY, color by price direction =====
-        df_today = pd.read_sql(
-            """
-            SELECT name,
-                open  AS Open,
-                close AS Close,
-                volume AS Volume
-            FROM equities
-            WHERE date = ? AND main_sector = ?
-            """,
-            conn,
-            params=(selected_day, selected_sector),
-        )
-
-        import plotly.graph_objects as go
-        import plotly.express as px
+        df_sector_rows = df_equities[df_equities["main_sector"] == selected_sector]
+        df_today = df_sector_rows[df_sector_rows["date"] == selected_day].rename(
+            columns={"open": "Open", "close": "Close", "volume": "Volume"}
+        )[["name", "Open", "Close", "Volume"]]
 
         if df_today.empty:
             st.warning(f"No data found for {selected_sector} on {selected_day}")
@@ -1316,16 +1240,11 @@ elif page == "📊 Volume–Value Visualizer":
             """Return stock volume share (%) within the selected sector over given dates."""
             if not dates_list:
                 return pd.DataFrame(columns=["name", "total_volume", "vol_share"])
-            ph = ",".join(["?"] * len(dates_list))
-            dfv = pd.read_sql(
-                f"""
-                SELECT name, SUM(volume) AS total_volume
-                FROM equities
-                WHERE main_sector = ? AND date IN ({ph})
-                GROUP BY name
-                """,
-                conn,
-                params=[selected_sector, *dates_list],
+            dfv = (
+                df_sector_rows[df_sector_rows["date"].isin(dates_list)]
+                .groupby("name", as_index=False)["volume"]
+                .sum()
+                .rename(columns={"volume": "total_volume"})
             )
             total = dfv["total_volume"].sum()
             dfv["vol_share"] = (dfv["total_volume"] / total * 100) if total else 0.0
@@ -1345,17 +1264,7 @@ elif page == "📊 Volume–Value Visualizer":
 
         # ===== Fast Rotation — Volume (1d vs trailing 3d) =====
         st.subheader("Fast Rotation — Volume (1d vs trailing 3d)")
-        prev3 = pd.read_sql(
-            """
-            SELECT DISTINCT date
-            FROM equities
-            WHERE date < ?
-            ORDER BY date DESC
-            LIMIT 3
-            """,
-            conn,
-            params=(selected_day,),
-        )["date"].tolist()
+        prev3 = frame_cube_dates(cube, before=selected_day, limit=3)
 
         df_today_vol = stock_volume_share([selected_day])
         df_trail3_vol = stock_volume_share(prev3)
@@ -1405,17 +1314,7 @@ elif page == "📊 Volume–Value Visualizer":
 
         # ===== Fast Rotation — Volume (3d vs prior 3d) =====
         st.subheader("Fast Rotation — Volume (3d vs prior 3d)")
-        dates_10_all = pd.read_sql(
-            """
-            SELECT DISTINCT date
-            FROM equities
-            WHERE date <= ?
-            ORDER BY date DESC
-            LIMIT 10
-            """,
-            conn,
-            params=(selected_day,),
-        )["date"].tolist()
+        dates_10_all = frame_cube_dates(cube, through=selected_day, limit=10)
 
         if len(dates_10_all) >= 6:
             recent3 = dates_10_all[:3]
@@ -1517,14 +1416,12 @@ elif page == "📊 Volume–Value Visualizer":
     else:
         st.info("Not enough history for 5d vs 6–10 volume view.")
 
-    conn.close()
-
 elif page == "📊 Comparison Insights":
     st.subheader("📊 Comparison of 30-Day vs 10-Day Trends")
 
     try:
         # Load the CSV generated by intel_comparator.py
-        df_compare = pd.read_csv("intel_comparison_report.csv")
+        df_compare = read_csv("intel_comparison_report.csv")
 
         # Sidebar filters
         with st.sidebar:
@@ -1565,7 +1462,6 @@ elif page == "📊 Comparison Insights":
 
 if page == "Match View Strong":
 
-    conn = sqlite3.connect(DB_PATH)
     query = """
     SELECT 
         ic.name,
@@ -1603,7 +1499,7 @@ if page == "Match View Strong":
         s.date DESC
     """
 
-    df = pd.read_sql(query, conn)
+    df = read_sql(query)
 
     col1, col2 = st.columns(2)
 
@@ -1631,7 +1527,7 @@ if page == "Match View Strong":
     st.subheader(f"📊 Showing {len(filtered_df)} signals")
 
     if st.button("🔄 Refresh Signals"):
-        st.cache_data.clear()
+        # Cached reads are keyed by the data version, so a rerun picks up new rows
         st.rerun()
 
     st.dataframe(
@@ -1653,7 +1549,6 @@ if page == "Match View Strong":
     )
 if page == "Match View Pull Back":
 
-    conn = sqlite3.connect(DB_PATH)
     query = """
     SELECT 
         ic.name,
@@ -1691,7 +1586,7 @@ if page == "Match View Pull Back":
         s.date DESC
     """
 
-    df = pd.read_sql(query, conn)
+    df = read_sql(query)
 
     col1, col2 = st.columns(2)
 
@@ -1719,7 +1614,7 @@ if page == "Match View Pull Back":
     st.subheader(f"📊 Showing {len(filtered_df)} signals")
 
     if st.button("🔄 Refresh Signals"):
-        st.cache_data.clear()
+        # Cached reads are keyed by the data version, so a rerun picks up new rows
         st.rerun()
 
     st.dataframe(
@@ -1739,3 +1634,5 @@ if page == "Match View Pull Back":
         ].style.apply(highlight_row, axis=1),
         use_container_width=True,
     )
+
+st.caption(f"⏱️ {page} rendered in {time.perf_counter() - render_started:.2f}s")
@@ -1,47 +1,46 @@
-import requests
-from bs4 import BeautifulSoup
+# apt_scraper.py
+"""Backfill equities from APT Securities' daily NSE price pages.
+
+Fetches every weekday in a date range concurrently (bounded by a semaphore,
+spaced out by a minimum delay, retried with backoff), parses each page with
+lxml and writes each day with one executemany in its own transaction.
+Dates already present in equities are skipped; --force refetches them and
+overwrites the stored prices. Backfilled dates usually land before existing
+history, so the run ends by refolding equity_features (stocks that gained
+older rows are recomputed) and refreshing the price store.
+check_apt_scraper.py runs a backfill against a local http.server stand-in.
+
+    python apt_scraper.py 2025-08-06                 # one day
+    python apt_scraper.py 2025-06-01 2025-08-29      # fill a range
+    python apt_scraper.py 2025-08-06 --force         # refetch and overwrite a day
+    python apt_scraper.py 2025-08-06 --base-url http://127.0.0.1:8000/nse-daily-price.php
+"""
+import argparse
+import asyncio
+import time
 from datetime import datetime, timedelta
-import sqlite3
+
+import lxml.html
+import requests
+
+from db import connect
+from equity_features import update_features
+from price_store import refresh_store
+from sector_cube import update_sector_cube
 
 DB_PATH = "data/ngx_equities.db"
 TABLE_NAME = "equities"
+BASE_URL = "https://www.aptsecurities.com/nse-daily-price.php"
 
-# === Step 1: Get last 30 weekdays
-# === Step 1: Define date range manually
-start_date = datetime(2025, 8, 6).date()
-end_date = datetime(2025, 8, 6).date()
-
-trading_dates = []
-current_date = start_date
-while current_date <= end_date:
-    if current_date.weekday() < 5:  # Only weekdays
-        trading_dates.append(current_date)
-    current_date += timedelta(days=1)
-
-
-# === Step 2: Connect to DB
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
-cursor.execute(
-    f"""
-    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-        name TEXT,
-        date TEXT,
-        open REAL,
-        high REAL,
-        low REAL,
-        close REAL,
-        trades INTEGER,
-        volume INTEGER,
-        value REAL,
-        PRIMARY KEY (name, date)
-    )
-"""
-)
+CONCURRENCY = 4
+MIN_DELAY = 0.5  # seconds between request starts
+RETRIES = 3
+TIMEOUT = 15
+
+INSERT_COLS = ["name", "date", "open", "high", "low", "close", "trades", "volume", "value"]
 
 
-# === Step 3: Clean helpers
+# === Clean helpers
 def clean_number(text):
     if text is None:
         return None
@@ -55,64 +54,194 @@ def clean_number(text):
             return None
 
 
-# === Step 4: Scrape each date
-for date_obj in trading_dates:
-    date_str = date_obj.strftime("%Y-%m-%d")
-    url = f"https://www.aptsecurities.com/nse-daily-price.php?date={date_str}"
-    try:
-        resp = requests.get(url, timeout=10)
-    except Exception as e:
-        print(f"❌ Failed to fetch {date_str}: {e}")
-        continue
-    if resp.status_code != 200:
-        print(f"⚠️ {date_str} - HTTP {resp.status_code}")
-        continue
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-    rows = soup.find_all("tr")
-
-    count = 0
-    for row in rows:
-        name_cell = row.find("th")
-        cells = row.find_all("td")
+def weekdays(start_date, end_date):
+    trading_dates = []
+    current_date = start_date
+    while current_date <= end_date:
+        if current_date.weekday() < 5:  # Only weekdays
+            trading_dates.append(current_date.strftime("%Y-%m-%d"))
+        current_date += timedelta(days=1)
+    return trading_dates
+
+
+def parse_day(html, date_str):
+    """Rows of one daily price page as tuples in INSERT_COLS order."""
+    rows = []
+    for tr in lxml.html.fromstring(html).xpath("//tr"):
+        name_cell = tr.xpath("./th")
+        cells = [td.text_content() for td in tr.xpath("./td")]
         if not name_cell or len(cells) < 8:
             continue
+        name = name_cell[0].text_content().strip()
+        open_val, close_val, high_val, low_val = (clean_number(c) for c in cells[:4])
+        trades_val, volume_val, value_val = (clean_number(c) for c in cells[5:8])
+        rows.append(
+            (name, date_str, open_val, high_val, low_val, close_val, trades_val, volume_val, value_val)
+        )
+    return rows
+
+
+# === DB
+def ensure_table(conn):
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+            name TEXT,
+            date TEXT,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            trades INTEGER,
+            volume INTEGER,
+            value REAL,
+            PRIMARY KEY (name, date)
+        )
+    """
+    )
 
-        name = name_cell.get_text(strip=True)
-        open_val = clean_number(cells[0].get_text(strip=True))
-        close_val = clean_number(cells[1].get_text(strip=True))
-        high_val = clean_number(cells[2].get_text(strip=True))
-        low_val = clean_number(cells[3].get_text(strip=True))
-        trades_val = clean_number(cells[5].get_text(strip=True))
-        volume_val = clean_number(cells[6].get_text(strip=True))
-        value_val = clean_number(cells[7].get_text(strip=True))
 
-        cursor.execute(
+def existing_dates(conn, start, end):
+    return {
+        d
+        for (d,) in conn.execute(
+            f"SELECT DISTINCT date FROM {TABLE_NAME} WHERE date BETWEEN ? AND ?",
+            (start, end),
+        )
+    }
+
+
+def dates_to_fetch(conn, trading_dates, force=False):
+    """trading_dates minus the ones already in equities (all of them with force)."""
+    if force or not trading_dates:
+        return list(trading_dates)
+    have = existing_dates(conn, trading_dates[0], trading_dates[-1])
+    if have:
+        print(f"⏭️ Skipping {len(have)} date(s) already in {TABLE_NAME}")
+    return [d for d in trading_dates if d not in have]
+
+
+def store_day(conn, rows, overwrite=False):
+    """Insert one day's rows; with overwrite, rows already stored get the page's values."""
+    values = ", ".join(f"? AS {c}" for c in INSERT_COLS)
+    with conn:
+        if overwrite:
+            sets = ", ".join(f"{c} = ?" for c in INSERT_COLS[2:])
+            conn.executemany(
+                f"UPDATE {TABLE_NAME} SET {sets} WHERE name = ? AND date = ?",
+                [row[2:] + row[:2] for row in rows],
+            )
+        # NOT EXISTS rather than OR IGNORE: older equities tables have no (name, date) key
+        conn.executemany(
             f"""
-            INSERT OR IGNORE INTO {TABLE_NAME} 
-            (name, date, open, high, low, close, trades, volume, value) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                name,
-                date_str,
-                open_val,
-                high_val,
-                low_val,
-                close_val,
-                trades_val,
-                volume_val,
-                value_val,
-            ),
+            INSERT INTO {TABLE_NAME} ({', '.join(INSERT_COLS)})
+            SELECT * FROM (SELECT {values}) AS new
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {TABLE_NAME} e WHERE e.name = new.name AND e.date = new.date
+            )
+            """,
+            rows,
         )
-        count += 1
 
-    conn.commit()
-    print(f"✅ {date_str}: {count} records")
-    print(
-        f"{name}: O={open_val}, H={high_val}, L={low_val}, C={close_val}, T={trades_val}, V={volume_val}, Val={value_val}"
+
+# === Fetching
+class Throttle:
+    """At most `concurrency` requests in flight, starts at least `delay` apart."""
+
+    def __init__(self, concurrency, delay):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def wait_turn(self):
+        async with self._lock:
+            now = time.monotonic()
+            if now < self._next_start:
+                await asyncio.sleep(self._next_start - now)
+            self._next_start = max(now, self._next_start) + self.delay
+
+
+async def fetch_day(date_str, base_url, throttle, retries=RETRIES):
+    """Return the page HTML for date_str, or None if it could not be fetched."""
+    for attempt in range(1, retries + 1):
+        async with throttle.semaphore:
+            await throttle.wait_turn()
+            try:
+                resp = await asyncio.to_thread(
+                    requests.get, base_url, params={"date": date_str}, timeout=TIMEOUT
+                )
+                if resp.status_code == 200:
+                    return resp.text
+                if resp.status_code not in (429, 500, 502, 503, 504):
+                    print(f"⚠️ {date_str} - HTTP {resp.status_code}")
+                    return None
+                error = f"HTTP {resp.status_code}"
+            except requests.RequestException as e:
+                error = e
+        if attempt < retries:
+            backoff = 2 ** attempt
+            print(f"🔁 {date_str} - {error}; retrying in {backoff}s ({attempt}/{retries})")
+            await asyncio.sleep(backoff)
+    print(f"❌ Failed to fetch {date_str}: {error}")
+    return None
+
+
+async def backfill(
+    dates, conn, base_url=BASE_URL, concurrency=CONCURRENCY, delay=MIN_DELAY, overwrite=False
+):
+    throttle = Throttle(concurrency, delay)
+
+    async def fetch(date_str):
+        return date_str, await fetch_day(date_str, base_url, throttle)
+
+    stored, stored_dates, names = 0, [], set()
+    for task in asyncio.as_completed([fetch(d) for d in dates]):
+        date_str, html = await task
+        if html is None:
+            continue
+        rows = parse_day(html, date_str)
+        if not rows:
+            print(f"ℹ️ {date_str}: no rows (holiday?)")
+            continue
+        store_day(conn, rows, overwrite)
+        stored += len(rows)
+        stored_dates.append(date_str)
+        names.update(row[0] for row in rows)
+        print(f"✅ {date_str}: {len(rows)} records")
+    if stored_dates:
+        update_sector_cube(conn, stored_dates)
+        # Overwritten rows may already have features; inserted ones are found by the updater
+        update_features(conn, refold=names if overwrite else ())
+    return stored
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill equities from APT Securities")
+    parser.add_argument("start", nargs="?", default=datetime.today().strftime("%Y-%m-%d"))
+    parser.add_argument("end", nargs="?", help="last date (defaults to start)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--delay", type=float, default=MIN_DELAY)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument(
+        "--force", action="store_true", help="refetch dates already in the DB and overwrite their prices"
     )
+    args = parser.parse_args()
 
+    start_date = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end_date = datetime.strptime(args.end or args.start, "%Y-%m-%d").date()
+    trading_dates = weekdays(start_date, end_date)
 
-conn.close()
-print("🎯 Done!")
+    conn = connect(DB_PATH)
+    ensure_table(conn)
+    trading_dates = dates_to_fetch(conn, trading_dates, args.force)
+
+    print(f"🌐 Fetching {len(trading_dates)} trading day(s)...")
+    started = time.perf_counter()
+    stored = asyncio.run(
+        backfill(trading_dates, conn, args.base_url, args.concurrency, args.delay, args.force)
+    )
+    conn.close()
+    if stored:
+        refresh_store(DB_PATH)
+    print(f"🎯 Done! {stored} records in {time.perf_counter() - started:.1f}s")
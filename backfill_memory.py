@@ -1,32 +1,123 @@
-from analyser_core import run_analyzer_on_dataframe
-import sqlite3
-import pandas as pd
+# backfill_memory.py
+"""Replay the analyzer over the full equities history to rebuild signal_memory.
+
+Rolling features are computed once over the whole history, then trading days
+are replayed in order, CHUNK_DAYS at a time. signal_memory only ever looks at
+a stock's own past, so each chunk is sharded by symbol across a process pool.
+After every chunk the memory and the last completed date are committed
+together, so an interrupted backfill resumes where it stopped.
+
+    python backfill_memory.py            # resume from the checkpoint
+    python backfill_memory.py --restart  # replay from the first trading day
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from analyser_core import SignalMemoryCache, add_rolling_features, score_rows
+from db import connect
+from price_store import load_equities
 
 DB_PATH = "data/ngx_equities.db"
+JOB_NAME = "backfill_memory"
+CHUNK_DAYS = 20
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+
+# === CHECKPOINT ===
+def ensure_checkpoint_table(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS backfill_checkpoint (job TEXT PRIMARY KEY, last_date TEXT, updated_at TEXT)"
+    )
+
+
+def read_checkpoint(conn):
+    row = conn.execute(
+        "SELECT last_date FROM backfill_checkpoint WHERE job = ?", (JOB_NAME,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def write_checkpoint(conn, last_date):
+    conn.execute(
+        """
+        INSERT INTO backfill_checkpoint (job, last_date, updated_at)
+        VALUES (?, ?, datetime('now'))
+        ON CONFLICT(job) DO UPDATE SET last_date = excluded.last_date, updated_at = excluded.updated_at
+        """,
+        (JOB_NAME, last_date),
+    )
+
+
+# === WORKER ===
+def replay_shard(rows, entries):
+    """Score one group of symbols for one chunk of days.
+
+    Returns (signal count, memory entries that changed).
+    """
+    memory = SignalMemoryCache(entries)
+    signals = score_rows(rows, memory)
+    return len(signals), {name: memory.entries[name] for name in memory.dirty}
+
+
+# === REPLAY ===
+def replay(restart=False, workers=WORKERS, chunk_days=CHUNK_DAYS):
+    conn = connect(DB_PATH)
+    ensure_checkpoint_table(conn)
+    memory = SignalMemoryCache.load(conn)
+    if restart:
+        with conn:
+            conn.execute("DELETE FROM signal_memory")
+            conn.execute("DELETE FROM backfill_checkpoint WHERE job = ?", (JOB_NAME,))
+        memory = SignalMemoryCache()
+    resume_after = read_checkpoint(conn)
+
+    print("📥 Loading full equities history...")
+    df = add_rolling_features(load_equities(DB_PATH))
+    df["day"] = df["date"].dt.strftime("%Y-%m-%d")
+
+    all_dates = sorted(df["day"].unique())
+    pending = [d for d in all_dates if resume_after is None or d > resume_after]
+    if resume_after:
+        print(f"⏩ Resuming after {resume_after}")
+    print(f"🔁 Replaying analyzer for {len(pending)} of {len(all_dates)} trading days...")
+
+    # Round-robin symbols over the workers; a symbol always stays on one shard
+    symbols = sorted(df["name"].unique())
+    shard_of = {name: i % workers for i, name in enumerate(symbols)}
 
-# Step 1: Get all unique dates
-with sqlite3.connect(DB_PATH) as conn:
-    all_dates = pd.read_sql("SELECT DISTINCT date FROM equities ORDER BY date ASC", conn)["date"].tolist()
+    total_signals = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(pending), chunk_days):
+            chunk = pending[start : start + chunk_days]
+            first, last = chunk[0], chunk[-1]
 
-print(f"🔁 Replaying analyzer for {len(all_dates)} trading days...")
+            chunk_df = df[(df["day"] >= first) & (df["day"] <= last)]
+            futures = []
+            for _, rows in chunk_df.groupby(chunk_df["name"].map(shard_of)):
+                entries = {
+                    n: memory.entries[n]
+                    for n in rows["name"].unique()
+                    if n in memory.entries
+                }
+                futures.append(pool.submit(replay_shard, rows, entries))
 
-for date in all_dates:
-    print(f"\n📅 Processing {date}...")
+            for future in futures:
+                count, changed = future.result()
+                total_signals += count
+                for name, entry in changed.items():
+                    memory.entries[name] = entry
+                    memory.dirty.add(name)
 
-    try:
-        # Fresh connection per day
-        daily_conn = sqlite3.connect(DB_PATH)
-        daily_df = pd.read_sql("SELECT * FROM equities WHERE date = ?", daily_conn, params=(date,))
-        daily_conn.close()
+            # Memory and checkpoint land in the same transaction
+            with conn:
+                memory.flush(conn)
+                write_checkpoint(conn, last)
+            print(f"📅 {first} → {last}: done ({total_signals} signals so far)")
 
-        if daily_df.empty:
-            print("⚠️  No data for this day, skipping.")
-            continue
+    conn.close()
+    print(f"✅ Backfill complete: {total_signals} signals replayed.")
 
-        daily_df["date"] = pd.to_datetime(daily_df["date"])
-        
-        # ✅ Fresh connection passed inside analyzer (not shared)
-        run_analyzer_on_dataframe(daily_df, DB_PATH, skip_summary=True)
 
-    except Exception as e:
-        print(f"❌ Error running analyzer on {date}: {e}")
+if __name__ == "__main__":
+    replay(restart="--restart" in sys.argv)
@@ -1,46 +1,111 @@
-import sqlite3
+import sys
+
+import numpy as np
 import pandas as pd
 
+from db import connect
+from price_store import load_equities
+
 DB_PATH = "data/ngx_equities.db"
+TABLE_NAME = "buy_ratio_signals"
+
+# python buy_ratio_bulk_runner.py            -> append dates newer than the table's last date
+# python buy_ratio_bulk_runner.py --rebuild  -> recompute the whole history
+
 
 def estimate_buy_sell_volume(df):
     df = df.sort_values(by=["name", "date"]).copy()
     df["prev_close"] = df.groupby("name")["close"].shift(1)
     df["prev_vol"] = df.groupby("name")["volume"].shift(1)
 
-    def calc_ratio(row):
-        if pd.isna(row["prev_close"]) or pd.isna(row["prev_vol"]) or row["volume"] == 0:
-            return None
-        if row["close"] > row["prev_close"]:
-            net_buy = row["volume"] - row["prev_vol"]
-            base_buy = 0.5 * row["prev_vol"]
-            buy_volume = max(0, net_buy + base_buy)
-            return round(buy_volume / row["volume"], 3)
-        elif row["close"] < row["prev_close"]:
-            net_sell = row["volume"] - row["prev_vol"]
-            base_sell = 0.5 * row["prev_vol"]
-            sell_volume = max(0, net_sell + base_sell)
-            return round(1 - (sell_volume / row["volume"]), 3)
-        else:
-            return 0.5
-
-    df["buy_ratio"] = df.apply(calc_ratio, axis=1)
+    # Up day: buyers took the extra volume plus half of yesterday's;
+    # down day: the same share went to sellers. Flat (or unknown) close = 0.5.
+    flow = (df["volume"] - df["prev_vol"] + 0.5 * df["prev_vol"]).clip(lower=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = flow / df["volume"]
+    df["buy_ratio"] = np.select(
+        [
+            df["prev_close"].isna() | df["prev_vol"].isna() | (df["volume"] == 0),
+            df["close"] > df["prev_close"],
+            df["close"] < df["prev_close"],
+        ],
+        [np.nan, share.round(3), (1 - share).round(3)],
+        default=0.5,
+    )
     return df
 
-# === RUNNER ===
-conn = sqlite3.connect(DB_PATH)
-df = pd.read_sql("SELECT * FROM equities", conn)
 
-# Apply to all companies
-df_with_ratio = estimate_buy_sell_volume(df)
+def buy_ratio_range(conn, start, end=None, names=None):
+    """buy_ratio for rows dated [start, end], without touching the stored table.
+
+    Each stock's last row before `start` is read too, so the first day in the
+    range still has a previous close/volume to compare with.
+    """
+    filters, params = ["date >= ?"], [start]
+    if end is not None:
+        filters.append("date <= ?")
+        params.append(end)
+    name_filter, name_params = "", []
+    if names:
+        name_filter = f" AND name IN ({', '.join('?' for _ in names)})"
+        name_params = list(names)
+
+    df = pd.read_sql(
+        f"""
+        SELECT * FROM equities
+        WHERE {' AND '.join(filters)}{name_filter}
+        UNION ALL
+        SELECT e.* FROM equities e
+        JOIN (
+            SELECT name, MAX(date) AS date FROM equities
+            WHERE date < ?{name_filter}
+            GROUP BY name
+        ) seed ON seed.name = e.name AND seed.date = e.date
+        """,
+        conn,
+        params=params + name_params + [start] + name_params,
+    )
+    df["date"] = pd.to_datetime(df["date"])
+    df = estimate_buy_sell_volume(df)
+    df = df[df["date"] >= pd.to_datetime(start)]
+    df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+    return df.reset_index(drop=True)
 
-# Option 1: Save as a new table
-df_with_ratio.to_sql("buy_ratio_signals", conn, if_exists="replace", index=False)
 
-# Option 2: Merge into signals table if you already use one
-# df_signals = pd.read_sql("SELECT * FROM signals", conn)
-# merged = df_signals.merge(df_with_ratio[["name", "date", "buy_ratio"]], on=["name", "date"], how="left")
-# merged.to_sql("signals", conn, if_exists="replace", index=False)
+def update_buy_ratios(conn, rebuild=False):
+    """Append rows newer than the table's last date; returns the rows written."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE_NAME,)
+    ).fetchone()
+    last_date = None
+    if exists and not rebuild:
+        last_date = conn.execute(f"SELECT MAX(date) FROM {TABLE_NAME}").fetchone()[0]
+
+    if last_date is None:
+        df = estimate_buy_sell_volume(load_equities(DB_PATH))
+        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+        df.to_sql(TABLE_NAME, conn, if_exists="replace", index=False)
+        return df
+
+    # Redo the last stored day too: scraper.py may have replaced it
+    df = buy_ratio_range(conn, last_date)
+    table_cols = [row[1] for row in conn.execute(f"PRAGMA table_info({TABLE_NAME})")]
+    df = df[[c for c in df.columns if c in table_cols]]
+    with conn:
+        conn.execute(f"DELETE FROM {TABLE_NAME} WHERE date >= ?", (last_date,))
+        df.to_sql(TABLE_NAME, conn, if_exists="append", index=False)
+    return df
+
+
+# === RUNNER ===
+if __name__ == "__main__":
+    conn = connect(DB_PATH)
+    written = update_buy_ratios(conn, rebuild="--rebuild" in sys.argv)
+
+    # Option 2: Merge into signals table if you already use one
+    # df_signals = pd.read_sql("SELECT * FROM signals", conn)
+    # merged = df_signals.merge(written[["name", "date", "buy_ratio"]], on=["name", "date"], how="left")
+    # merged.to_sql("signals", conn, if_exists="replace", index=False)
 
-conn.close()
-print("✅ Buy ratios calculated and saved.")
+    conn.close()
+    print(f"✅ Buy ratios calculated and saved ({len(written)} rows).")
@@ -1,10 +1,10 @@
-import sqlite3
+from db import bulk_update, connect
 import pandas as pd
 
 DB_PATH = "data/ngx_equities.db"
 
 # Connect to DB
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH)
 
 # Step 1: Load all rows where change_pct is NULL or 0 (not already filled)
 query = """
@@ -27,16 +27,6 @@ else:
     df["change_pct"] = df["change_pct"].round(2)
 
     # Step 3: Update DB using rowid
-    for _, row in df.iterrows():
-        conn.execute(
-            """
-            UPDATE equities
-            SET change_pct = ?
-            WHERE rowid = ?
-        """,
-            (row["change_pct"], row["rowid"]),
-        )
-
-    conn.commit()
+    bulk_update(conn, "equities", df, ["rowid"], ["change_pct"])
     conn.close()
     print(f"✅ Updated {len(df)} rows with calculated change_pct.")
@@ -0,0 +1,185 @@
+# check_apt_scraper.py
+"""Run apt_scraper's backfill against a local http.server stand-in.
+
+Serves generated daily price pages from 127.0.0.1 (one date answers 503
+once to exercise the retry, one is a holiday page with no rows, one is a
+404) and backfills a scratch copy of the equities schema. Checks that the
+stored rows match the pages, that existing dates are skipped, that --force
+overwrites them, and that equity_features matches a full recompute after
+the backfill lands before the existing history.
+
+    python check_apt_scraper.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import apt_scraper
+from db import connect
+from equity_features import FEATURE_COLUMNS, compute_features, update_features
+
+STOCKS = ["ACCESSCORP", "DANGCEM", "GTCO", "MTNN", "ZENITHBANK"]
+EXISTING = ["2025-08-11", "2025-08-12"]  # already in the scratch DB
+BACKFILL = ["2025-08-04", "2025-08-05", "2025-08-06", "2025-08-07", "2025-08-08"]
+FLAKY = "2025-08-05"  # 503 on the first request
+HOLIDAY = "2025-08-06"  # page without price rows
+MISSING = "2025-08-07"  # 404
+
+
+def page_rows(date_str, bump=0.0):
+    """Deterministic (name, open, close, high, low, trades, volume, value) per stock."""
+    seed = int(date_str.replace("-", ""))
+    rows = []
+    for i, name in enumerate(STOCKS):
+        open_ = round(10 + i + (seed % 7) * 0.1, 2)
+        close = round(open_ * 1.02 + bump, 2)
+        volume = 1000 * (i + 1) + seed % 100
+        rows.append((name, open_, close, close + 0.1, open_ - 0.1, 10 + i, volume, volume * close))
+    return rows
+
+
+def page_html(rows):
+    cells = "".join(
+        f"<tr><th>{name}</th><td>{o:,.2f}</td><td>{c:,.2f}</td><td>{h:,.2f}</td>"
+        f"<td>{lo:,.2f}</td><td>0.00</td><td>{t:,}</td><td>{v:,}</td><td>{val:,.2f}</td></tr>"
+        for name, o, c, h, lo, t, v, val in rows
+    )
+    return (
+        "<html><body><table><tr><th>Company</th><th>Open</th><th>Close</th></tr>"
+        f"{cells}</table></body></html>"
+    )
+
+
+class StandIn(BaseHTTPRequestHandler):
+    bump = 0.0
+    served = {}
+
+    def do_GET(self):
+        date_str = parse_qs(urlparse(self.path).query).get("date", [""])[0]
+        hits = StandIn.served[date_str] = StandIn.served.get(date_str, 0) + 1
+        if date_str == MISSING:
+            status, body = 404, "not found"
+        elif date_str == FLAKY and hits == 1:
+            status, body = 503, "busy"
+        elif date_str == HOLIDAY:
+            status, body = 200, page_html([])
+        else:
+            status, body = 200, page_html(page_rows(date_str, StandIn.bump))
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def scratch_db(path):
+    conn = connect(path)
+    conn.execute(
+        """
+        CREATE TABLE equities (
+            name TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL,
+            previous_close REAL, trades INTEGER, volume INTEGER, value REAL,
+            change_pct REAL, PRIMARY KEY (name, date)
+        )
+        """
+    )
+    old_prices = [
+        (name, d, o - 1, h - 1, lo - 1, c - 1, t, v, val)
+        for d in EXISTING
+        for name, o, c, h, lo, t, v, val in page_rows(d)
+    ]
+    apt_scraper.store_day(conn, old_prices)
+    return conn
+
+
+def stored(conn, dates):
+    placeholders = ", ".join("?" for _ in dates)
+    return pd.read_sql(
+        f"SELECT name, date, open, close, high, low, trades, volume, value FROM equities "
+        f"WHERE date IN ({placeholders}) ORDER BY date, name",
+        conn,
+        params=dates,
+    )
+
+
+def expected(dates, bump=0.0):
+    return pd.DataFrame(
+        [
+            (name, d, o, c, h, lo, t, v, val)
+            for d in dates
+            for name, o, c, h, lo, t, v, val in page_rows(d, bump)
+        ],
+        columns=["name", "date", "open", "close", "high", "low", "trades", "volume", "value"],
+    )
+
+
+def same(got, want):
+    if len(got) != len(want):
+        return False
+    return np.allclose(got.iloc[:, 2:].astype(float), want.iloc[:, 2:].astype(float)) and (
+        got.iloc[:, :2].to_numpy() == want.iloc[:, :2].to_numpy()
+    ).all()
+
+
+def features_match(conn):
+    inc = pd.read_sql("SELECT * FROM equity_features ORDER BY name, date", conn)
+    ref = compute_features(pd.read_sql("SELECT * FROM equities", conn))
+    ref = ref.sort_values(["name", "date"]).reset_index(drop=True)
+    if len(inc) != len(ref):
+        return False
+    for col in FEATURE_COLUMNS:
+        a = pd.to_numeric(inc[col], errors="coerce").astype(float).to_numpy()
+        b = ref[col].astype(float).replace([np.inf, -np.inf], np.nan).to_numpy()
+        if not np.allclose(a, b, equal_nan=True):
+            return False
+    return True
+
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def run(conn, base_url, dates, force=False):
+    dates = apt_scraper.dates_to_fetch(conn, dates, force)
+    return asyncio.run(apt_scraper.backfill(dates, conn, base_url, 4, 0.05, force))
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/nse-daily-price.php"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = scratch_db(os.path.join(tmp, "ngx_equities.db"))
+        # Features exist for the current history before the backfill lands in front of it
+        update_features(conn)
+
+        run(conn, base_url, BACKFILL + EXISTING)
+        filled = [d for d in BACKFILL if d not in (HOLIDAY, MISSING)]
+        ok = check("backfilled pages stored as served", same(stored(conn, filled), expected(filled)))
+        ok = check("holiday and 404 dates store nothing", stored(conn, [HOLIDAY, MISSING]).empty) and ok
+        ok = check(f"{FLAKY} retried after a 503", StandIn.served.get(FLAKY) == 2) and ok
+        ok = check("existing dates skipped", all(d not in StandIn.served for d in EXISTING)) and ok
+        ok = check("equity_features refolded after the backfill", features_match(conn)) and ok
+
+        StandIn.bump = 0.5
+        run(conn, base_url, EXISTING, force=True)
+        overwritten = same(stored(conn, EXISTING), expected(EXISTING, 0.5))
+        ok = check("--force overwrites existing dates", overwritten) and ok
+        count = conn.execute("SELECT COUNT(*) FROM equities").fetchone()[0]
+        ok = check("no duplicate rows", count == len(STOCKS) * (len(filled) + len(EXISTING))) and ok
+        ok = check("equity_features refolded after --force", features_match(conn)) and ok
+        conn.close()
+
+    server.shutdown()
+    sys.exit(0 if ok else 1)
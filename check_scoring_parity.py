@@ -0,0 +1,132 @@
+# check_scoring_parity.py
+"""Check that scoring.score_signals() matches the row-wise score_row().
+
+Runs on a randomized frame full of edge cases (NaNs, flat candles, limit-up
+streaks, every memory combination) and, if the database has an
+equity_features table, on the real feature history as well.
+
+    python check_scoring_parity.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from db import connect
+from scoring import decode_reasons, score_row, score_signals
+
+DB_PATH = "data/ngx_equities.db"
+MEMORY_CHOICES = [
+    "⚠️ Setup Detected",
+    "👀 Watchlist Setup",
+    "📈 Progressing Setup",
+    "Institutional Accumulation",
+    "🚨 Limit-Up Watch",
+]
+
+
+def random_frame(n=20_000, seed=7):
+    rng = np.random.default_rng(seed)
+    names = [f"STOCK{i}" for i in range(200)]
+    open_ = rng.choice([1.0, 2.0, 5.0, 10.0], n) * rng.uniform(0.9, 1.1, n)
+    close = np.where(rng.random(n) < 0.1, open_, open_ * rng.uniform(0.9, 1.1, n))
+    high = np.maximum(open_, close) * rng.uniform(1.0, 1.05, n)
+    low = np.minimum(open_, close) * rng.uniform(0.95, 1.0, n)
+    flat = rng.random(n) < 0.05
+    high[flat] = low[flat] = open_[flat] = close[flat]
+
+    df = pd.DataFrame(
+        {
+            "name": rng.choice(names, n),
+            "open": open_,
+            "close": close,
+            "high": high,
+            "low": low,
+            "volume": rng.integers(0, 2_000_000, n).astype(float),
+            "volume_5_avg": rng.integers(1, 1_000_000, n).astype(float),
+            "trades": rng.integers(0, 200, n).astype(float),
+            "avg_trades_5": rng.uniform(1, 100, n),
+            "value": rng.choice([5e6, 2e7, 8e7], n) * rng.uniform(0.5, 1.5, n),
+            "volume_uptrend": rng.random(n) < 0.3,
+            "inst_accum_30": np.where(rng.random(n) < 0.1, np.nan, rng.integers(0, 20, n)),
+            "stealth_accum": rng.random(n) < 0.2,
+            "limit_up_streak": rng.choice([0, 0, 0, 0, 1, 2, 3, 4], n),
+        }
+    )
+    for col in ["volume", "trades", "avg_trades_5", "value"]:
+        df.loc[rng.random(n) < 0.01, col] = np.nan
+
+    memory = {
+        name: list(rng.choice(MEMORY_CHOICES, rng.integers(0, 5)))
+        for name in names
+    }
+    last_close = np.where(rng.random(n) < 0.5, np.nan, close * rng.uniform(0.97, 1.03, n))
+    last_action = rng.choice([None, "BUY", "WATCH"], n)
+    return df, memory, last_close, last_action
+
+
+def db_frame():
+    if not os.path.exists(DB_PATH):
+        return None
+    from equity_features import load_features
+
+    conn = connect(DB_PATH)
+    try:
+        features = load_features(conn)
+        equities = pd.read_sql(
+            "SELECT name, date, open, high, low, close, volume, trades, value FROM equities",
+            conn,
+        )
+    except Exception as e:
+        print(f"ℹ️ Skipping DB check: {e}")
+        return None
+    finally:
+        conn.close()
+    equities["date"] = pd.to_datetime(equities["date"])
+    df = equities.merge(features, on=["name", "date"])
+    df = df[df["volume_5_avg"].notna()].reset_index(drop=True)
+    return df, {}, np.full(len(df), np.nan), np.full(len(df), None)
+
+
+def check(label, df, memory, last_close, last_action):
+    started = time.perf_counter()
+    expected = []
+    for i, (_, row) in enumerate(df.iterrows()):
+        row = row.copy()
+        row["memory"] = memory.get(row["name"], [])
+        lc = None if np.isnan(last_close[i]) else last_close[i]
+        expected.append(score_row(row, lc, last_action[i]))
+    row_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = score_signals(df, memory, last_close, last_action)
+    batch_time = time.perf_counter() - started
+
+    mismatches = 0
+    for i, (score, reasons, signal, action) in enumerate(expected):
+        got = (
+            int(result["score"][i]),
+            decode_reasons(result["reasons"][i], result["limit_up_streak"][i]),
+            result["signal"][i],
+            result["action"][i],
+        )
+        if got != (score, reasons, signal, action):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"❌ Row {i}: row-wise={(score, reasons, signal, action)} batch={got}")
+
+    print(
+        f"{'✅' if not mismatches else '❌'} {label}: {len(df)} rows, "
+        f"{mismatches} mismatches | row-wise {row_time:.2f}s, batch {batch_time:.3f}s"
+    )
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    ok = check("randomized", *random_frame())
+    real = db_frame()
+    if real is not None:
+        ok = check("equity_features", *real) and ok
+    sys.exit(0 if ok else 1)
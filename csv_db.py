@@ -1,27 +1,18 @@
-import pandas as pd
-import sqlite3
+from db import connect
+from sector_cube import update_sector_cube
+from symbols import SYMBOLS_CSV, sync_symbols
 
-csv_path = "stocks_with_main_and_subsector.csv"
-df_baseline = pd.read_csv(csv_path)
-df_baseline["symbol"] = df_baseline["symbol"].str.strip().str.lower()
+conn = connect("data/ngx_equities.db")
 
-conn = sqlite3.connect("data/ngx_equities.db")
-cursor = conn.cursor()
+# Sectors live in the symbols table now: re-classifying is one upsert per symbol
+changed, dropped = sync_symbols(conn, SYMBOLS_CSV)
+if dropped:
+    print(f"🧹 Moved {', '.join(dropped)} off equities into symbols")
+print(f"🏷️ {len(changed)} symbol(s) re-classified")
 
-for _, row in df_baseline.iterrows():
-    name = row["symbol"]
-    sector = row["main_sector"]
-    subsector = row["sub_sector"]
-
-    cursor.execute("""
-        UPDATE equities
-        SET
-            main_sector = ?,
-            sub_sector = ?
-        WHERE LOWER(name) LIKE ?
-    """, (sector, subsector, f"%{name}%"))
-
-conn.commit()
+# sector_daily stores sector names, so it only needs rebuilding when they moved
+if changed or dropped:
+    update_sector_cube(conn, rebuild=True)
 conn.close()
 
-print("✅ Successfully updated today's equities with sector info.")
+print("✅ Successfully updated symbols with sector info.")
@@ -0,0 +1,193 @@
+# dashboard_snapshot.py
+"""Materialize app.py's datasets to Arrow files under data/snapshots/.
+
+Runs as the last stage of both pipelines. Each run writes
+data/snapshots/<YYYYmmdd-HHMMSS>/<dataset>.arrow (uncompressed Arrow IPC, so
+the dashboard memory-maps it instead of parsing) plus manifest.json, then
+points data/snapshots/LATEST at the new folder. The manifest records a
+fingerprint (row count, max rowid, db.track_changes() version) of every
+table a dataset reads; dashboard_data.dataset() serves the snapshot while
+those still match and falls back to querying SQLite once a later write
+(including an UPDATE or a same-size delete and re-insert) changes them.
+
+    python dashboard_snapshot.py
+"""
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from db import connect, table_version, track_changes
+
+# === CONFIG ===
+DB_PATH = "data/ngx_equities.db"
+SNAPSHOT_DIR = os.path.join("data", "snapshots")
+LATEST_FILE = os.path.join(SNAPSHOT_DIR, "LATEST")
+KEEP_SNAPSHOTS = 3
+MINI_CHART_DAYS = 15
+
+# name: (query, tables it reads)
+DATASETS = {
+    "accumulation": (
+        "SELECT * FROM accumulation_signals_3day",
+        ["accumulation_signals_3day"],
+    ),
+    "weekly_intel": (
+        """
+        SELECT * FROM weekly_intel
+        WHERE score >= 1 and avg_change_1 > avg_change_0 and volume_1 > volume_0 and close_end_1 > close_start_1 and date_generated >= '2025-09-01'
+        ORDER BY name ASC
+        """,
+        ["weekly_intel"],
+    ),
+    "weekly_intel_short": (
+        """
+        SELECT * FROM weekly_intel_short
+        WHERE score >= 1 and avg_change_1 > avg_change_0 and volume_1 > volume_0 and close_end_1 > close_start_1 and date_generated >= '2025-11-01'
+        ORDER BY name ASC
+        """,
+        ["weekly_intel_short"],
+    ),
+    # Price-change, divergence-by-date and sector-stock views
+    "equities_recent": (
+        """
+        SELECT e.name, e.date, e.open, e.close, e.volume, e.value, e.change_pct, s.main_sector
+        FROM equities e
+        LEFT JOIN symbols s ON s.symbol_id = e.symbol_id
+        WHERE e.date >= '2025-09-01'
+        ORDER BY e.date DESC
+        """,
+        ["equities", "symbols"],
+    ),
+    # Last MINI_CHART_DAYS traded days per stock for the Stock Trend charts
+    "recent_series": (
+        f"""
+        SELECT name, date, Price, Volume, Value FROM (
+            SELECT name, date,
+                   MAX(close) AS Price, SUM(volume) AS Volume, SUM(value) AS Value,
+                   ROW_NUMBER() OVER (PARTITION BY name ORDER BY date DESC) AS rn
+            FROM equities
+            WHERE volume > 0
+            GROUP BY name, date
+        )
+        WHERE rn <= {MINI_CHART_DAYS}
+        """,
+        ["equities"],
+    ),
+    "sector_daily": ("SELECT * FROM sector_daily", ["sector_daily"]),
+}
+
+
+def table_fingerprints(conn, tables):
+    """{table: [row count, max rowid, change version]}, None for a missing table.
+
+    The version is None while the table has no change triggers (e.g. after a
+    DROP/replace), so such a fingerprint never matches a snapshot's.
+    """
+    prints = {}
+    for table in tables:
+        try:
+            count, max_rowid = conn.execute(
+                f"SELECT COUNT(*), MAX(rowid) FROM {table}"
+            ).fetchone()
+            prints[table] = [count, max_rowid, table_version(conn, table)]
+        except Exception:
+            prints[table] = None
+    return prints
+
+
+def track_tables(conn):
+    """Install change triggers on every table a dataset reads."""
+    for table in sorted({t for _, tables in DATASETS.values() for t in tables}):
+        try:
+            if table_version(conn, table) is None:
+                track_changes(conn, table)
+        except sqlite3.Error:
+            pass  # missing table: its dataset is skipped by write_snapshot()
+
+
+def snapshot_path(version, name=None):
+    folder = os.path.join(SNAPSHOT_DIR, version)
+    return folder if name is None else os.path.join(folder, f"{name}.arrow")
+
+
+def latest_version():
+    try:
+        with open(LATEST_FILE) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(version):
+    with open(os.path.join(snapshot_path(version), "manifest.json")) as f:
+        return json.load(f)
+
+
+def read_dataset(version, name):
+    """Memory-map one dataset of a snapshot as an Arrow table (no copy)."""
+    return feather.read_table(snapshot_path(version, name), memory_map=True)
+
+
+def write_snapshot(conn):
+    """Write every dataset, then switch LATEST to the new folder. Returns its version."""
+    version = datetime.now().strftime("%Y%m%d-%H%M%S")
+    folder = snapshot_path(version)
+    os.makedirs(folder, exist_ok=True)
+    manifest = {"created": datetime.now().isoformat(timespec="seconds"), "datasets": {}}
+    track_tables(conn)
+
+    # One read transaction: every dataset and fingerprint sees the same data
+    conn.execute("BEGIN")
+    try:
+        for name, (query, tables) in DATASETS.items():
+            started = time.perf_counter()
+            try:
+                df = pd.read_sql(query, conn)
+            except Exception as e:
+                print(f"⚠️ {name}: skipped ({e})")
+                continue
+            feather.write_feather(
+                pa.Table.from_pandas(df, preserve_index=False),
+                snapshot_path(version, name),
+                compression="uncompressed",
+            )
+            manifest["datasets"][name] = {
+                "rows": len(df),
+                "tables": table_fingerprints(conn, tables),
+            }
+            print(f"📦 {name}: {len(df)} rows in {time.perf_counter() - started:.2f}s")
+    finally:
+        conn.rollback()
+
+    with open(os.path.join(folder, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    tmp = LATEST_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, LATEST_FILE)
+    return version
+
+
+def prune_snapshots(keep=KEEP_SNAPSHOTS):
+    versions = sorted(
+        d for d in os.listdir(SNAPSHOT_DIR) if os.path.isdir(os.path.join(SNAPSHOT_DIR, d))
+    )
+    for version in versions[:-keep]:
+        # A running dashboard may still have the files mapped (Windows won't
+        # delete them); they are retried on the next run
+        shutil.rmtree(snapshot_path(version), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    conn = connect(DB_PATH)
+    version = write_snapshot(conn)
+    conn.close()
+    prune_snapshots()
+    print(f"✅ Dashboard snapshot {version} written to {SNAPSHOT_DIR}")
@@ -0,0 +1,275 @@
+# db.py
+"""One place to open data/ngx_equities.db.
+
+connect() applies the same pragmas everywhere: WAL so Streamlit can read
+while the analyser writes, synchronous=NORMAL (safe under WAL), a larger page
+cache, memory-mapped reads and a busy timeout instead of instant "database
+is locked" errors. pooled_connection() hands out reusable connections for
+app.py's reruns. Every statement is timed; queries slower than
+SLOW_QUERY_MS are appended to slow_queries.log, and add_query_hook() lets
+scripts attach their own timing callbacks. bulk_update() applies a whole
+DataFrame of changes with one set-based UPDATE instead of one per row.
+track_changes() installs triggers that bump a per-table version on every
+INSERT, UPDATE and DELETE (and log which dates changed), so caches built
+from a table can tell an in-place rewrite from "nothing happened".
+"""
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# === CONFIG ===
+DB_PATH = "data/ngx_equities.db"
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # negative = KiB, so ~64 MB of page cache
+    "mmap_size": 268435456,  # 256 MB
+    "busy_timeout": 15000,  # ms to wait on a writer before raising "locked"
+    "temp_store": "MEMORY",
+}
+
+POOL_SIZE = 4
+SLOW_QUERY_MS = 500
+SLOW_QUERY_LOG = "slow_queries.log"
+VERSION_TABLE = "table_versions"
+CHANGES_TABLE = "table_changes"
+# Date column whose changed values track_changes() logs, per table. Whoever
+# installs a table's triggers first fixes what they log, so it lives here.
+CHANGE_DATE_COLUMNS = {"equities": "date"}
+
+
+# === TIMING HOOKS ===
+_query_hooks = []
+
+
+def add_query_hook(hook):
+    """Call hook(sql, elapsed_ms) after every statement on a connect() connection."""
+    _query_hooks.append(hook)
+    return hook
+
+
+def remove_query_hook(hook):
+    if hook in _query_hooks:
+        _query_hooks.remove(hook)
+
+
+def log_slow_query(sql, elapsed_ms):
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+    try:
+        with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+            f.write(
+                f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {elapsed_ms:.0f} ms - "
+                f"{' '.join(sql.split())[:500]}\n"
+            )
+    except OSError:
+        pass
+
+
+add_query_hook(log_slow_query)
+
+
+def _timed(method, sql, *args):
+    started = time.perf_counter()
+    try:
+        return method(sql, *args)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for hook in list(_query_hooks):
+            hook(sql, elapsed_ms)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, *args):
+        return _timed(super().execute, sql, *args)
+
+    def executemany(self, sql, *args):
+        return _timed(super().executemany, sql, *args)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3.Connection whose statements (including pandas' cursors) are timed."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        return _timed(super().execute, sql, *args)
+
+    def executemany(self, sql, *args):
+        return _timed(super().executemany, sql, *args)
+
+
+# === FACTORY ===
+def connect(db_path=DB_PATH, **kwargs):
+    """Drop-in for sqlite3.connect() with the project pragmas applied."""
+    kwargs.setdefault("factory", TimedConnection)
+    conn = sqlite3.connect(db_path, **kwargs)
+    for pragma, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+    return conn
+
+
+# === POOL ===
+class ConnectionPool:
+    """Thread-safe pool of connect() connections for long-lived processes."""
+
+    def __init__(self, db_path=DB_PATH, size=POOL_SIZE):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect(self.db_path, check_same_thread=False)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except sqlite3.Error:
+            # Don't hand a connection in an unknown state to the next caller
+            conn.close()
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_PATH):
+    with _pools_lock:
+        if db_path not in _pools:
+            _pools[db_path] = ConnectionPool(db_path)
+        return _pools[db_path]
+
+
+def pooled_connection(db_path=DB_PATH):
+    """with pooled_connection() as conn: ... (the connection goes back to the pool)."""
+    return get_pool(db_path).connection()
+
+
+# === BULK UPDATE ===
+def bulk_update(conn, table, df, key_cols, set_cols, key_exprs=None):
+    """UPDATE `table` from the rows of `df`, matched on `key_cols`.
+
+    The rows are staged into a temp table with one executemany and applied
+    with a single UPDATE ... FROM join, all in one transaction. `key_exprs`
+    maps a key column to the expression it is compared with on the target
+    side, e.g. {"name": "LOWER(equities.name)"}. When `df` repeats a key the
+    last row wins, as it would with one UPDATE per row. Works on any sqlite3
+    connection (SQLite 3.33+). Returns the number of rows updated.
+    """
+    key_exprs = key_exprs or {}
+    cols = list(key_cols) + [c for c in set_cols if c not in key_cols]
+    staged = df[cols].drop_duplicates(subset=list(key_cols), keep="last")
+    rows = staged.astype(object).where(staged.notna(), None)
+    stage = f"_bulk_{table}"
+
+    started = time.perf_counter()
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS temp.{stage}")
+        conn.execute(f"CREATE TEMP TABLE {stage} ({', '.join(cols)})")
+        conn.execute(f"CREATE INDEX temp.idx{stage} ON {stage} ({', '.join(key_cols)})")
+        conn.executemany(
+            f"INSERT INTO {stage} VALUES ({', '.join('?' for _ in cols)})",
+            rows.itertuples(index=False, name=None),
+        )
+        updated = conn.execute(
+            f"""
+            UPDATE {table}
+            SET {', '.join(f"{c} = s.{c}" for c in set_cols)}
+            FROM {stage} AS s
+            WHERE {' AND '.join(f"{key_exprs.get(k, f'{table}.{k}')} = s.{k}" for k in key_cols)}
+            """
+        ).rowcount
+        conn.execute(f"DROP TABLE temp.{stage}")
+    elapsed = time.perf_counter() - started
+    print(f"🔄 {table}: {updated} row(s) updated from {len(staged)} staged in {elapsed:.2f}s")
+    return updated
+
+
+# === CHANGE TRACKING ===
+def _trigger_names(table):
+    return [f"trg_{table}_version_{event}" for event in ("insert", "update", "delete")]
+
+
+def track_changes(conn, table):
+    """Triggers that bump table_versions.version for `table` on every write.
+
+    For a table in CHANGE_DATE_COLUMNS, each write also records the row's date (old and new for
+    an UPDATE) in table_changes with the version that touched it, so a reader
+    can ask changed_since() for the earliest date it has to re-read.
+    """
+    date_col = CHANGE_DATE_COLUMNS.get(table)
+    with conn:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} "
+            "(name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} "
+            "(name TEXT, date TEXT, version INTEGER NOT NULL, PRIMARY KEY(name, date))"
+        )
+        conn.execute(f"INSERT OR IGNORE INTO {VERSION_TABLE} VALUES (?, 0)", (table,))
+
+        def body(*rows):
+            sql = f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE name = '{table}';"
+            for row in rows if date_col else ():
+                sql += (
+                    f" INSERT OR REPLACE INTO {CHANGES_TABLE} (name, date, version)"
+                    f" SELECT '{table}', {row}.{date_col}, version FROM {VERSION_TABLE}"
+                    f" WHERE name = '{table}';"
+                )
+            return sql
+
+        events = {"INSERT": body("NEW"), "UPDATE": body("OLD", "NEW"), "DELETE": body("OLD")}
+        for trigger, (event, sql) in zip(_trigger_names(table), events.items()):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON {table} "
+                f"BEGIN {sql} END"
+            )
+
+
+def table_version(conn, table):
+    """`table`'s change counter, or None while its triggers are missing
+    (never tracked, or dropped when the table was replaced)."""
+    names = _trigger_names(table)
+    found = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+        f"AND name IN ({', '.join('?' for _ in names)})",
+        names,
+    ).fetchone()[0]
+    if found < len(names):
+        return None
+    row = conn.execute(
+        f"SELECT version FROM {VERSION_TABLE} WHERE name = ?", (table,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def changed_since(conn, table, version):
+    """Earliest date of `table` written after `version`, None if nothing was."""
+    return conn.execute(
+        f"SELECT MIN(date) FROM {CHANGES_TABLE} WHERE name = ? AND version > ?",
+        (table, version),
+    ).fetchone()[0]
@@ -1,10 +1,10 @@
 # deduplicate_and_enforce_pk.py
-import sqlite3
+from db import connect
 import os
 
 DB_PATH = "data/ngx_equities.db"
 
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH)
 cursor = conn.cursor()
 
 print("🛠 Starting deduplication...")
@@ -1,33 +1,108 @@
-import sqlite3
+import sys
+import time
+
+import numpy as np
 import pandas as pd
 
+from db import connect
+from price_store import load_equities
+from shares_history import add_market_cap
+
 # === CONFIG ===
 DB_PATH = "data/ngx_equities.db"  # Modify if needed
+TABLE_NAME = "smart_accumulation_signals"
 WINDOW = 5
 SCORE_THRESHOLD = 3  # Tune this
 
-conn = sqlite3.connect(DB_PATH)
+# python detect_accumulation.py              -> score new dates into smart_accumulation_signals
+# python detect_accumulation.py --rebuild    -> rewrite the whole table
+# python detect_accumulation.py --benchmark  -> compare against the old row-by-row loop
 
-df = pd.read_sql("SELECT * FROM equities", conn)
-conn.close()
 
-# If market_cap not present or empty, calculate it
-if "shares_outstanding" in df.columns:
-    df["market_cap"] = df["close"] * df["shares_outstanding"]
-else:
-    df["market_cap"] = None
+def prepare(df, conn):
+    df = df.sort_values(by=["name", "date"])
 
+    # Point-in-time market cap from shares_outstanding_history (NaN before the first filing)
+    return add_market_cap(df, conn)
 
-# === Preprocessing ===
-df["date"] = pd.to_datetime(df["date"])
-df = df.sort_values(by=["name", "date"])
 
-# === Add market_cap if shares_outstanding is available ===
-if "market_cap" not in df.columns and "shares_outstanding" in df.columns:
-    df["market_cap"] = df["close"] * df["shares_outstanding"]
+def tier_for(score):
+    if score >= 4:
+        return "🚀 Confirmed Buy"
+    elif score == 3:
+        return "🤏 Buy Small"
+    elif score == 2:
+        return "🕵️‍♀️ Watchlist"
+    return None  # No signal this day
+
 
 # === Core Logic ===
 def detect_smart_accumulation(df):
+    """Score every stock-day from WINDOW rows onwards in one vectorized pass.
+
+    Each row contributes one point per condition it meets (measured against
+    its own WINDOW-day averages); the score is the sum over the last WINDOW rows.
+    """
+    df = df.sort_values(by=["name", "date"]).reset_index(drop=True)
+    grouped = df.groupby("name", sort=False)
+
+    def rolling_mean(col):
+        values = pd.to_numeric(df[col], errors="coerce")
+        return values.groupby(df["name"], sort=False).transform(
+            lambda x: x.rolling(WINDOW).mean()
+        )
+
+    volume_avg = rolling_mean("volume")
+    close_avg = rolling_mean("close")
+    trade_avg = rolling_mean("trades")
+    market_cap = pd.to_numeric(df["market_cap"], errors="coerce")
+    marketcap_avg = rolling_mean("market_cap")
+
+    # NaN comparisons are False, matching the skipped conditions in the loop
+    # 1. Flat price near 5-day average
+    flat = (df["close"] - close_avg).abs() <= 0.5
+    # 2. Volume spike vs 5-day average on fewer trades
+    spike = (df["volume"] > 1.5 * volume_avg) & (df["trades"] < 0.7 * trade_avg)
+    # 3. Dip day (flush or shakeout)
+    dip = df["close"] < close_avg * 0.98
+    # 4. Market cap rising steadily (optional)
+    cap_up = market_cap > 1.02 * marketcap_avg
+
+    points = flat.astype(int) + spike.astype(int) + dip.astype(int) + cap_up.astype(int)
+    score = points.groupby(df["name"], sort=False).transform(
+        lambda x: x.rolling(WINDOW).sum()
+    )
+    position = grouped.cumcount()
+    keep = (position >= WINDOW - 1).to_numpy()
+
+    result = pd.DataFrame(
+        {
+            "name": df["name"],
+            "date": df["date"],
+            "close": df["close"],
+            "volume": df["volume"],
+            "volume_avg": volume_avg,
+            "market_cap": market_cap,
+            "marketcap_avg": marketcap_avg,
+            "accumulation_score": score,
+        }
+    )[keep]
+    result["accumulation_score"] = result["accumulation_score"].astype(int)
+    result["accumulation_signal"] = result["accumulation_score"] >= SCORE_THRESHOLD
+    result["signal_tier"] = np.select(
+        [
+            result["accumulation_score"] >= 4,
+            result["accumulation_score"] == 3,
+            result["accumulation_score"] == 2,
+        ],
+        ["🚀 Confirmed Buy", "🤏 Buy Small", "🕵️‍♀️ Watchlist"],
+        default=None,
+    )
+    return result.reset_index(drop=True)
+
+
+def detect_smart_accumulation_loop(df):
+    """Original row-by-row implementation, kept as the benchmark reference."""
     result = []
 
     for name, group in df.groupby("name"):
@@ -37,11 +112,9 @@ def detect_smart_accumulation(df):
         group["volume_avg"] = group["volume"].rolling(WINDOW).mean()
         group["close_avg"] = group["close"].rolling(WINDOW).mean()
         group["trade_avg"] = group["trades"].rolling(WINDOW).mean()
-
-        if "market_cap" in group.columns:
-            group["marketcap_avg"] = group["market_cap"].rolling(WINDOW).mean()
-        else:
-            group["marketcap_avg"] = None
+        group["marketcap_avg"] = (
+            pd.to_numeric(group["market_cap"], errors="coerce").rolling(WINDOW).mean()
+        )
 
         for i in range(WINDOW - 1, len(group)):
             window = group.iloc[i - WINDOW + 1 : i + 1]
@@ -50,52 +123,105 @@ def detect_smart_accumulation(df):
             latest = group.iloc[i]
 
             for _, row in window.iterrows():
-                # 1. Flat price near 5-day average
                 if abs(row["close"] - row["close_avg"]) <= 0.5:
                     score += 1
-
-                # 2. Volume spike vs 5-day average
                 if (row["volume"] > 1.5 * row["volume_avg"] and row["trades"] < 0.7 * row["trade_avg"]):
                     score += 1
-
-                # 3. Dip day (flush or shakeout)
                 if row["close"] < row["close_avg"] * 0.98:
                     score += 1
-
-                # 4. Market cap rising steadily (optional)
                 if pd.notna(row.get("market_cap")) and pd.notna(row.get("marketcap_avg")):
                     if row["market_cap"] > 1.02 * row["marketcap_avg"]:
                         score += 1
 
-            #accumulation_signal = score >= SCORE_THRESHOLD
-            # Tiered signals
-                if score >= 4:
-                    signal_tier = "🚀 Confirmed Buy"
-                elif score == 3:
-                    signal_tier = "🤏 Buy Small"
-                elif score == 2:
-                    signal_tier = "🕵️‍♀️ Watchlist"
-                else:
-                    signal_tier = None  # No signal this day
-
-
             result.append({
                 "name": name,
                 "date": latest["date"],
-                "close": latest["close"],
-                "volume": latest["volume"],
-                "volume_avg": latest["volume_avg"],
-                "market_cap": latest.get("market_cap", None),
-                "marketcap_avg": latest.get("marketcap_avg", None),
                 "accumulation_score": score,
-                "accumulation_signal": score >= SCORE_THRESHOLD,
-                "signal_tier": signal_tier
+                "signal_tier": tier_for(score),
             })
 
-
     return pd.DataFrame(result)
 
+
+# === Save ===
+def ensure_table(conn):
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+            name TEXT,
+            date TEXT,
+            close REAL,
+            volume REAL,
+            volume_avg REAL,
+            market_cap REAL,
+            marketcap_avg REAL,
+            accumulation_score INTEGER,
+            accumulation_signal INTEGER,
+            signal_tier TEXT,
+            PRIMARY KEY (name, date)
+        )
+        """
+    )
+
+
+def save_signals(conn, signals, rebuild=False):
+    """Upsert scored rows; without rebuild only the last stored date onwards."""
+    ensure_table(conn)
+    signals = signals.copy()
+    signals["date"] = pd.to_datetime(signals["date"]).dt.strftime("%Y-%m-%d")
+    signals["accumulation_signal"] = signals["accumulation_signal"].astype(int)
+
+    with conn:
+        if rebuild:
+            conn.execute(f"DELETE FROM {TABLE_NAME}")
+        else:
+            # Re-score the last stored day too: scraper.py may have replaced it
+            last_date = conn.execute(f"SELECT MAX(date) FROM {TABLE_NAME}").fetchone()[0]
+            if last_date is not None:
+                signals = signals[signals["date"] >= last_date]
+
+        cols = list(signals.columns)
+        rows = signals.astype(object).where(signals.notna(), None)
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO {TABLE_NAME} ({', '.join(cols)})
+            VALUES ({', '.join('?' for _ in cols)})
+            """,
+            rows.itertuples(index=False, name=None),
+        )
+    return len(signals)
+
+
+def benchmark(df):
+    started = time.perf_counter()
+    loop = detect_smart_accumulation_loop(df)
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fast = detect_smart_accumulation(df)
+    fast_time = time.perf_counter() - started
+
+    merged = loop.merge(fast, on=["name", "date"], how="outer", suffixes=("_loop", "_fast"))
+    same_score = (merged["accumulation_score_loop"] == merged["accumulation_score_fast"]).all()
+    same_tier = (
+        merged["signal_tier_loop"].fillna("") == merged["signal_tier_fast"].fillna("")
+    ).all()
+    print(f"🐢 Row loop:   {loop_time:.2f}s for {len(loop)} rows")
+    print(f"⚡ Vectorized: {fast_time:.3f}s for {len(fast)} rows ({loop_time / fast_time:.0f}x faster)")
+    print(f"{'✅' if same_score and same_tier else '❌'} Identical scores: {same_score}, tiers: {same_tier}")
+    return same_score and same_tier
+
+
 # === Run & Save ===
-accum_signals = detect_smart_accumulation(df)
-accum_signals.to_csv("smart_accumulation_signals_v2.csv", index=False)
-print(f"✅ Saved {len(accum_signals)} signals to 'smart_accumulation_signals_v2.csv'")
+if __name__ == "__main__":
+    conn = connect(DB_PATH)
+    df = prepare(load_equities(DB_PATH), conn)
+
+    if "--benchmark" in sys.argv:
+        conn.close()
+        sys.exit(0 if benchmark(df) else 1)
+
+    accum_signals = detect_smart_accumulation(df)
+    saved = save_signals(conn, accum_signals, rebuild="--rebuild" in sys.argv)
+    conn.close()
+    print(f"✅ Saved {saved} signals to '{TABLE_NAME}'")
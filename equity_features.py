@@ -0,0 +1,457 @@
+# equity_features.py
+"""Persisted rolling features per (name, date) for the signal engines.
+
+The nightly path only folds rows that are newer than each stock's saved
+trailing state (ring buffers of the last few closes/volumes plus the
+limit-up streak), so extending every window costs O(new rows) instead of
+recomputing the whole history. A stock that gains a row at or before its
+saved state (apt_scraper.py backfill, a corrected re-scrape of an older
+date) is refolded from its first row. Those stocks are found among the
+equities dates written since the last run (db.changed_since), so spotting
+them also scales with new rows rather than with the full history.
+
+    python equity_features.py            # extend features for new dates
+    python equity_features.py --rebuild  # drop and recompute everything
+"""
+import json
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from db import changed_since, connect, table_version, track_changes
+
+# === CONFIG ===
+DB_PATH = "data/ngx_equities.db"
+FEATURES_TABLE = "equity_features"
+STATE_TABLE = "equity_feature_state"
+META_TABLE = "equity_feature_meta"
+
+SHORT_WINDOW = 5
+TREND_WINDOW = 15
+TREND_MIN_PERIODS = 5
+UPTREND_SHIFT = 5
+INST_WINDOW = 30
+INST_MIN_PERIODS = 10
+
+FEATURE_COLUMNS = [
+    "previous_close",
+    "volume_5_avg",
+    "is_spike",
+    "spike_count_5",
+    "avg_trades_5",
+    "price_5_high",
+    "low_5",
+    "volume_15_avg",
+    "volume_uptrend",
+    "inst_footprint",
+    "inst_accum_30",
+    "price_change_15",
+    "volume_change_15",
+    "stealth_accum",
+    "prev_high",
+    "prev_low",
+    "higher_high",
+    "higher_low",
+    "gap_up",
+    "gap_down",
+    "limit_up",
+    "limit_up_streak",
+]
+BOOL_COLUMNS = [
+    "is_spike",
+    "volume_uptrend",
+    "inst_footprint",
+    "stealth_accum",
+    "higher_high",
+    "higher_low",
+    "gap_up",
+    "gap_down",
+    "limit_up",
+]
+INPUT_COLUMNS = ["name", "date", "open", "high", "low", "close", "trades", "volume"]
+
+
+# === VECTORIZED (FULL HISTORY) ===
+def compute_features(df):
+    """Compute every feature over a full equities frame in one grouped pass.
+
+    Same definitions as the nightly fold below; used for replays and rebuilds
+    where the whole history is already in memory.
+    """
+    df = df.sort_values(by=["name", "date"]).copy()
+    g = df.groupby("name", sort=False)
+
+    def rolling(col, window, how, min_periods=1, source=None):
+        grouped = (source if source is not None else g[col])
+        rolled = grouped.rolling(window, min_periods=min_periods)
+        return getattr(rolled, how)().reset_index(level=0, drop=True)
+
+    df["previous_close"] = g["close"].shift(1)
+    df["volume_5_avg"] = rolling("volume", SHORT_WINDOW, "mean")
+    df["is_spike"] = df["volume"] > 1.5 * df["volume_5_avg"]
+    df["spike_count_5"] = rolling(
+        None, SHORT_WINDOW, "sum", source=df.groupby("name", sort=False)["is_spike"]
+    )
+    df["avg_trades_5"] = rolling("trades", SHORT_WINDOW, "mean")
+    df["price_5_high"] = rolling("high", SHORT_WINDOW, "max")
+    df["low_5"] = rolling("low", SHORT_WINDOW, "min")
+
+    df["volume_15_avg"] = rolling("volume", TREND_WINDOW, "mean", TREND_MIN_PERIODS)
+    df["volume_uptrend"] = df["volume_15_avg"] > df.groupby("name", sort=False)[
+        "volume_15_avg"
+    ].shift(UPTREND_SHIFT)
+
+    df["inst_footprint"] = (df["volume"] > df["volume_5_avg"]) & (
+        df["trades"] < df["avg_trades_5"]
+    )
+    df["inst_accum_30"] = rolling(
+        None,
+        INST_WINDOW,
+        "sum",
+        INST_MIN_PERIODS,
+        source=df.groupby("name", sort=False)["inst_footprint"],
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["price_change_15"] = df["close"] / g["close"].shift(TREND_WINDOW) - 1
+        df["volume_change_15"] = df["volume"] / g["volume"].shift(TREND_WINDOW) - 1
+    df["stealth_accum"] = (df["volume_change_15"] > 0.3) & (
+        df["price_change_15"] < 0.05
+    )
+
+    df["prev_high"] = g["high"].shift(1)
+    df["prev_low"] = g["low"].shift(1)
+    df["higher_high"] = df["high"] > df["prev_high"]
+    df["higher_low"] = df["low"] > df["prev_low"]
+
+    df["gap_up"] = df["open"] > df["previous_close"] * 1.02
+    df["gap_down"] = df["open"] < df["previous_close"] * 0.98
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["limit_up"] = (
+            (df["close"] - df["previous_close"]) / df["previous_close"]
+        ).round(4) >= 0.099
+
+    # Length of the current run of limit-up days, reset on every miss
+    run_id = (~df["limit_up"]).groupby(df["name"], sort=False).cumsum()
+    df["limit_up_streak"] = df["limit_up"].astype(int).groupby(
+        [df["name"], run_id], sort=False
+    ).cumsum()
+
+    return df
+
+
+# === INCREMENTAL (NEW ROWS ONLY) ===
+def _nanmean(values, min_periods):
+    values = [v for v in values if v == v]
+    return sum(values) / len(values) if len(values) >= min_periods else np.nan
+
+
+def _nanmax(values):
+    values = [v for v in values if v == v]
+    return max(values) if values else np.nan
+
+
+def _nanmin(values):
+    values = [v for v in values if v == v]
+    return min(values) if values else np.nan
+
+
+def _change(new, old):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return float(np.float64(new) / np.float64(old) - 1)
+
+
+class FeatureState:
+    """Trailing window state for one stock; push() one row at a time."""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.volume = deque(state.get("volume", []), maxlen=TREND_WINDOW)
+        self.trades = deque(state.get("trades", []), maxlen=SHORT_WINDOW)
+        self.high = deque(state.get("high", []), maxlen=SHORT_WINDOW)
+        self.low = deque(state.get("low", []), maxlen=SHORT_WINDOW)
+        self.close = deque(state.get("close", []), maxlen=TREND_WINDOW)
+        self.spikes = deque(state.get("spikes", []), maxlen=SHORT_WINDOW)
+        self.vol15 = deque(state.get("vol15", []), maxlen=UPTREND_SHIFT)
+        self.footprint = deque(state.get("footprint", []), maxlen=INST_WINDOW)
+        self.streak = state.get("streak", 0)
+
+    def to_json(self):
+        return json.dumps(
+            {
+                "volume": list(self.volume),
+                "trades": list(self.trades),
+                "high": list(self.high),
+                "low": list(self.low),
+                "close": list(self.close),
+                "spikes": list(self.spikes),
+                "vol15": list(self.vol15),
+                "footprint": list(self.footprint),
+                "streak": self.streak,
+            }
+        )
+
+    def push(self, open_, high, low, close, trades, volume):
+        previous_close = self.close[-1] if self.close else np.nan
+        prev_high = self.high[-1] if self.high else np.nan
+        prev_low = self.low[-1] if self.low else np.nan
+        # Values from 15 / 5 rows back, before this row is appended
+        close_15 = self.close[0] if len(self.close) == TREND_WINDOW else np.nan
+        volume_15 = self.volume[0] if len(self.volume) == TREND_WINDOW else np.nan
+        vol15_shifted = self.vol15[0] if len(self.vol15) == UPTREND_SHIFT else np.nan
+
+        self.volume.append(volume)
+        self.trades.append(trades)
+        self.high.append(high)
+        self.low.append(low)
+        self.close.append(close)
+
+        volume_5_avg = _nanmean(list(self.volume)[-SHORT_WINDOW:], 1)
+        avg_trades_5 = _nanmean(self.trades, 1)
+        is_spike = bool(volume > 1.5 * volume_5_avg)
+        self.spikes.append(is_spike)
+
+        volume_15_avg = _nanmean(self.volume, TREND_MIN_PERIODS)
+        self.vol15.append(volume_15_avg)
+
+        inst_footprint = bool(volume > volume_5_avg and trades < avg_trades_5)
+        self.footprint.append(inst_footprint)
+
+        price_change_15 = _change(close, close_15)
+        volume_change_15 = _change(volume, volume_15)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            move = np.round(
+                (np.float64(close) - previous_close) / np.float64(previous_close), 4
+            )
+        limit_up = bool(move >= 0.099)
+        self.streak = self.streak + 1 if limit_up else 0
+
+        return {
+            "previous_close": previous_close,
+            "volume_5_avg": volume_5_avg,
+            "is_spike": is_spike,
+            "spike_count_5": float(sum(self.spikes)),
+            "avg_trades_5": avg_trades_5,
+            "price_5_high": _nanmax(self.high),
+            "low_5": _nanmin(self.low),
+            "volume_15_avg": volume_15_avg,
+            "volume_uptrend": bool(volume_15_avg > vol15_shifted),
+            "inst_footprint": inst_footprint,
+            "inst_accum_30": (
+                float(sum(self.footprint))
+                if len(self.footprint) >= INST_MIN_PERIODS
+                else np.nan
+            ),
+            "price_change_15": price_change_15,
+            "volume_change_15": volume_change_15,
+            "stealth_accum": bool(volume_change_15 > 0.3 and price_change_15 < 0.05),
+            "prev_high": prev_high,
+            "prev_low": prev_low,
+            "higher_high": bool(high > prev_high),
+            "higher_low": bool(low > prev_low),
+            "gap_up": bool(open_ > previous_close * 1.02),
+            "gap_down": bool(open_ < previous_close * 0.98),
+            "limit_up": limit_up,
+            "limit_up_streak": self.streak,
+        }
+
+
+# === PERSISTENCE ===
+def ensure_tables(conn):
+    cols = ",\n        ".join(
+        f"{c} {'INTEGER' if c in BOOL_COLUMNS or c == 'limit_up_streak' else 'REAL'}"
+        for c in FEATURE_COLUMNS
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {FEATURES_TABLE} (
+        name TEXT,
+        date TEXT,
+        {cols},
+        PRIMARY KEY (name, date)
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            name TEXT PRIMARY KEY,
+            as_of TEXT,
+            state TEXT
+        )
+        """
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value)"
+    )
+    if table_version(conn, "equities") is None:
+        # Writes made while the triggers were missing went unrecorded, so
+        # the next stale_stocks() has to scan everything
+        track_changes(conn, "equities")
+        with conn:
+            conn.execute(f"DELETE FROM {META_TABLE} WHERE key = 'equities_version'")
+
+
+def _to_db(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def _saved_version(conn):
+    row = conn.execute(
+        f"SELECT value FROM {META_TABLE} WHERE key = 'equities_version'"
+    ).fetchone()
+    return row[0] if row else None
+
+
+def stale_stocks(conn):
+    """Stocks with an equities row at or before their saved as_of but no
+    feature row, i.e. history the saved state never saw.
+
+    Only equities rows dated on or after the earliest date written since the
+    last update_features() run are checked; without a saved version (first
+    run, or triggers reinstalled) the whole table is scanned once.
+    """
+    version = _saved_version(conn)
+    where, params = "", ()
+    if version is not None and table_version(conn, "equities") is not None:
+        since = changed_since(conn, "equities", version)
+        if since is None:
+            return []
+        where, params = "AND e.date >= ?", (since,)
+    return [
+        name
+        for (name,) in conn.execute(
+            f"""
+            SELECT DISTINCT e.name
+            FROM equities e
+            JOIN {STATE_TABLE} s ON s.name = e.name
+            LEFT JOIN {FEATURES_TABLE} f ON f.name = e.name AND f.date = date(e.date)
+            WHERE date(e.date) <= s.as_of AND f.name IS NULL {where}
+            """,
+            params,
+        )
+    ]
+
+
+def update_features(conn, df=None, refold=()):
+    """Extend equity_features with every row newer than the saved state.
+
+    The latest folded row of each stock is always recomputed on the next run
+    (its state is saved *before* that row), so a same-day re-scrape is picked
+    up without a rebuild. Stocks from stale_stocks(), plus any named in
+    `refold` (e.g. older rows overwritten in place), are refolded from
+    scratch. Returns the number of feature rows written.
+    """
+    ensure_tables(conn)
+    # Taken before reading equities: a write landing mid-run is re-checked next time
+    version = table_version(conn, "equities")
+    stale = sorted(set(stale_stocks(conn)) | set(refold))
+    if stale:
+        print(f"ℹ️ Refolding {len(stale)} stock(s) whose older rows changed")
+    states = {
+        name: (as_of, state)
+        for name, as_of, state in conn.execute(
+            f"SELECT name, as_of, state FROM {STATE_TABLE}"
+        )
+        if name not in stale
+    }
+
+    if df is None:
+        cols = ", ".join(f"e.{c}" for c in INPUT_COLUMNS)
+        df = pd.read_sql(
+            f"""
+            SELECT {cols}
+            FROM equities e
+            LEFT JOIN {STATE_TABLE} s ON s.name = e.name
+            WHERE s.as_of IS NULL OR e.date > s.as_of
+               OR e.name IN ({', '.join('?' for _ in stale)})
+            ORDER BY e.name, e.date
+            """,
+            conn,
+            params=stale,
+        )
+    else:
+        df = df[INPUT_COLUMNS].sort_values(by=["name", "date"])
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+
+    feature_rows = []
+    state_rows = []
+    for name, group in df.groupby("name", sort=False):
+        as_of, saved = states.get(name, (None, None))
+        if as_of is not None:
+            group = group[group["date"] > as_of]
+        if group.empty:
+            continue
+
+        state = FeatureState(json.loads(saved) if saved else None)
+        records = group[["date", "open", "high", "low", "close", "trades", "volume"]]
+        records = list(records.itertuples(index=False, name=None))
+        for i, (date, open_, high, low, close, trades, volume) in enumerate(records):
+            if i == len(records) - 1:
+                # Save the state just before the latest row (see docstring)
+                state_rows.append((name, as_of, state.to_json()))
+            features = state.push(open_, high, low, close, trades, volume)
+            feature_rows.append(
+                (name, date, *(_to_db(features[c]) for c in FEATURE_COLUMNS))
+            )
+            as_of = date
+
+    placeholders = ", ".join(["?"] * (len(FEATURE_COLUMNS) + 2))
+    with conn:
+        conn.executemany(
+            f"DELETE FROM {FEATURES_TABLE} WHERE name = ?", [(name,) for name in stale]
+        )
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {FEATURES_TABLE} "
+            f"(name, date, {', '.join(FEATURE_COLUMNS)}) VALUES ({placeholders})",
+            feature_rows,
+        )
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {STATE_TABLE} (name, as_of, state) VALUES (?, ?, ?)",
+            state_rows,
+        )
+        conn.execute(
+            f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES ('equities_version', ?)",
+            (version,),
+        )
+    return len(feature_rows)
+
+
+def rebuild_features(conn):
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS {FEATURES_TABLE}")
+        conn.execute(f"DROP TABLE IF EXISTS {STATE_TABLE}")
+        conn.execute(f"DROP TABLE IF EXISTS {META_TABLE}")
+    return update_features(conn)
+
+
+def load_features(conn, since=None):
+    """Read equity_features back with a parsed date and real booleans."""
+    query = f"SELECT * FROM {FEATURES_TABLE}"
+    params = ()
+    if since is not None:
+        query += " WHERE date >= ?"
+        params = (since,)
+    features = pd.read_sql(query, conn, params=params)
+    features["date"] = pd.to_datetime(features["date"])
+    for col in BOOL_COLUMNS:
+        features[col] = features[col].fillna(0).astype(bool)
+    return features
+
+
+if __name__ == "__main__":
+    conn = connect(DB_PATH)
+    if "--rebuild" in sys.argv:
+        written = rebuild_features(conn)
+    else:
+        written = update_features(conn)
+    conn.close()
+    print(f"✅ {written} feature rows written to '{FEATURES_TABLE}'.")
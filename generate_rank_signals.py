@@ -1,91 +1,126 @@
-import sqlite3
+from db import connect
+import numpy as np
 import pandas as pd
 
+from generate_value_rank import RANK_TABLE, ensure_table as ensure_rank_table
+
 # === CONFIG ===
 DB_PATH = "data/ngx_equities.db"
 WINDOW = 5  # number of rolling days
+SIGNAL_TABLE = "rank_signals"
+SIGNAL_COLUMNS = [
+    ("name", "TEXT"),
+    ("date", "TEXT"),
+    ("rank_5_days_ago", "INTEGER"),
+    ("current_rank", "INTEGER"),
+    ("value_growth_pct", "REAL"),
+    ("value_5_days_ago", "REAL"),
+    ("value_today", "REAL"),
+    ("signal", "TEXT"),
+]
 
-# === Connect to DB ===
-conn = sqlite3.connect(DB_PATH)
-
-# === Get last N days of value_rank_history ===
-df = pd.read_sql_query(
-    f"""
-    SELECT * FROM value_rank_history
-    WHERE date IN (
-        SELECT DISTINCT date FROM value_rank_history
-        ORDER BY date DESC
-        LIMIT {WINDOW}
-    )
-""",
-    conn,
-)
-
-df["date"] = pd.to_datetime(df["date"])
-df.sort_values(by=["name", "date"], inplace=True)
-
-# === Generate signals ===
-signals = []
-
-for name, group in df.groupby("name"):
-    if len(group) < WINDOW:
-        continue
-
-    group = group.reset_index(drop=True)
-    value_start = group.loc[0, "value"]
-    value_end = group.loc[WINDOW - 1, "value"]
-    rank_start = group.loc[0, "value_rank"]
-    rank_end = group.loc[WINDOW - 1, "value_rank"]
-
-    # Apply filters
-    if value_end < 2 * value_start:
-        continue
-    if rank_end >= rank_start or rank_end >= 15:
-        continue
-    price_ok = all(
-        (row["close"] >= row["open"]) and (row["close"] >= row["previous_close"])
-        for _, row in group.iterrows()
+
+def ensure_signal_table(conn):
+    """Create rank_signals with PRIMARY KEY(name, date), migrating an old table."""
+    existing = conn.execute(f"PRAGMA table_info({SIGNAL_TABLE})").fetchall()
+    if existing and any(pk for *_, pk in existing):
+        return
+    cols = ", ".join(f"{c} {t}" for c, t in SIGNAL_COLUMNS)
+    if not existing:
+        conn.execute(f"CREATE TABLE {SIGNAL_TABLE} ({cols}, PRIMARY KEY(name, date))")
+        return
+
+    print(f"🛠 Migrating {SIGNAL_TABLE} to PRIMARY KEY(name, date)...")
+    names = ", ".join(c for c, _ in SIGNAL_COLUMNS)
+    with conn:
+        conn.execute(f"CREATE TABLE {SIGNAL_TABLE}_new ({cols}, PRIMARY KEY(name, date))")
+        conn.execute(
+            f"INSERT OR REPLACE INTO {SIGNAL_TABLE}_new ({names}) "
+            f"SELECT {names} FROM {SIGNAL_TABLE} WHERE name IS NOT NULL AND date IS NOT NULL "
+            "ORDER BY rowid"
+        )
+        conn.execute(f"DROP TABLE {SIGNAL_TABLE}")
+        conn.execute(f"ALTER TABLE {SIGNAL_TABLE}_new RENAME TO {SIGNAL_TABLE}")
+
+
+def rank_climb_signals(df):
+    """VALUE_BUY_WATCH rows for every date whose WINDOW-day window passes the filters.
+
+    A window is the WINDOW trading dates ending on a row's date; the stock
+    needs a row on each of them, value at least doubling, a rank that improved
+    to inside the top 15, and every close >= open and >= previous close.
+    """
+    df = df.copy()
+    day = {d: i for i, d in enumerate(sorted(df["date"].unique()))}
+    df["day"] = df["date"].map(day)
+    df = df.sort_values(["name", "day"])
+
+    by_name = df.groupby("name")
+    back = WINDOW - 1
+    df["day_start"] = by_name["day"].shift(back)
+    df["value_start"] = by_name["value"].shift(back)
+    df["rank_start"] = by_name["value_rank"].shift(back)
+    price_ok = (df["close"] >= df["open"]) & (df["close"] >= df["previous_close"])
+    df["price_ok"] = (
+        price_ok.astype(float)
+        .groupby(df["name"])
+        .rolling(WINDOW, min_periods=WINDOW)
+        .min()
+        .reset_index(level=0, drop=True)
     )
-    if not price_ok:
-        continue
 
-    # Passed all checks
-    signals.append(
+    passed = df[
+        (df["day"] - df["day_start"] == back)
+        & (df["value"] >= 2 * df["value_start"])
+        & (df["value_rank"] < df["rank_start"])
+        & (df["value_rank"] < 15)
+        & (df["price_ok"] == 1)
+    ]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (passed["value"] - passed["value_start"]) / passed["value_start"] * 100
+    return pd.DataFrame(
         {
-            "name": name,
-            "date": group.loc[WINDOW - 1, "date"].strftime("%Y-%m-%d"),
-            "rank_5_days_ago": rank_start,
-            "current_rank": rank_end,
-            "value_growth_pct": round((value_end - value_start) / value_start * 100, 1),
-            "value_5_days_ago": value_start,
-            "value_today": value_end,
+            "name": passed["name"],
+            "date": passed["date"],
+            "rank_5_days_ago": passed["rank_start"].astype(int),
+            "current_rank": passed["value_rank"].astype(int),
+            "value_growth_pct": growth.round(1),
+            "value_5_days_ago": passed["value_start"],
+            "value_today": passed["value"],
             "signal": "VALUE_BUY_WATCH",
         }
-    )
+    ).sort_values(["date", "current_rank"])
 
-# === Store in SQLite Table: rank_signals
-signals_df = pd.DataFrame(signals)
-
-if not signals_df.empty:
-    conn.execute(
-        """
-    CREATE TABLE IF NOT EXISTS rank_signals (
-        name TEXT,
-        date TEXT,
-        rank_5_days_ago INTEGER,
-        current_rank INTEGER,
-        value_growth_pct REAL,
-        value_5_days_ago REAL,
-        value_today REAL,
-        signal TEXT
-    )
-    """
+
+if __name__ == "__main__":
+    # === Connect to DB ===
+    conn = connect(DB_PATH)
+    ensure_rank_table(conn)
+    ensure_signal_table(conn)
+
+    # === Evaluate every date of value_rank_history at once ===
+    df = pd.read_sql_query(
+        f"SELECT name, date, value, value_rank, open, close, previous_close FROM {RANK_TABLE}",
+        conn,
     )
+    signals_df = rank_climb_signals(df)
 
-    signals_df.to_sql("rank_signals", conn, if_exists="append", index=False)
-    print(f"[✓] {len(signals_df)} signals saved to 'rank_signals'")
+    # === Store in SQLite Table: rank_signals (recomputed dates are replaced)
+    if not df.empty:
+        names = ", ".join(c for c, _ in SIGNAL_COLUMNS)
+        with conn:
+            conn.execute(f"DELETE FROM {SIGNAL_TABLE} WHERE date >= ?", (df["date"].min(),))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {SIGNAL_TABLE} ({names}) "
+                f"VALUES ({', '.join('?' for _ in SIGNAL_COLUMNS)})",
+                signals_df.astype(object).itertuples(index=False, name=None),
+            )
 
-else:
-    print("[ℹ] No qualifying signals today.")
+    latest_date = df["date"].max() if not df.empty else None
+    today = signals_df[signals_df["date"] == latest_date]
+    if not today.empty:
+        print(f"[✓] {len(today)} signals for {latest_date} ({len(signals_df)} in total) saved to '{SIGNAL_TABLE}'")
+    else:
+        print("[ℹ] No qualifying signals today.")
 
-conn.close()
+    conn.close()
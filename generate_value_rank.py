@@ -1,59 +1,114 @@
-import sqlite3
-import pandas as pd
-from datetime import datetime
+# generate_value_rank.py
+"""Daily traded-value ranks, kept in value_rank_history.
+
+One row per (name, date) for every stock that traded (value > 0): value_rank
+is RANK() OVER (PARTITION BY date ORDER BY value DESC) and previous_close is
+LAG(close) over the stock's earlier rows. Every date the table lacks (plus its
+latest date, which a re-scrape may have replaced) is ranked by a single
+INSERT ... SELECT, so reruns never duplicate rows.
+
+    python generate_value_rank.py            # rank new dates
+    python generate_value_rank.py --rebuild  # re-rank every date
+"""
+import sys
+
+from db import connect
 
 # === CONFIG ===
 DB_PATH = "data/ngx_equities.db"  # Adjust path as needed
+RANK_TABLE = "value_rank_history"
+RANK_COLUMNS = [
+    ("name", "TEXT"),
+    ("date", "TEXT"),
+    ("value", "REAL"),
+    ("value_rank", "INTEGER"),
+    ("open", "REAL"),
+    ("close", "REAL"),
+    ("previous_close", "REAL"),
+]
 
-# === STEP 1: Connect to DB ===
-conn = sqlite3.connect(DB_PATH)
 
-# === STEP 2: Get Latest Date ===
-latest_date_query = "SELECT MAX(date) FROM equities"
-latest_date = pd.read_sql_query(latest_date_query, conn).iloc[0, 0]
+def ensure_table(conn):
+    """Create value_rank_history with PRIMARY KEY(name, date), migrating an old table."""
+    existing = conn.execute(f"PRAGMA table_info({RANK_TABLE})").fetchall()
+    if existing and any(pk for *_, pk in existing):
+        return
+    cols = ", ".join(f"{c} {t}" for c, t in RANK_COLUMNS)
+    if not existing:
+        conn.execute(f"CREATE TABLE {RANK_TABLE} ({cols}, PRIMARY KEY(name, date))")
+        return
 
-# === STEP 3: Pull Today's Data ===
-query_today = f"""
-SELECT name, date, value, open, close
-FROM equities
-WHERE date = '{latest_date}'
-"""
-df_today = pd.read_sql_query(query_today, conn)
-
-# === STEP 4: Get Previous Close ===
-query_prev = f"""
-SELECT name, close AS previous_close
-FROM equities
-WHERE date = (
-    SELECT MAX(date) FROM equities WHERE date < '{latest_date}'
-)
-"""
-df_prev = pd.read_sql_query(query_prev, conn)
-
-# === STEP 5: Merge Previous Close & Rank ===
-df_today = df_today.merge(df_prev, on="name", how="left")
-df_today["value_rank"] = (
-    df_today["value"].rank(method="min", ascending=False).astype(int)
-)
-
-# === STEP 6: Create Output Table (if not exists) ===
-conn.execute(
-    """
-CREATE TABLE IF NOT EXISTS value_rank_history (
-    name TEXT,
-    date TEXT,
-    value REAL,
-    value_rank INTEGER,
-    open REAL,
-    close REAL,
-    previous_close REAL
-)
-"""
-)
+    # Old append-only table: latest row per (name, date) wins
+    print(f"🛠 Migrating {RANK_TABLE} to PRIMARY KEY(name, date)...")
+    names = ", ".join(c for c, _ in RANK_COLUMNS)
+    with conn:
+        conn.execute(f"CREATE TABLE {RANK_TABLE}_new ({cols}, PRIMARY KEY(name, date))")
+        conn.execute(
+            f"INSERT OR REPLACE INTO {RANK_TABLE}_new ({names}) "
+            f"SELECT {names} FROM {RANK_TABLE} WHERE name IS NOT NULL AND date IS NOT NULL "
+            "ORDER BY rowid"
+        )
+        conn.execute(f"DROP TABLE {RANK_TABLE}")
+        conn.execute(f"ALTER TABLE {RANK_TABLE}_new RENAME TO {RANK_TABLE}")
+
+
+def first_pending_date(conn):
+    """Earliest date missing from value_rank_history, or its latest date if none is missing."""
+    missing = conn.execute(
+        f"SELECT MIN(date) FROM (SELECT date FROM equities EXCEPT SELECT date FROM {RANK_TABLE})"
+    ).fetchone()[0]
+    last_date = conn.execute(f"SELECT MAX(date) FROM {RANK_TABLE}").fetchone()[0]
+    return min((d for d in (missing, last_date) if d is not None), default=None)
+
+
+def update_value_ranks(conn, since=None, rebuild=False):
+    """Re-rank every date >= `since` (default: first_pending_date). Returns rows written."""
+    ensure_table(conn)
+    if rebuild:
+        since = conn.execute("SELECT MIN(date) FROM equities").fetchone()[0]
+    elif since is None:
+        since = first_pending_date(conn)
+    if since is None:
+        return 0
+
+    names = ", ".join(c for c, _ in RANK_COLUMNS)
+    with conn:
+        conn.execute(f"DELETE FROM {RANK_TABLE} WHERE date >= ?", (since,))
+        # Each stock's last row before `since` is read too (as in
+        # buy_ratio_range), so LAG gives the first ranked day the same previous
+        # close a --rebuild would; WHERE runs before RANK(), so only stocks
+        # that traded are ranked
+        cursor = conn.execute(
+            f"""
+            INSERT OR REPLACE INTO {RANK_TABLE} ({names})
+            SELECT name, date, value,
+                   RANK() OVER (PARTITION BY date ORDER BY value DESC),
+                   open, close, previous_close
+            FROM (
+                SELECT name, date, value, open, close,
+                       LAG(close) OVER (PARTITION BY name ORDER BY date) AS previous_close
+                FROM (
+                    SELECT name, date, value, open, close FROM equities
+                    WHERE date >= :since
+                    UNION ALL
+                    SELECT e.name, e.date, e.value, e.open, e.close FROM equities e
+                    JOIN (
+                        SELECT name, MAX(date) AS date FROM equities
+                        WHERE date < :since
+                        GROUP BY name
+                    ) seed ON seed.name = e.name AND seed.date = e.date
+                )
+            )
+            WHERE date >= :since AND value > 0
+            """,
+            {"since": since},
+        )
+    return cursor.rowcount
 
-# === STEP 7: Insert Data ===
-df_today.to_sql("value_rank_history", conn, if_exists="append", index=False)
 
-# === Done ===
-print(f"[✓] Value ranks for {latest_date} stored in 'value_rank_history'")
-conn.close()
+if __name__ == "__main__":
+    conn = connect(DB_PATH)
+    written = update_value_ranks(conn, rebuild="--rebuild" in sys.argv)
+    latest_date = conn.execute(f"SELECT MAX(date) FROM {RANK_TABLE}").fetchone()[0]
+    conn.close()
+    print(f"[✓] {written} value ranks through {latest_date} stored in '{RANK_TABLE}'")
@@ -1,8 +1,10 @@
 # institutional_watch.py
 
-import sqlite3
+from db import connect
 import pandas as pd
 from datetime import datetime
+from price_store import load_equities
+from symbols import ensure_symbols, load_tiers, preferred_symbols
 
 # === CONFIG ===
 DB_PATH = "data/ngx_equities.db"
@@ -10,25 +12,17 @@ STEALTH_LOOKBACK_DAYS = 14
 MIN_BUIDUP_DAYS = 5
 MIN_ZONE_DAYS = 8
 
-# ✅ Optional: Limit to known mid/large cap stocks (e.g., NGX30)
-preferred_stocks = set([
-    "ZENITHBANK", "GTCO", "ACCESSCORP", "UBA", "STANBIC", "FBNH", "MTNN", "BUACEMENT",
-    "DANGCEM", "SEPLAT", "NESTLE", "NB", "GUINNESS", "WAPCO", "FLOURMILL", "DANGSUGAR",
-    "INTBREW", "GEREGU", "ETI", "PZ", "CUSTODIAN", "UCAP", "STERLINGNG", "FIDELITYBK",
-    "TRANSCORP", "NASCON", "CADBURY", "UNILEVER", "BERGER", "OANDO", "JAIZBANK",
-    "WEMABANK", "UNITYBNK", "AIICO", "SOVRENINS", "MANSARD", "NEM", "AFRIPRUD"
-    "HONYFLOUR", "MAYBAKER", "VITAFOAM", "CHAMPION", "IKEJAHOTEL", "JOHNHOLT", "TIP",
-    "TRANSCORP HOTELS", "UACN", "BUAFOODS", "CORNERST", "LIVESTOCK", "UPDCREIT",
-    "NAHCO", "MCNICHOLS", "ETERNA", "FIDSON", "FCMB", "OKOMUOIL", "CWG", "PRESCO"
-    
-])
+# ✅ Optional: Limit to known mid/large cap stocks (e.g., NGX30), flagged in symbols
+# (tiers reloaded here so a run before any sync_symbols() doesn't see an empty set)
+conn = connect(DB_PATH)
+ensure_symbols(conn)
+load_tiers(conn)
+preferred_stocks = preferred_symbols(conn)
+conn.close()
 
 # === LOAD DATA ===
-conn = sqlite3.connect(DB_PATH)
-df = pd.read_sql("SELECT * FROM equities", conn)
-conn.close()
+df = load_equities(DB_PATH)
 
-df["date"] = pd.to_datetime(df["date"])
 cutoff = df["date"].max() - pd.Timedelta(days=STEALTH_LOOKBACK_DAYS)
 df = df[df["date"] >= cutoff].copy()
 df = df.sort_values(by=["name", "date"])
@@ -86,7 +80,7 @@ summary["date_generated"] = datetime.today().strftime("%Y-%m-%d")
 summary = summary.sort_values(by="stealth_days", ascending=False)
 
 # === SAVE TO DB ===
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH)
 conn.execute("DROP TABLE IF EXISTS institutional_watch")
 summary.to_sql("institutional_watch", conn, index=False)
 conn.close()
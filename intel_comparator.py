@@ -1,103 +1,224 @@
 # intel_comparator.py
-import sqlite3
+"""Compare each stock's latest 30D and 10D intel.
+
+Only the newest generation per stock is read, through the weekly_intel_latest /
+weekly_intel_short_latest views backed by (name, date_generated) indexes. The
+status/notes rules run column-wise over the whole frame. Every run also upserts
+into intel_comparison_history (one row per stock per date) and the
+intel_comparison_changes view flags stocks whose status changed since their
+previous comparison.
+
+    python intel_comparator.py          # latest comparison + today's history rows
+    python intel_comparator.py --all    # rebuild history for every date in both tables
+"""
+import sys
+
+import numpy as np
 import pandas as pd
-from datetime import datetime
+
+from db import connect
 
 # === CONFIG ===
 DB_PATH = "data/ngx_equities.db"
 TABLE_30D = "weekly_intel"
 TABLE_10D = "weekly_intel_short"
 DATE_FIELD = "date_generated"
+HISTORY_TABLE = "intel_comparison_history"
+REPORT_COLUMNS = [
+    "name", "change_30", "change_10", "vol_30", "vol_10",
+    "start_10", "close_10", "status", "notes",
+]
+
+
+# === Indexes & latest views ===
+def ensure_latest_views(conn):
+    with conn:
+        for table in (TABLE_30D, TABLE_10D):
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_name_date "
+                f"ON {table} (name, {DATE_FIELD})"
+            )
+            conn.execute(f"""
+            CREATE VIEW IF NOT EXISTS {table}_latest AS
+            SELECT t.* FROM {table} t
+            JOIN (
+                SELECT name, MAX({DATE_FIELD}) AS {DATE_FIELD}
+                FROM {table} GROUP BY name
+            ) latest USING (name, {DATE_FIELD})
+            """)
+
+
+def ensure_history_table(conn):
+    with conn:
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+            date TEXT,
+            name TEXT,
+            change_30 REAL,
+            change_10 REAL,
+            vol_30 INTEGER,
+            vol_10 INTEGER,
+            start_10 REAL,
+            close_10 REAL,
+            status TEXT,
+            notes TEXT,
+            PRIMARY KEY (date, name)
+        )
+        """)
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{HISTORY_TABLE}_name_date "
+            f"ON {HISTORY_TABLE} (name, date)"
+        )
+        conn.execute(f"""
+        CREATE VIEW IF NOT EXISTS intel_comparison_changes AS
+        SELECT * FROM (
+            SELECT date, name, status, notes,
+                   LAG(status) OVER (PARTITION BY name ORDER BY date) AS prev_status,
+                   LAG(date) OVER (PARTITION BY name ORDER BY date) AS prev_date
+            FROM {HISTORY_TABLE}
+        )
+        WHERE prev_status IS NOT NULL AND status != prev_status
+        """)
+
+
+def load_latest(conn):
+    """Newest 30D and 10D rows per stock, merged on name."""
+    df_30 = pd.read_sql(f"SELECT * FROM {TABLE_30D}_latest", conn)
+    df_10 = pd.read_sql(f"SELECT * FROM {TABLE_10D}_latest", conn)
+    # A generation written twice for the same date would show up twice
+    df_30 = df_30.drop_duplicates("name", keep="last")
+    df_10 = df_10.drop_duplicates("name", keep="last")
+    df = pd.merge(df_30, df_10, on="name", suffixes=("_30", "_10"))
+    df["date"] = df[[f"{DATE_FIELD}_30", f"{DATE_FIELD}_10"]].max(axis=1)
+    return df
+
+
+def load_all(conn):
+    """Every (name, date) present in both tables, for rebuilding history."""
+    df_30 = pd.read_sql(f"SELECT * FROM {TABLE_30D}", conn)
+    df_10 = pd.read_sql(f"SELECT * FROM {TABLE_10D}", conn)
+    keys = ["name", DATE_FIELD]
+    df_30 = df_30.drop_duplicates(keys, keep="last")
+    df_10 = df_10.drop_duplicates(keys, keep="last")
+    df = pd.merge(df_30, df_10, on=keys, suffixes=("_30", "_10"))
+    return df.rename(columns={DATE_FIELD: "date"})
 
-# === Connect to DB ===
-conn = sqlite3.connect(DB_PATH)
-
-# === Load both tables ===
-df_30 = pd.read_sql(f"SELECT * FROM {TABLE_30D}", conn)
-df_10 = pd.read_sql(f"SELECT * FROM {TABLE_10D}", conn)
-
-conn.close()
-
-# === Parse dates and keep only latest per stock ===
-df_30[DATE_FIELD] = pd.to_datetime(df_30[DATE_FIELD])
-df_10[DATE_FIELD] = pd.to_datetime(df_10[DATE_FIELD])
-
-# Latest 30D date per stock
-df_30_latest = df_30.sort_values(DATE_FIELD).groupby("name").tail(1)
-df_10_latest = df_10.sort_values(DATE_FIELD).groupby("name").tail(1)
-
-# === Merge for comparison ===
-df_merged = pd.merge(df_30_latest, df_10_latest, on="name", suffixes=("_30", "_10"))
 
 # === Define status logic ===
-def analyze_stock(row):
-    change_30 = row.get("avg_change_1_30", 0)
-    change_10 = row.get("avg_change_1_10", 0)
-    vol_30 = row.get("volume_1_30", 0)
-    vol_10 = row.get("volume_1_10", 0)
-    close_30 = row.get("close_end_1_30", 0)
-    close_10 = row.get("close_end_1_10", 0)
-    start_30 = row.get("close_start_1_30", 0)
-    start_10 = row.get("close_start_1_10", 0)
-
-    status = []
-    notes = []
+def compare(df):
+    change_30 = df["avg_change_1_30"]
+    change_10 = df["avg_change_1_10"]
+    vol_30 = df["volume_1_30"]
+    vol_10 = df["volume_1_10"]
+    close_30 = df["close_end_1_30"]
+    close_10 = df["close_end_1_10"]
+    start_30 = df["close_start_1_30"]
+    start_10 = df["close_start_1_10"]
 
     # === Price Momentum ===
-    if change_30 > 0 and change_10 > 0:
-        status.append("✅ Strong Uptrend")
-    elif change_30 > 0 and change_10 < 0:
-        status.append("⚠️ 10D Weakness, 30D Strong")
-        notes.append("Short-term pullback. Watch for bounce or fail.")
-    elif change_30 < 0 and change_10 > 0:
-        status.append("🔁 Possible Reversal")
-        notes.append("10D showing recovery while 30D still down.")
-    elif change_30 < 0 and change_10 < 0:
-        status.append("❌ Downtrend")
-        notes.append("Both windows declining. Avoid or exit.")
-    else:
-        status.append("😐 Mixed Trend")
+    momentum = [
+        (change_30 > 0) & (change_10 > 0),
+        (change_30 > 0) & (change_10 < 0),
+        (change_30 < 0) & (change_10 > 0),
+        (change_30 < 0) & (change_10 < 0),
+    ]
+    status = np.select(
+        momentum,
+        ["✅ Strong Uptrend", "⚠️ 10D Weakness, 30D Strong", "🔁 Possible Reversal", "❌ Downtrend"],
+        default="😐 Mixed Trend",
+    )
+    momentum_note = np.select(
+        momentum,
+        [
+            "",
+            "Short-term pullback. Watch for bounce or fail.",
+            "10D showing recovery while 30D still down.",
+            "Both windows declining. Avoid or exit.",
+        ],
+        default="",
+    )
 
     # === Volume Check ===
-    vol_ratio = (vol_10 / vol_30) if vol_30 else 0
-    if vol_ratio > 1.3:
-        notes.append("Unusual short-term volume spike")
-    elif vol_ratio < 0.7:
-        notes.append("Volume tapering. Possibly quiet accumulation or weakness.")
+    vol_ratio = (vol_10 / vol_30).where(vol_30 != 0, 0)
+    volume_note = np.select(
+        [vol_ratio > 1.3, vol_ratio < 0.7],
+        ["Unusual short-term volume spike", "Volume tapering. Possibly quiet accumulation or weakness."],
+        default="",
+    )
 
     # === Price Level ===
-    if close_10 < start_10 and close_30 > start_30:
-        notes.append("Short-term rejection despite bullish 30D")
-    if close_10 > start_10 and close_30 < start_30:
-        notes.append("Early breakout after 30D weakness")
-
-    return {
-        "name": row["name"],
-        "change_30": round(change_30, 3),
-        "change_10": round(change_10, 3),
-        "vol_30": int(vol_30),
-        "vol_10": int(vol_10),
-        "start_10": round(start_10, 2),
-        "close_10": round(close_10, 2),
-        "status": "; ".join(status),
-        "notes": "; ".join(notes)
-    }
-
-# === Run Analysis ===
-report = pd.DataFrame([analyze_stock(row) for _, row in df_merged.iterrows()])
-
-# === Output ===
-print(report.head(20))  # Show sample
-
-# === Save to file ===
-report.to_csv("intel_comparison_report.csv", index=False)
-print("✅ Report saved to intel_comparison_report.csv")
-
-# Connect to your SQLite database
-conn = sqlite3.connect("data/ngx_equities.db")  # adjust path as needed
-
-# Save to table; this will create the table if it doesn't exist
-report.to_sql("intel_comparison_100", conn, if_exists="replace", index=False)
-
-conn.close()
-print("✅ Report saved to table 'intel_comparison_100' in us_equities.db")
\ No newline at end of file
+    level_note = np.select(
+        [
+            (close_10 < start_10) & (close_30 > start_30),
+            (close_10 > start_10) & (close_30 < start_30),
+        ],
+        ["Short-term rejection despite bullish 30D", "Early breakout after 30D weakness"],
+        default="",
+    )
+
+    notes = pd.Series("", index=df.index, dtype=object)
+    for note in (momentum_note, volume_note, level_note):
+        note = pd.Series(note, index=df.index, dtype=object)
+        notes = notes.where(note == "", notes.where(notes == "", notes + "; ") + note)
+
+    report = pd.DataFrame(
+        {
+            "name": df["name"],
+            "change_30": change_30.round(3),
+            "change_10": change_10.round(3),
+            "vol_30": np.trunc(vol_30).astype("Int64"),
+            "vol_10": np.trunc(vol_10).astype("Int64"),
+            "start_10": start_10.round(2),
+            "close_10": close_10.round(2),
+            "status": status,
+            "notes": notes,
+        }
+    )
+    if "date" in df.columns:
+        report.insert(0, "date", df["date"])
+    return report.reset_index(drop=True)
+
+
+# === History ===
+def save_history(conn, report):
+    cols = ["date"] + REPORT_COLUMNS
+    rows = report[cols].astype(object).where(report[cols].notna(), None)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in REPORT_COLUMNS[1:])
+    with conn:
+        conn.executemany(
+            f"""
+            INSERT INTO {HISTORY_TABLE} ({', '.join(cols)})
+            VALUES ({', '.join('?' for _ in cols)})
+            ON CONFLICT(date, name) DO UPDATE SET {updates}
+            """,
+            rows.itertuples(index=False, name=None),
+        )
+
+
+if __name__ == "__main__":
+    conn = connect(DB_PATH)
+    ensure_latest_views(conn)
+    ensure_history_table(conn)
+
+    if "--all" in sys.argv:
+        history = compare(load_all(conn))
+        save_history(conn, history)
+        print(f"✅ {HISTORY_TABLE}: {len(history)} rows over {history['date'].nunique()} date(s)")
+
+    # === Run Analysis ===
+    latest = compare(load_latest(conn))
+    save_history(conn, latest)
+    report = latest[REPORT_COLUMNS]
+
+    # === Output ===
+    print(report.head(20))  # Show sample
+
+    # === Save to file ===
+    report.to_csv("intel_comparison_report.csv", index=False)
+    print("✅ Report saved to intel_comparison_report.csv")
+
+    # Save to table; this will create the table if it doesn't exist
+    report.to_sql("intel_comparison_100", conn, if_exists="replace", index=False)
+
+    conn.close()
+    print(f"✅ Report saved to 'intel_comparison_100' and '{HISTORY_TABLE}' in {DB_PATH}")
@@ -0,0 +1,334 @@
+# intel_engine.py
+"""Breakout + stealth scoring for several horizons from one equities load.
+
+Each horizon splits its window into two back-to-back periods (p0, p1) that
+end on every trading day. Prices are laid out once as dense date x stock
+matrices; the cumulative sums (volume, trades, change) and next/previous-
+valid indices are shared by every horizon, so each period aggregate is an
+O(1) lookup and flags, score and trend_tag are computed for all
+(stock, end date) pairs of a horizon together.
+
+    python intel_engine.py                        # every horizon, recent end dates
+    python intel_engine.py --all                  # every horizon, full history
+    python intel_engine.py --only weekly_intel_short
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from db import connect
+from price_store import load_equities
+
+DB_PATH = "data/ngx_equities.db"
+
+# === HORIZONS ===
+# days: p0 + p1 trading days; lookback: end dates rewritten on a normal run;
+# adjust_score: trend_tag drops a point per weakness flag (price drop,
+# trend reversal, volume drop) as weekly_intel.py and weekly_intel_short.py
+# always did; only weekly_intel_new.py tags from the raw score
+HORIZONS = {
+    "weekly_intel_short": {"days": 10, "lookback": 10, "adjust_score": True},
+    "weekly_intel": {"days": 30, "lookback": 30, "adjust_score": True},
+    "weekly_intel_60": {"days": 60, "lookback": 30, "adjust_score": True},
+}
+
+# === MARKETS ===
+MARKETS = {
+    "ngx": {"db_path": DB_PATH, "horizons": list(HORIZONS)},
+}
+
+
+# === DENSE PANELS ===
+def build_panels(df):
+    """Date x stock matrices plus the prefix sums the period lookups need."""
+    days = np.sort(df["date"].unique())
+    names = np.sort(df["name"].unique())
+    d = np.searchsorted(days, df["date"].to_numpy())
+    s = np.searchsorted(names, df["name"].to_numpy())
+
+    def dense(col):
+        out = np.full((len(days), len(names)), np.nan)
+        out[d, s] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+        return out
+
+    def prefix(values):
+        # csum[k] = sum of rows < k, so a window [a, b] is csum[b + 1] - csum[a]
+        out = np.zeros((values.shape[0] + 1, values.shape[1]))
+        np.cumsum(values, axis=0, out=out[1:])
+        return out
+
+    present = np.zeros((len(days), len(names)), dtype=bool)
+    present[d, s] = True
+    close, open_ = dense("close"), dense("open")
+    volume, trades, change = dense("volume"), dense("trades"), dense("change")
+
+    # NaNs are skipped the way groupby sum/mean/first/last/max skip them
+    return {
+        "days": days,
+        "names": names,
+        "present": present,
+        "close": close,
+        "open": open_,
+        "volume": volume,
+        "n_rows": prefix(present.astype(float)),
+        "sum_volume": prefix(np.nan_to_num(volume)),
+        "n_volume": prefix(~np.isnan(volume)),
+        "sum_trades": prefix(np.nan_to_num(trades)),
+        "sum_change": prefix(np.nan_to_num(change)),
+        "n_change": prefix(~np.isnan(change)),
+        "next_close": _valid_index(~np.isnan(close), forward=False),
+        "prev_close": _valid_index(~np.isnan(close), forward=True),
+        "prev_row": _valid_index(present, forward=True),
+    }
+
+
+def _valid_index(mask, forward):
+    """Per column, index of the nearest True at or before (forward) / after each row."""
+    n = mask.shape[0]
+    rows = np.arange(n)[:, None]
+    if forward:
+        idx = np.where(mask, rows, -1)
+        return np.maximum.accumulate(idx, axis=0)
+    idx = np.where(mask, rows, n)
+    return np.minimum.accumulate(idx[::-1], axis=0)[::-1]
+
+
+def window_sum(panels, key, start, end):
+    """Sum over rows start..end (inclusive) for each end date (arrays of row indices)."""
+    csum = panels[key]
+    return csum[end + 1] - csum[start]
+
+
+def rolling_max_close(panels, period_days):
+    key = f"max_close_{period_days}"
+    if key not in panels:
+        panels[key] = (
+            pd.DataFrame(panels["close"]).rolling(period_days, min_periods=1).max().to_numpy()
+        )
+    return panels[key]
+
+
+def period_aggregates(panels, end_idx, period_days):
+    """Long frame of p0/p1 aggregates for every stock trading in p1 of each end date."""
+    e = np.asarray(end_idx)
+    p1_start, p1_end = e - (period_days - 1), e
+    p0_start, p0_end = e - (2 * period_days - 1), e - period_days
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        in_p1 = window_sum(panels, "n_rows", p1_start, p1_end) > 0
+        in_p0 = window_sum(panels, "n_rows", p0_start, p0_end) > 0
+
+        first_i = panels["next_close"][p1_start]
+        last_i = panels["prev_close"][p1_end]
+        today_i = panels["prev_row"][p1_end]
+        close = panels["close"]
+        close_start_1 = np.where(first_i <= p1_end[:, None], _take_rows(close, first_i), np.nan)
+        close_end_1 = np.where(last_i >= p1_start[:, None], _take_rows(close, last_i), np.nan)
+
+        n_change_0 = window_sum(panels, "n_change", p0_start, p0_end)
+        n_change_1 = window_sum(panels, "n_change", p1_start, p1_end)
+        n_volume_1 = window_sum(panels, "n_volume", p1_start, p1_end)
+        volume_1 = window_sum(panels, "sum_volume", p1_start, p1_end)
+
+        today_close = _take_rows(close, today_i)
+        today_open = _take_rows(panels["open"], today_i)
+        today_volume = _take_rows(panels["volume"], today_i)
+        volume_avg_10 = volume_1 / n_volume_1
+
+        out = {
+            "close_start_1": close_start_1,
+            "close_end_1": close_end_1,
+            "close_max_1": rolling_max_close(panels, period_days)[p1_end],
+            "volume_1": volume_1,
+            "trades_1": window_sum(panels, "sum_trades", p1_start, p1_end),
+            # p0 columns come from a left merge: NaN when the stock missed p0
+            "volume_0": np.where(in_p0, window_sum(panels, "sum_volume", p0_start, p0_end), np.nan),
+            "trades_0": np.where(in_p0, window_sum(panels, "sum_trades", p0_start, p0_end), np.nan),
+            "avg_change_0": window_sum(panels, "sum_change", p0_start, p0_end) / n_change_0,
+            "avg_change_1": window_sum(panels, "sum_change", p1_start, p1_end) / n_change_1,
+            "price_spike_today": (today_close - today_open) / today_open > 0.05,
+            "volume_spike_today": today_volume > 1.5 * volume_avg_10,
+        }
+
+    e_rows, s_cols = np.nonzero(in_p1)
+    intel_df = pd.DataFrame(
+        {
+            "name": panels["names"][s_cols],
+            "end_date": panels["days"][e[e_rows]],
+        }
+    )
+    for col, values in out.items():
+        intel_df[col] = values[e_rows, s_cols]
+    return intel_df
+
+
+def _take_rows(values, rows):
+    """values[rows[i, j], j] for a (dates x stocks) array of row indices."""
+    cols = np.arange(values.shape[1])[None, :]
+    safe = np.clip(rows, 0, values.shape[0] - 1)
+    return np.where(rows >= 0, values[safe, cols], np.nan)
+
+
+# === SCORING ===
+def tag_score(score):
+    if score >= 5:
+        return "🚀 Institutional Zone - Strong buy"
+    elif score == 4:
+        return "🔥 HBreakout Brewing - Buy small"
+    elif score == 3:
+        return "⚠️ Warming Up -Watch for entry in the next 1–3 days if signal strengthens"
+    elif score == 2:
+        return "👀 Warming Up"
+    else:
+        return "—"
+
+
+def score_intel(intel_df, adjust_score=True):
+    # === Base Flags (as before) ===
+    intel_df["trade_spike"] = intel_df["trades_1"] > 1.7 * intel_df["trades_0"]
+    intel_df["volume_spike"] = intel_df["volume_1"] > 1.7 * intel_df["volume_0"]
+    price_up = intel_df["close_end_1"] > intel_df["close_start_1"]
+    price_flip_up = (intel_df["avg_change_0"] < 0) & (intel_df["avg_change_1"] > 0)
+    volume_slope = intel_df["volume_1"] > intel_df["volume_0"] * 1.3
+    breakout_high = intel_df["close_end_1"] >= intel_df["close_max_1"]
+    flat_high_volume = (
+        (abs(intel_df["close_end_1"] - intel_df["close_start_1"]) <= 0.5)
+        & (intel_df["volume_1"] >= intel_df["volume_0"] * 1.1)
+    )
+
+    # === Core Signals
+    intel_df["stealth_accum_candidate"] = volume_slope & (intel_df["avg_change_1"].abs() < 2.5)
+    intel_df["momentum_spike"] = (intel_df["avg_change_1"] > 3.0) & intel_df["volume_spike"]
+
+    # === Combo logic embedded directly as boolean score flags
+    combo_flat = flat_high_volume & volume_slope & (~breakout_high)
+    combo_reversal = intel_df["trade_spike"] & price_flip_up & volume_slope
+    combo_climb = price_up & (~intel_df["volume_spike"]) & (~breakout_high)
+    combo_early_momentum = intel_df["volume_spike"] & intel_df["trade_spike"] & (~breakout_high)
+    momentum_spike1 = intel_df["price_spike_today"] & intel_df["volume_spike_today"]
+
+    # === Final Score includes base and combo signals
+    score = (
+        intel_df["trade_spike"].astype(int)
+        + intel_df["volume_spike"]
+        + intel_df["stealth_accum_candidate"]
+        + price_flip_up
+        + intel_df["momentum_spike"]
+        + volume_slope
+        + breakout_high
+        + flat_high_volume
+        + combo_flat
+        + combo_reversal
+        + combo_climb
+        + combo_early_momentum
+        + momentum_spike1
+        + intel_df["momentum_spike"] * 1.5  # gives momentum spike extra weight
+    )
+
+    # === Adjust Score Based on Negative Behavior ===
+    tag_from = score
+    if adjust_score:
+        price_drop_flag = intel_df["close_end_1"] < intel_df["close_start_1"] * 0.97
+        trend_reversal_flag = (intel_df["avg_change_0"] > 0) & (intel_df["avg_change_1"] < 0)
+        volume_drop_flag = intel_df["volume_1"] < intel_df["volume_0"] * 0.85  # Optional
+        tag_from = (score - price_drop_flag - trend_reversal_flag - volume_drop_flag).clip(lower=0)
+
+    # The tag follows the adjusted score. The stored score stays the unadjusted
+    # one: the old rename left two "score" columns and SQLite kept the first.
+    intel_df["score"] = score
+    intel_df["trend_tag"] = np.select(
+        [tag_from >= 5, tag_from == 4, tag_from == 3, tag_from == 2],
+        [tag_score(5), tag_score(4), tag_score(3), tag_score(2)],
+        default=tag_score(0),
+    )
+    return intel_df.drop(columns=["price_spike_today", "volume_spike_today"])
+
+
+def horizon_intel(panels, days, adjust_score=True, lookback=None):
+    """Scored intel for one horizon, for the last `lookback` end dates (all if None)."""
+    period_days = days // 2
+    end_idx = np.arange(2 * period_days - 1, len(panels["days"]))
+    if lookback is not None:
+        end_idx = end_idx[-lookback:]
+    intel_df = score_intel(period_aggregates(panels, end_idx, period_days), adjust_score)
+    intel_df["date_generated"] = pd.to_datetime(intel_df.pop("end_date")).dt.strftime("%Y-%m-%d")
+    return intel_df
+
+
+def run_horizons(df, tables, full_history=False):
+    """{table: scored frame} for each horizon table, sharing one set of panels."""
+    panels = build_panels(df)
+    results = {}
+    for table in tables:
+        horizon = HORIZONS[table]
+        results[table] = horizon_intel(
+            panels,
+            horizon["days"],
+            horizon["adjust_score"],
+            None if full_history else horizon["lookback"],
+        )
+    return results
+
+
+# === Save to DB ===
+def save_intel(conn, table, intel_df):
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        name TEXT,
+        trades_0 INTEGER,
+        trades_1 INTEGER,
+        trade_spike BOOLEAN,
+        volume_0 INTEGER,
+        volume_1 INTEGER,
+        volume_spike BOOLEAN,
+        avg_change_1 REAL,
+        avg_change_0 REAL,
+        close_start_1 REAL,
+        close_end_1 REAL,
+        close_max_1 REAL,
+        stealth_accum_candidate BOOLEAN,
+        momentum_spike BOOLEAN,
+        volume_slope BOOLEAN,
+        score INTEGER,
+        trend_tag TEXT,
+        date_generated TEXT
+    )
+    """)
+    dates = sorted(intel_df["date_generated"].unique())
+    with conn:
+        conn.executemany(
+            f"DELETE FROM {table} WHERE date_generated = ?", [(d,) for d in dates]
+        )
+        intel_df.to_sql(table, conn, if_exists="append", index=False)
+    return dates
+
+
+def run(market="ngx", tables=None, full_history=False):
+    config = MARKETS[market]
+    tables = tables or config["horizons"]
+    df = load_equities(config["db_path"])
+    results = run_horizons(df, tables, full_history)
+
+    conn = connect(config["db_path"])
+    for table, intel_df in results.items():
+        dates = save_intel(conn, table, intel_df)
+        if dates:
+            print(
+                f"✅ {table}: {len(intel_df)} records for {len(dates)} end date(s), "
+                f"{dates[0]} → {dates[-1]}"
+            )
+        else:
+            print(f"⚠️ {table}: not enough history for a {HORIZONS[table]['days']}-day window.")
+    conn.close()
+    return results
+
+
+if __name__ == "__main__":
+    only = None
+    if "--only" in sys.argv:
+        only = sys.argv[sys.argv.index("--only") + 1].split(",")
+    market = "ngx"
+    if "--market" in sys.argv:
+        market = sys.argv[sys.argv.index("--market") + 1]
+    run(market, only, full_history="--all" in sys.argv)
@@ -1,4 +1,4 @@
-import sqlite3
+from db import bulk_update, connect
 import pandas as pd
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -27,26 +27,13 @@ today_str = today.strftime("%Y-%m-%d")
 
 # --- Connect to DB ---
 db_path = "data/ngx_equities.db"  # adjust if different
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
+conn = connect(db_path)
 
 # --- Update DB for today's date only ---
-for _, row in df.iterrows():
-    symbol = row["Symbol"]
-    last_price = row["Last Price"]
-
-    if pd.notnull(last_price):
-        cursor.execute(
-            f"""
-            UPDATE equities
-            SET close = ?
-            WHERE name = ? AND date = ?
-        """,
-            (last_price, symbol, today_str),
-        )
-
-# Commit and close
-conn.commit()
+prices = df[df["Last Price"].notna()].rename(columns={"Symbol": "name", "Last Price": "close"})
+prices["date"] = today_str
+bulk_update(conn, "equities", prices, ["name", "date"], ["close"])
+
 conn.close()
 
 print(f"✅ Close prices updated successfully for {today_str}.")
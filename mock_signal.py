@@ -1,5 +1,6 @@
 import sqlite3
 import os
+from db import connect
 
 DB_PATH = "data/ngx_equities.db"  # or your backup
 
@@ -9,9 +10,12 @@ try:
         print("❌ DB file not found.")
     else:
         # Step 2: Try real write
-        with sqlite3.connect(DB_PATH) as conn:
+        with connect(DB_PATH) as conn:
             cursor = conn.cursor()
-            cursor.execute("PRAGMA journal_mode=WAL;")  # Switch to WAL if not already
+            # connect() already set WAL + busy_timeout; report what is in effect
+            mode = cursor.execute("PRAGMA journal_mode;").fetchone()[0]
+            timeout = cursor.execute("PRAGMA busy_timeout;").fetchone()[0]
+            print(f"ℹ️ journal_mode={mode}, busy_timeout={timeout} ms")
             cursor.execute("CREATE TABLE IF NOT EXISTS test_lock_check (id INTEGER);")
             cursor.execute("INSERT INTO test_lock_check (id) VALUES (1);")
             conn.commit()
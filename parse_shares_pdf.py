@@ -1,13 +1,25 @@
-import pdfplumber
+import argparse
 import csv
+import glob
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pdfplumber
 
-pdf_path = "SHARES OUTSTANDING FOR 31-10-2025.pdf"
+from db import connect
+from sector_cube import update_sector_cube
+from shares_history import HISTORY_TABLE, ingested_dates, store_filing
+from symbols import sync_symbols
+
+# python parse_shares_pdf.py                     -> ingest new PDFs in the current folder
+# python parse_shares_pdf.py --dir pdfs --force  -> re-ingest every PDF in pdfs/
+# python parse_shares_pdf.py --workers 2
+DB_PATH = "data/ngx_equities.db"
+PDF_PATTERN = "SHARES OUTSTANDING FOR *.pdf"
 output_csv = "stocks_with_main_and_subsector.csv"
 
-results = []
-current_main_sector = None
-current_sub_sector = None
 
 def is_main_sector(line):
     return (
@@ -20,52 +32,110 @@ def is_main_sector(line):
 def is_sub_sector(line):
     return bool(re.match(r"^[A-Z/&\.\s]+\- [A-Za-z\s/&\.\(\)-]+$", line.strip()))
 
-with pdfplumber.open(pdf_path) as pdf:
-    for page in pdf.pages:
-        lines = page.extract_text().split("\n")
 
-        for line in lines:
-            line = line.strip()
+def effective_date(pdf_path):
+    """'SHARES OUTSTANDING FOR 31-10-2025.pdf' -> '2025-10-31'."""
+    match = re.search(r"(\d{2}-\d{2}-\d{4})", os.path.basename(pdf_path))
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), "%d-%m-%Y").strftime("%Y-%m-%d")
 
-            # Main sector
-            if is_main_sector(line):
-                current_main_sector = line
-                continue
 
-            # Sub-sector
-            if is_sub_sector(line):
-                current_sub_sector = line
-                continue
+def parse_pdf(pdf_path):
+    results = []
+    current_main_sector = None
+    current_sub_sector = None
+
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            lines = (page.extract_text() or "").split("\n")
+
+            for line in lines:
+                line = line.strip()
+
+                # Main sector
+                if is_main_sector(line):
+                    current_main_sector = line
+                    continue
 
-            # Possible stock data
-            parts = line.split()
-            if len(parts) >= 5 and re.match(r"^[A-Z0-9]{2,10}$", parts[0]):
-                try:
-                    symbol = parts[0]
-                    name = " ".join(parts[1:-3])
-                    price = float(parts[-3].replace(",", ""))
-                    shares_out = int(parts[-2].replace(",", ""))
-                    market_cap = float(parts[-1].replace(",", ""))
-                except:
+                # Sub-sector
+                if is_sub_sector(line):
+                    current_sub_sector = line
                     continue
 
-                results.append({
-                    "symbol": symbol,
-                    "name": name,
-                    "price": price,
-                    "shares_outstanding": shares_out,
-                    "market_cap": market_cap,
-                    "main_sector": current_main_sector,
-                    "sub_sector": current_sub_sector
-                })
-
-# === Save to CSV ===
-if results:
-    with open(output_csv, "w", newline="", encoding="utf-8") as f:
+                # Possible stock data
+                parts = line.split()
+                if len(parts) >= 5 and re.match(r"^[A-Z0-9]{2,10}$", parts[0]):
+                    try:
+                        symbol = parts[0]
+                        name = " ".join(parts[1:-3])
+                        price = float(parts[-3].replace(",", ""))
+                        shares_out = int(parts[-2].replace(",", ""))
+                        market_cap = float(parts[-1].replace(",", ""))
+                    except:
+                        continue
+
+                    results.append({
+                        "symbol": symbol,
+                        "name": name,
+                        "price": price,
+                        "shares_outstanding": shares_out,
+                        "market_cap": market_cap,
+                        "main_sector": current_main_sector,
+                        "sub_sector": current_sub_sector
+                    })
+    return pdf_path, results
+
+
+def write_csv(results, path=output_csv):
+    with open(path, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=results[0].keys())
         writer.writeheader()
         writer.writerows(results)
 
-    print(f"✅ Extracted {len(results)} stocks → {output_csv}")
-else:
-    print("⚠️ No stock entries extracted. Check line patterns or try printing sample lines.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest NGX shares-outstanding PDFs")
+    parser.add_argument("--dir", default=".", help="folder holding the monthly PDFs")
+    parser.add_argument("--force", action="store_true", help="re-ingest PDFs already stored")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    pdfs = {}
+    for path in glob.glob(os.path.join(args.dir, PDF_PATTERN)):
+        date = effective_date(path)
+        if date is None:
+            print(f"⚠️ No dd-mm-yyyy date in {os.path.basename(path)}, skipping")
+            continue
+        pdfs[date] = path
+
+    conn = connect(DB_PATH)
+    if not args.force:
+        for date in ingested_dates(conn) & set(pdfs):
+            del pdfs[date]
+    print(f"📄 {len(pdfs)} PDF(s) to parse")
+
+    # pdfplumber is CPU bound, so parse the files in separate processes
+    by_path = {path: date for date, path in pdfs.items()}
+    latest = None
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for path, results in pool.map(parse_pdf, sorted(by_path)):
+            date = by_path[path]
+            if not results:
+                print(f"⚠️ {os.path.basename(path)}: no stock entries extracted")
+                continue
+            store_filing(conn, date, results, source=os.path.basename(path))
+            print(f"✅ {date}: {len(results)} stocks → {HISTORY_TABLE}")
+            if latest is None or date > latest[0]:
+                latest = (date, results)
+
+    # The newest filing also refreshes the CSV and the symbols dimension
+    newest_stored = max(ingested_dates(conn), default=None)
+    if latest is not None and latest[0] == newest_stored:
+        write_csv(latest[1])
+        print(f"✅ Extracted {len(latest[1])} stocks → {output_csv}")
+        changed, dropped = sync_symbols(conn, output_csv)
+        if changed or dropped:
+            update_sector_cube(conn, rebuild=True)
+        print(f"🏷️ symbols updated, {len(changed)} re-classified")
+    conn.close()
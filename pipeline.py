@@ -0,0 +1,208 @@
+# pipeline.py
+"""Run the daily / weekly scripts in one interpreter.
+
+Replaces run_signals.bat and weekly_institu_signals.bat. Each stage is one of
+the existing scripts and declares the stages it needs. Stages whose
+dependencies are done run concurrently on a thread pool. sys.argv and
+sys.modules["__main__"] are process-wide, so only one stage at a time runs
+in-process (through runpy, with sys.argv set to just its script); stages that
+become ready while it runs start as subprocesses instead. The in-process
+stages share one equities frame through price_store.load_equities()
+(reloaded only after a stage changes the table, e.g. the scraper); the
+subprocesses read the same memory-mapped price store.
+
+    python pipeline.py                    # daily pipeline
+    python pipeline.py weekly             # weekly pipeline
+    python pipeline.py weekly --from intel_engine
+    python pipeline.py weekly --only sector_tracker,volume_ranking
+"""
+import argparse
+import os
+import runpy
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from price_store import share_frames
+
+# === STAGES ===
+# name: (script, [dependencies])
+STAGES = {
+    "scraper": ("scraper.py", []),
+    "analyser": ("analyser.py", ["scraper"]),
+    "financial_statements": ("ngx_financial_statements_notifier.py", []),
+    "director_dealings": ("ngx_director_dealings_scraper.py", []),
+    "institutional_watch": ("institutional_watch.py", ["csv_db"]),
+    "intel_engine": ("intel_engine.py", ["scraper"]),
+    "intel_comparator": ("intel_comparator.py", ["intel_engine"]),
+    "value_rank": ("generate_value_rank.py", ["scraper"]),
+    "csv_db": ("csv_db.py", ["scraper"]),
+    "sector_institutional_watch": ("sector_institutional_watch.py", ["csv_db"]),
+    "sector_tracker": ("sector_tracker.py", ["csv_db"]),
+    "volume_ranking": ("volume_ranking.py", ["csv_db"]),
+    "dashboard_snapshot": (
+        "dashboard_snapshot.py",
+        ["scraper", "analyser", "intel_engine", "csv_db", "volume_ranking"],
+    ),
+}
+
+PIPELINES = {
+    "daily": [
+        "scraper",
+        "analyser",
+        "financial_statements",
+        "director_dealings",
+        "dashboard_snapshot",
+    ],
+    "weekly": [
+        "scraper",
+        "analyser",
+        "institutional_watch",
+        "intel_engine",
+        "intel_comparator",
+        "value_rank",
+        "csv_db",
+        "sector_institutional_watch",
+        "sector_tracker",
+        "volume_ranking",
+        "dashboard_snapshot",
+    ],
+}
+
+LOG_FILE = "pipeline_log.txt"
+
+
+# === DAG HELPERS ===
+def descendants(stage, stages):
+    """`stage` plus every stage in `stages` that depends on it, directly or not."""
+    found = {stage}
+    changed = True
+    while changed:
+        changed = False
+        for name in stages:
+            if name not in found and any(d in found for d in STAGES[name][1]):
+                found.add(name)
+                changed = True
+    return found
+
+
+def select_stages(pipeline, start=None, only=None):
+    stages = list(PIPELINES[pipeline])
+    if only:
+        unknown = [s for s in only if s not in STAGES]
+        if unknown:
+            raise SystemExit(f"❌ Unknown stage(s): {', '.join(unknown)}")
+        return [s for s in STAGES if s in only]
+    if start:
+        if start not in stages:
+            raise SystemExit(f"❌ Stage '{start}' is not part of the {pipeline} pipeline")
+        keep = descendants(start, stages)
+        stages = [s for s in stages if s in keep]
+    return stages
+
+
+# === RUNNER ===
+def run_stage(name, in_process=True):
+    script = STAGES[name][0]
+    started = time.perf_counter()
+    if not in_process:
+        code = subprocess.run([sys.executable, script]).returncode
+        if code != 0:
+            raise RuntimeError(f"{script} exited with {code}")
+        return time.perf_counter() - started
+
+    # The stage must not see the pipeline's own flags (--only, --from, ...)
+    saved_argv = sys.argv
+    sys.argv = [script]
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        # Scripts use exit() for "nothing to do"; only a non-zero code is a failure
+        if e.code not in (None, 0):
+            raise RuntimeError(f"{script} exited with {e.code}")
+    finally:
+        sys.argv = saved_argv
+    return time.perf_counter() - started
+
+
+def run_pipeline(stages, workers=4):
+    """Run `stages` respecting dependencies. Dependencies outside `stages` count as done."""
+    selected = set(stages)
+    pending = list(stages)
+    done, failed, timings = set(), set(), {}
+    running, in_process = {}, set()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = [d for d in STAGES[name][1] if d in selected]
+                if any(d in failed for d in deps):
+                    print(f"⏭️ Skipping {name}: a dependency failed")
+                    pending.remove(name)
+                    failed.add(name)
+                elif all(d in done for d in deps):
+                    # Only one stage at a time may own sys.argv / __main__
+                    local = not in_process
+                    print(f"▶️ {name}{'' if local else ' (subprocess)'}")
+                    pending.remove(name)
+                    running[pool.submit(run_stage, name, local)] = name
+                    if local:
+                        in_process.add(name)
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                in_process.discard(name)
+                try:
+                    timings[name] = future.result()
+                    done.add(name)
+                    print(f"✅ {name} finished in {timings[name]:.1f}s")
+                except Exception:
+                    failed.add(name)
+                    print(f"❌ {name} failed:")
+                    traceback.print_exc()
+
+    return done, failed, timings
+
+
+def log_run(pipeline, timings, failed, total):
+    try:
+        with open(LOG_FILE, "a") as f:
+            stages = ", ".join(f"{n}={t:.1f}s" for n, t in timings.items())
+            f.write(
+                f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {pipeline} - {total:.1f}s"
+                f" - {stages}{' - FAILED: ' + ', '.join(sorted(failed)) if failed else ''}\n"
+            )
+    except Exception as e:
+        print(f"⚠️ Could not write to log file: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the NGX signal pipeline")
+    parser.add_argument("pipeline", nargs="?", default="daily", choices=sorted(PIPELINES))
+    parser.add_argument("--from", dest="start", help="rerun this stage and everything after it")
+    parser.add_argument("--only", help="comma-separated stages to run on their own")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    only = [s.strip() for s in args.only.split(",")] if args.only else None
+    stages = select_stages(args.pipeline, args.start, only)
+
+    share_frames()
+    started = time.perf_counter()
+    done, failed, timings = run_pipeline(stages, args.workers)
+    total = time.perf_counter() - started
+
+    print("\n⏱️ Stage timings:")
+    for name in stages:
+        status = f"{timings[name]:.1f}s" if name in timings else "failed/skipped"
+        print(f"  {name:<28} {status}")
+    print(f"  {'total':<28} {total:.1f}s")
+    log_run(args.pipeline, timings, failed, total)
+    sys.exit(1 if failed else 0)
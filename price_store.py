@@ -0,0 +1,471 @@
+# price_store.py
+"""Memory-mapped columnar copy of the equities table.
+
+Each column lives in its own flat binary file under data/price_store/ and is
+opened with np.memmap, so every script shares the same OS page cache instead
+of re-parsing SQLite rows and date strings. Text columns such as name are
+dictionary encoded. Every build or refresh writes a new generation of column
+files and then swaps meta.json, so a file another process has mapped is
+never rewritten; builds and refreshes hold an exclusive lock file, so
+concurrent pipeline subprocesses refresh the store once. Staleness is
+detected with the equities change counter from db.track_changes() (installed
+by build_store()), which also catches in-place UPDATEs (change_pct.py,
+load_last_price.py) and same-day re-scrapes.
+
+    python price_store.py            # incremental refresh after a scrape
+    python price_store.py --rebuild  # full rebuild from data/ngx_equities.db
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from db import changed_since, connect, table_version, track_changes
+
+# === CONFIG ===
+DB_PATH = "data/ngx_equities.db"
+STORE_DIR = "data/price_store"
+TABLE_NAME = "equities"
+META_FILE = "meta.json"
+
+DATE_DTYPE = "datetime64[ns]"
+NUMBER_DTYPE = "float64"
+CODE_DTYPE = "int32"
+LOCK_FILE = "store.lock"
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# In-process frame cache, off unless share_frames() is called (pipeline.py).
+# _store_lock serializes refreshes and cache access between threads.
+_shared_frames = None
+_store_lock = threading.Lock()
+
+
+# === SCHEMA HELPERS ===
+def _table_schema(conn):
+    """Return [(column, kind)] where kind is 'date', 'text' or 'number'."""
+    schema = []
+    for _, col, col_type, *_ in conn.execute(f"PRAGMA table_info({TABLE_NAME})"):
+        col_type = (col_type or "").upper()
+        if col == "date":
+            kind = "date"
+        elif "CHAR" in col_type or "TEXT" in col_type or "CLOB" in col_type:
+            kind = "text"
+        else:
+            kind = "number"
+        schema.append([col, kind])
+    return schema
+
+
+def _dtype(kind):
+    return {"date": DATE_DTYPE, "text": CODE_DTYPE}.get(kind, NUMBER_DTYPE)
+
+
+def _column_path(store_dir, col, generation=None):
+    # generation None is the single-file layout of stores built before generations
+    name = f"{col}.bin" if generation is None else f"{col}.{generation}.bin"
+    return os.path.join(store_dir, name)
+
+
+def _new_generation():
+    return str(time.time_ns())
+
+
+def _remove_generations(store_dir, upto):
+    """Delete column files of generation `upto` and older (best effort: a
+    running reader may still have them mapped, which Windows refuses)."""
+    for file in os.listdir(store_dir):
+        parts = file.split(".")
+        if parts[-1] != "bin" or len(parts) > 3:
+            continue
+        if len(parts) == 2 or (upto is not None and int(parts[1]) <= int(upto)):
+            try:
+                os.remove(os.path.join(store_dir, file))
+            except OSError:
+                pass
+
+
+def _read_meta(store_dir):
+    path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_meta(store_dir, meta):
+    # Written last and swapped in atomically: readers only ever trust the
+    # row count in meta.json, so a half-written column tail is never visible.
+    tmp_path = os.path.join(store_dir, META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(store_dir, META_FILE))
+
+
+@contextmanager
+def _exclusive(store_dir):
+    """Cross-process lock held while the store is built or refreshed."""
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, LOCK_FILE), "a+b") as f:
+        if os.name == "nt":
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after ~10s; keep waiting
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _fingerprint(conn):
+    # Read-only: version is None until build_store() has installed the
+    # triggers, and a None version always means "rebuild"
+    version = table_version(conn, TABLE_NAME)
+    count, max_date = conn.execute(
+        f"SELECT COUNT(*), MAX(date) FROM {TABLE_NAME}"
+    ).fetchone()
+    # Column list too, so an added/dropped column (e.g. symbol_id) triggers a rebuild
+    columns = ",".join(row[1] for row in conn.execute(f"PRAGMA table_info({TABLE_NAME})"))
+    return [count, max_date, columns, version]
+
+
+# === ENCODING ===
+def _encode(df, schema, vocab):
+    """Turn a SQLite frame into {column: ndarray}, growing vocab in place."""
+    arrays = {}
+    for col, kind in schema:
+        if kind == "date":
+            arrays[col] = pd.to_datetime(df[col]).to_numpy(dtype=DATE_DTYPE)
+        elif kind == "text":
+            words = vocab.setdefault(col, [])
+            lookup = {w: i for i, w in enumerate(words)}
+            values = df[col].to_numpy(dtype=object)
+            codes = np.full(len(values), -1, dtype=CODE_DTYPE)
+            for i, value in enumerate(values):
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(words)
+                    words.append(value)
+                codes[i] = code
+            arrays[col] = codes
+        else:
+            arrays[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(
+                dtype=NUMBER_DTYPE
+            )
+    return arrays
+
+
+def _date_index(dates, start_row=0, start_dates=None, start_offsets=None):
+    """Return (dates, offsets): each trading date and the first row it owns."""
+    out_dates = list(start_dates or [])
+    out_offsets = list(start_offsets or [])
+    if len(dates):
+        day_strings = pd.DatetimeIndex(dates).strftime("%Y-%m-%d")
+        change = np.flatnonzero(day_strings[1:] != day_strings[:-1]) + 1
+        for pos in np.concatenate([[0], change]):
+            out_dates.append(day_strings[pos])
+            out_offsets.append(int(start_row + pos))
+    return out_dates, out_offsets
+
+
+def _write_columns(store_dir, schema, arrays, generation, start_row=0, base=None):
+    """Write generation `generation`: the first start_row rows copied from
+    generation `base`, then `arrays`."""
+    for col, kind in schema:
+        itemsize = np.dtype(_dtype(kind)).itemsize
+        with open(_column_path(store_dir, col, generation), "wb") as f:
+            if start_row:
+                with open(_column_path(store_dir, col, base), "rb") as old:
+                    f.write(old.read(start_row * itemsize))
+            f.write(np.ascontiguousarray(arrays[col]).tobytes())
+
+
+def _select_rows(conn, since=None):
+    query = f"SELECT * FROM {TABLE_NAME}"
+    params = ()
+    if since is not None:
+        query += " WHERE date >= ?"
+        params = (since,)
+    return pd.read_sql(query + " ORDER BY date, name", conn, params=params)
+
+
+# === BUILD / REFRESH ===
+def _is_stale(meta, fingerprint):
+    return meta is None or fingerprint[3] is None or meta.get("fingerprint") != fingerprint
+
+
+def build_store(db_path=DB_PATH, store_dir=STORE_DIR):
+    """Rebuild the whole store from SQLite."""
+    with _exclusive(store_dir):
+        return _build_store(db_path, store_dir)
+
+
+def refresh_store(db_path=DB_PATH, store_dir=STORE_DIR, since=None):
+    """Bring the store up to date with SQLite (see _refresh_store)."""
+    with _exclusive(store_dir):
+        return _refresh_store(db_path, store_dir, since)
+
+
+def _build_store(db_path, store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    old_meta = _read_meta(store_dir)
+    conn = connect(db_path)
+    if table_version(conn, TABLE_NAME) is None:
+        track_changes(conn, TABLE_NAME)
+    schema = _table_schema(conn)
+    # Fingerprint first: a write landing in between is re-read next time
+    fingerprint = _fingerprint(conn)
+    df = _select_rows(conn)
+    conn.close()
+
+    vocab = {}
+    arrays = _encode(df, schema, vocab)
+    generation = _new_generation()
+    _write_columns(store_dir, schema, arrays, generation)
+    dates, offsets = _date_index(arrays.get("date", []))
+
+    meta = {
+        "rows": len(df),
+        "schema": schema,
+        "vocab": vocab,
+        "dates": dates,
+        "date_offsets": offsets,
+        "fingerprint": fingerprint,
+        "generation": generation,
+    }
+    _write_meta(store_dir, meta)
+    _remove_generations(store_dir, old_meta.get("generation") if old_meta else None)
+    print(f"✅ Price store rebuilt: {len(df)} rows, {len(dates)} trading days")
+    return meta
+
+
+def _refresh_store(db_path, store_dir, since=None):
+    """Append rows for new dates (and re-read `since` onwards) into the store.
+
+    By default the re-read starts at the last stored date (scraper.py replaces
+    the current day's rows when it runs more than once a day) or at the
+    earliest date written since the store's version, whichever is older.
+    Falls back to a full rebuild if the schema changed or the re-read would
+    start at the first stored day.
+    """
+    meta = _read_meta(store_dir)
+    if meta is None:
+        return _build_store(db_path, store_dir)
+
+    conn = connect(db_path)
+    schema = _table_schema(conn)
+    if schema != meta["schema"]:
+        conn.close()
+        print("ℹ️ Equities schema changed. Rebuilding price store...")
+        return _build_store(db_path, store_dir)
+
+    fingerprint = _fingerprint(conn)
+    stored_version = meta["fingerprint"][3] if len(meta["fingerprint"]) > 3 else None
+    if stored_version is None or fingerprint[3] is None:
+        conn.close()
+        return _build_store(db_path, store_dir)
+
+    dates, offsets = meta["dates"], meta["date_offsets"]
+    if since is None and dates:
+        since = dates[-1]
+        changed = changed_since(conn, TABLE_NAME, stored_version)
+        if changed is not None and changed < since:
+            since = changed
+    keep_days = sum(1 for d in dates if since is None or d < since)
+    if keep_days == 0:
+        conn.close()
+        return _build_store(db_path, store_dir)
+    keep_rows = offsets[keep_days] if keep_days < len(offsets) else meta["rows"]
+
+    # Everything before `since` must be untouched for an incremental append
+    older = conn.execute(
+        f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE date < ?", (since,)
+    ).fetchone()[0] if since is not None else 0
+    if older != keep_rows:
+        conn.close()
+        print("ℹ️ Older equities rows changed. Rebuilding price store...")
+        return _build_store(db_path, store_dir)
+
+    df = _select_rows(conn, since)
+    conn.close()
+
+    vocab = meta["vocab"]
+    arrays = _encode(df, schema, vocab)
+    base = meta.get("generation")
+    generation = _new_generation()
+    _write_columns(store_dir, schema, arrays, generation, keep_rows, base)
+    new_dates, new_offsets = _date_index(
+        arrays.get("date", []), keep_rows, dates[:keep_days], offsets[:keep_days]
+    )
+
+    meta.update(
+        rows=keep_rows + len(df),
+        vocab=vocab,
+        dates=new_dates,
+        date_offsets=new_offsets,
+        fingerprint=fingerprint,
+        generation=generation,
+    )
+    _write_meta(store_dir, meta)
+    _remove_generations(store_dir, base)
+    print(f"✅ Price store refreshed: {len(df)} rows from {since} onwards")
+    return meta
+
+
+# === READ SIDE ===
+class PriceStore:
+    """Read-only, zero-copy view of the columnar equities store."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        meta = _read_meta(store_dir)
+        if meta is None:
+            raise FileNotFoundError(f"No price store found in {store_dir}")
+        self.store_dir = store_dir
+        self.meta = meta
+        self.rows = meta["rows"]
+        self.kinds = dict((col, kind) for col, kind in meta["schema"])
+        self.dates = meta["dates"]
+        self.date_offsets = meta["date_offsets"]
+        self.symbols = meta["vocab"].get("name", [])
+        self._symbol_ids = {s: i for i, s in enumerate(self.symbols)}
+        self._columns = {}
+
+    def column(self, col):
+        """Raw memory-mapped array (dictionary codes for text columns)."""
+        if col not in self._columns:
+            if self.rows == 0:
+                self._columns[col] = np.empty(0, dtype=_dtype(self.kinds[col]))
+            else:
+                self._columns[col] = np.memmap(
+                    _column_path(self.store_dir, col, self.meta.get("generation")),
+                    dtype=_dtype(self.kinds[col]),
+                    mode="c",  # copy-on-write: callers may mutate freely
+                    shape=(self.rows,),
+                )
+        return self._columns[col]
+
+    def symbol_id(self, name):
+        return self._symbol_ids.get(name)
+
+    def row_range(self, since=None, until=None):
+        """Row slice covering trading dates in [since, until]."""
+        start = 0
+        end = self.rows
+        if since is not None:
+            i = int(np.searchsorted(self.dates, since, side="left"))
+            start = self.date_offsets[i] if i < len(self.dates) else self.rows
+        if until is not None:
+            i = int(np.searchsorted(self.dates, until, side="right"))
+            end = self.date_offsets[i] if i < len(self.dates) else self.rows
+        return slice(start, max(start, end))
+
+    def to_frame(self, columns=None, since=None, until=None):
+        """DataFrame over the store; numeric and date columns are not copied."""
+        rows = self.row_range(since, until)
+        data = {}
+        for col in columns or list(self.kinds):
+            values = self.column(col)[rows].view(np.ndarray)
+            if self.kinds[col] == "text":
+                vocab = np.asarray(
+                    self.meta["vocab"].get(col, []) + [None], dtype=object
+                )
+                values = vocab[values]  # -1 (NULL) lands on the trailing None
+            data[col] = values
+        return pd.DataFrame(data, copy=False)
+
+
+def open_store(store_dir=STORE_DIR):
+    return PriceStore(store_dir)
+
+
+def _read_frame(store_dir, columns, since):
+    try:
+        return open_store(store_dir).to_frame(columns, since=since)
+    except FileNotFoundError:
+        # A refresh in another process swapped generations between our meta
+        # read and the mapping; the new meta.json points at live files
+        return open_store(store_dir).to_frame(columns, since=since)
+
+
+def share_frames(enabled=True):
+    """Keep decoded frames in memory so every caller in this process shares one load.
+
+    Entries are keyed on the SQLite fingerprint, so any write to equities is
+    picked up by the next caller. Each caller gets its own copy.
+    """
+    global _shared_frames
+    _shared_frames = {} if enabled else None
+
+
+def load_equities(db_path=DB_PATH, columns=None, since=None, store_dir=STORE_DIR):
+    """Drop-in replacement for pd.read_sql("SELECT * FROM equities", conn).
+
+    Reads through the columnar store (refreshing it first if SQLite has rows
+    it has not seen yet) and returns a frame whose `date` column is already
+    parsed. Falls back to SQLite if the store cannot be built.
+    """
+    try:
+        with _store_lock:
+            meta = _read_meta(store_dir)
+            conn = connect(db_path)
+            fingerprint = _fingerprint(conn)
+            if _is_stale(meta, fingerprint):
+                with _exclusive(store_dir):
+                    # Another process may have refreshed while we waited
+                    meta, fingerprint = _read_meta(store_dir), _fingerprint(conn)
+                    if _is_stale(meta, fingerprint):
+                        meta = _refresh_store(db_path, store_dir)
+                        fingerprint = meta["fingerprint"]
+            conn.close()
+            if _shared_frames is None:
+                return _read_frame(store_dir, columns, since)
+
+            key = (store_dir, tuple(fingerprint), tuple(columns or ()), since)
+            if key not in _shared_frames:
+                for stale in [k for k in _shared_frames if k[1] != key[1]]:
+                    del _shared_frames[stale]
+                _shared_frames[key] = _read_frame(store_dir, columns, since)
+            return _shared_frames[key].copy()
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        print(f"⚠️ Price store unavailable ({e}). Reading equities from SQLite.")
+        conn = connect(db_path)
+        cols = ", ".join(columns) if columns else "*"
+        query = f"SELECT {cols} FROM {TABLE_NAME}"
+        params = ()
+        if since is not None:
+            query += " WHERE date >= ?"
+            params = (since,)
+        df = pd.read_sql(query, conn, params=params)
+        conn.close()
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+        return df
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        build_store()
+    else:
+        refresh_store()
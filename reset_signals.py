@@ -1,7 +1,7 @@
 # reset_signals.py
-import sqlite3
+from db import connect
 
-conn = sqlite3.connect("data/ngx_equities.db")
+conn = connect("data/ngx_equities.db")
 cursor = conn.cursor()
 
 cursor.execute("DROP TABLE IF EXISTS signals")
@@ -20,7 +20,12 @@ CREATE TABLE signals (
     action TEXT,
     buy_range TEXT,
     explanation TEXT,
-    limit_up_streak INTEGER
+    limit_up_streak INTEGER,
+    signal_tier TEXT,
+    volume_uptrend INTEGER,
+    inst_accum_30 REAL,
+    stealth_accum INTEGER,
+    PRIMARY KEY(name, date)
 )
 """)
 
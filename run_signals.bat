@@ -30,16 +30,7 @@ if %hour% gtr 16 (
 
 cd C:\Users\joyag\Projects\ngx_tracker
 
-echo 🔍 Running scraper
-python scraper.py
-
-echo 🔍 Running analyser
-python analyser.py
-
-echo 🔍 Running financial statements
-python ngx_financial_statements_notifier.py
-
-echo 🔍 Running director dealings
-python ngx_director_dealings_scraper.py
+echo 🔍 Running daily pipeline (scraper, analyser, statements, director dealings)
+python pipeline.py daily
 
 echo ✅ All tasks completed.
\ No newline at end of file
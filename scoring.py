@@ -0,0 +1,492 @@
+# scoring.py
+"""Signal scoring rules shared by analyser.py, analyser_core.py and backfills.
+
+smart_score()/score_row() are the original row-at-a-time rules.
+score_signals() applies the same thresholds and memory-progression rules to
+a whole feature frame at once and returns NumPy arrays, with the reasons
+packed into a bitmask so text is only built for rows that raise a signal.
+"""
+import numpy as np
+
+# === REASONS (bit order == order the row-wise rules append them) ===
+REASONS = [
+    "Price Up",
+    "Price Down",
+    "Volume Spike",
+    "Low Trade Count",
+    "High Trade Count",
+    "Strong Candle",
+    "Weak Candle",
+    "Stealth Accumulation",
+    "Accumulation Under Cover",
+    "Retail Buying Frenzy",
+    "Previously detected setup is strengthening — time to scale in.",
+    "Full institutional move confirmed.",
+    "Repeated weak signals — likely noise.",
+    "Signal re-emerging — possible retest.",
+    # analyser.py boosters, applied after smart_score()
+    "15-Day Volume Uptrend",
+    "10 of 30 Days Institutional Pattern",
+    "Stealth Accumulation (Volume Up, Price Flat)",
+    "Limit-Up Streak: {streak} day(s)",
+    "Retesting key level",
+    "Signal weakening",
+]
+REASON_BITS = {reason: np.int64(1) << i for i, reason in enumerate(REASONS)}
+LIMIT_UP_REASON = "Limit-Up Streak: {streak} day(s)"
+
+SETUP = "⚠️ Setup Detected"
+WATCHLIST = "👀 Watchlist Setup"
+PROGRESSING = "📈 Progressing Setup"
+INSTITUTIONAL = "Institutional Accumulation"
+RETAIL_FRENZY = "Retail Buying Frenzy"
+MOON_ALERT = "💥 Institution Moon Alert"
+
+
+def format_reason_text(reasons, row):
+    expl = []
+
+    if any("Limit-Up" in r for r in reasons):
+        days = row.get("limit_up_streak", 1)
+        expl.append(
+            f"The stock has hit its daily 10% limit for {int(days)} consecutive day(s)."
+        )
+
+    if "Volume Clustering" in reasons:
+        expl.append("Repeated volume spikes detected — institutional loading likely.")
+
+    if "Volume Spike" in reasons or "Moon Volume" in reasons:
+        expl.append("Today's volume surged above normal levels.")
+
+    if "Low Trade Count" in reasons:
+        expl.append("Few trades despite volume — signs of big buyers entering quietly.")
+
+    if "High Trade Count" in reasons:
+        expl.append("Many trades with low value — likely retail-driven action.")
+
+    if "Breakout Above Recent Range" in reasons:
+        expl.append(
+            "Price broke above recent 5-day high — potential breakout underway."
+        )
+
+    if "Higher High & Higher Low" in reasons:
+        expl.append("Uptrend confirmed — forming stronger highs and lows.")
+
+    if "Gap Up with Volume" in reasons:
+        expl.append("Opened significantly higher with strong volume.")
+
+    if "Weak Candle" in reasons and "Volume Spike" in reasons:
+        expl.append("Big volume but small price move — accumulation in progress.")
+
+    if "Price Up" in reasons and "Volume Spike" in reasons:
+        expl.append("Strong bullish move with high demand.")
+
+    if "Price Down" in reasons:
+        expl.append("Price declined — caution or exit may be needed.")
+
+    if "15-Day Volume Uptrend" in reasons:
+        expl.append("Sustained 15-day volume uptrend. Strong interest building.")
+
+    if "10 of 30 Days Institutional Pattern" in reasons:
+        expl.append(
+            "Institutional accumulation footprint seen 10+ times in last 30 days."
+        )
+
+    if "Stealth Accumulation (Volume Up, Price Flat)" in reasons:
+        expl.append(
+            "Volume rising steadily, but price stayed flat — signs of smart entry."
+        )
+
+    if "volume_uptrend" in row and row["volume_uptrend"]:
+        expl.append("15-day volume uptrend in progress.")
+
+    if "inst_accum_30" in row and row["inst_accum_30"] >= 10:
+        expl.append("Institutional footprint over 30 days.")
+
+    if "stealth_accum" in row and row["stealth_accum"]:
+        expl.append("Stealth accumulation detected.")
+
+    if "Previously detected setup now showing stronger behavior." in reasons:
+        expl.append(
+            "This stock was previously flagged. Now showing stronger momentum — time to scale in."
+        )
+
+    if "Full institutional move confirmed." in reasons:
+        expl.append("Full bullish confirmation. Strong buy signal.")
+
+    if "Repeated weak signals — likely noise." in reasons:
+        expl.append(
+            "Several weak alerts without follow-through. Likely false positive."
+        )
+
+    if not expl:
+        return ", ".join(reasons)  # fallback
+
+    return " ".join(expl)
+
+
+def smart_score(row):
+    score = 0
+    reasons = []
+    signal = None
+    action = None
+
+    # === Price action ===
+    if row["close"] > row["open"]:
+        score += 20
+        reasons.append("Price Up")
+    elif row["close"] < row["open"]:
+        score -= 10
+        reasons.append("Price Down")
+
+    # === Volume vs average ===
+    if row["volume"] > 1.5 * row["volume_5_avg"]:
+        score += 30
+        reasons.append("Volume Spike")
+    elif row["volume"] < 0.5 * row["volume_5_avg"]:
+        score -= 10
+
+    # === Trade count vs average ===
+    if row["trades"] < row["avg_trades_5"]:
+        score += 30
+        reasons.append("Low Trade Count")
+    elif row["trades"] > 2 * row["avg_trades_5"]:
+        score -= 10
+        reasons.append("High Trade Count")
+
+    # === Money flow value ===
+    if row["value"] > 50_000_000:
+        score += 20
+    elif row["value"] < 10_000_000:
+        score -= 10
+
+    # === Candle shape ===
+    body = abs(row["close"] - row["open"])
+    range_ = row["high"] - row["low"] + 1e-6
+    body_strength = body / range_
+    if body_strength > 0.6:
+        score += 10
+        reasons.append("Strong Candle")
+    elif body_strength < 0.3:
+        score -= 5
+        reasons.append("Weak Candle")
+
+    # === Combo behavior ===
+    if (
+        "Price Up" in reasons
+        and "Low Trade Count" in reasons
+        and "Volume Spike" in reasons
+    ):
+        reasons.append("Stealth Accumulation")
+        score += 20
+        signal = "Institutional Accumulation"
+        action = "BUY"
+    elif "Weak Candle" in reasons and "Volume Spike" in reasons:
+        reasons.append("Accumulation Under Cover")
+        score += 15
+    elif "Volume Spike" in reasons and "High Trade Count" in reasons:
+        reasons.append("Retail Buying Frenzy")
+        score += 10
+        signal = "Retail Buying Frenzy"
+        action = "AVOID"
+
+    # === 🧠 Memory-Based Signal Progression Logic ===
+    memory = row.get("memory", [])
+    recent_signals = memory[-3:] if memory else []
+
+    # 1️⃣ Progressing setup → BUY
+    if "⚠️ Setup Detected" in recent_signals and signal == "👀 Watchlist Setup":
+        signal = "📈 Progressing Setup"
+        action = "BUY SMALL"
+        reasons.append("Previously detected setup is strengthening — time to scale in.")
+
+    if (
+        "📈 Progressing Setup" in recent_signals
+        and signal == "Institutional Accumulation"
+    ):
+        signal = "💥 Institution Moon Alert"
+        action = "BUY CONFIRMED"
+        reasons.append("Full institutional move confirmed.")
+
+    # 3️⃣ Avoid Decaying Setup
+    if (
+        signal in ["👀 Watchlist Setup", "⚠️ Setup Detected"]
+        and "👀 Watchlist Setup" in recent_signals
+        and "⚠️ Setup Detected" in recent_signals
+    ):
+        score -= 20
+        reasons.append("Repeated weak signals — likely noise.")
+        action = "AVOID"
+
+    # 4️⃣ Handle potential retest at key level (if signal re-emerges with better volume)
+    if signal == "Institutional Accumulation" and "BUY" not in str(action):
+        if (
+            "⚠️ Setup Detected" in recent_signals
+            or "👀 Watchlist Setup" in recent_signals
+        ):
+            reasons.append("Signal re-emerging — possible retest.")
+            score += 10
+            action = "BUY SMALL"
+
+    # === Signal tier fallback ===
+    if not signal:
+        if score >= 75:
+            signal = "Institutional Accumulation"
+            action = "BUY"
+        elif score >= 60:
+            signal = "⚠️ Setup Detected"
+            action = "WATCH"
+        elif score >= 40:
+            signal = "👀 Watchlist Setup"
+            action = "WATCH"
+
+    return score, reasons, signal, action
+
+
+
+def score_row(row, last_close=None, last_action=None):
+    """Full analyser.py scoring for one row: smart_score() plus boosters."""
+    score, reasons, signal, action = smart_score(row)
+
+    # === 🔍 Trend Signal Boosters ===
+    if row.get("volume_uptrend", False):
+        score += 10
+        reasons.append("15-Day Volume Uptrend")
+
+    if row.get("inst_accum_30", 0) >= 10:
+        score += 15
+        reasons.append("10 of 30 Days Institutional Pattern")
+
+    if row.get("stealth_accum", False):
+        score += 20
+        reasons.append("Stealth Accumulation (Volume Up, Price Flat)")
+
+    streak = int(row.get("limit_up_streak", 0))
+
+    # === Override for Limit-Up
+    if streak >= 1:
+        score += 40
+        reasons.append(f"Limit-Up Streak: {streak} day(s)")
+        if streak == 1:
+            signal = "🚨 Limit-Up Watch"
+            action = "WATCH"
+        elif streak == 2:
+            signal = "💡 Limit-Up Accumulation"
+            action = "BUY SMALL"
+        elif streak >= 3:
+            signal = "🚀 Limit-Up Breakout"
+            action = "BUY CONFIRMED"
+
+    # === NEW: Retest Memory Logic
+    if last_close and abs(row["close"] - last_close) <= 0.02 * last_close:
+        score += 5
+        reasons.append("Retesting key level")
+
+    if last_action == "BUY" and signal == "WATCH":
+        reasons.append("Signal weakening")
+        signal = "EXIT"
+        action = "EXIT"
+
+    return score, reasons, signal, action
+
+
+# === BATCH ENGINE ===
+def _col(df, name, default=np.nan):
+    if name in df.columns:
+        return df[name].to_numpy(dtype=float, na_value=np.nan)
+    return np.full(len(df), default, dtype=float)
+
+
+def _memory_flags(df, memory):
+    """Per-row flags for the signals present in each stock's last three."""
+    if memory is None and "memory" in df.columns:
+        recents = [list(m or [])[-3:] for m in df["memory"]]
+    else:
+        memory = memory or {}
+        by_name = {name: list(memory.get(name, []))[-3:] for name in df["name"].unique()}
+        recents = [by_name[name] for name in df["name"]]
+    flags = {}
+    for label in (SETUP, WATCHLIST, PROGRESSING):
+        flags[label] = np.fromiter(
+            (label in recent for recent in recents), dtype=bool, count=len(recents)
+        )
+    return flags
+
+
+def score_signals(df, memory=None, last_close=None, last_action=None):
+    """Vectorized score_row() over every row of a feature frame.
+
+    memory      -- {name: [recent signals]}; defaults to a "memory" column
+    last_close  -- per-row array of the stock's last remembered close
+    last_action -- per-row array of the stock's last remembered action
+
+    Returns a dict of aligned arrays: score, signal, action, reasons
+    (bitmask over REASONS) and limit_up_streak.
+    """
+    n = len(df)
+    open_ = _col(df, "open")
+    close = _col(df, "close")
+    high = _col(df, "high")
+    low = _col(df, "low")
+    volume = _col(df, "volume")
+    trades = _col(df, "trades")
+    value = _col(df, "value")
+    volume_5_avg = _col(df, "volume_5_avg")
+    avg_trades_5 = _col(df, "avg_trades_5")
+
+    score = np.zeros(n, dtype=np.int64)
+    reasons = np.zeros(n, dtype=np.int64)
+    signal = np.full(n, None, dtype=object)
+    action = np.full(n, None, dtype=object)
+
+    def flag(mask, reason, points=0):
+        nonlocal score
+        reasons[mask] |= REASON_BITS[reason]
+        score += np.where(mask, points, 0)
+
+    # === Price action ===
+    price_up = close > open_
+    price_down = ~price_up & (close < open_)
+    flag(price_up, "Price Up", 20)
+    flag(price_down, "Price Down", -10)
+
+    # === Volume vs average ===
+    volume_spike = volume > 1.5 * volume_5_avg
+    flag(volume_spike, "Volume Spike", 30)
+    score -= np.where(~volume_spike & (volume < 0.5 * volume_5_avg), 10, 0)
+
+    # === Trade count vs average ===
+    low_trades = trades < avg_trades_5
+    high_trades = ~low_trades & (trades > 2 * avg_trades_5)
+    flag(low_trades, "Low Trade Count", 30)
+    flag(high_trades, "High Trade Count", -10)
+
+    # === Money flow value ===
+    big_money = value > 50_000_000
+    score += np.where(big_money, 20, 0)
+    score -= np.where(~big_money & (value < 10_000_000), 10, 0)
+
+    # === Candle shape ===
+    body_strength = np.abs(close - open_) / (high - low + 1e-6)
+    strong_candle = body_strength > 0.6
+    weak_candle = ~strong_candle & (body_strength < 0.3)
+    flag(strong_candle, "Strong Candle", 10)
+    flag(weak_candle, "Weak Candle", -5)
+
+    # === Combo behavior ===
+    stealth = price_up & low_trades & volume_spike
+    under_cover = ~stealth & weak_candle & volume_spike
+    frenzy = ~stealth & ~under_cover & volume_spike & high_trades
+    flag(stealth, "Stealth Accumulation", 20)
+    flag(under_cover, "Accumulation Under Cover", 15)
+    flag(frenzy, "Retail Buying Frenzy", 10)
+    signal[stealth] = INSTITUTIONAL
+    action[stealth] = "BUY"
+    signal[frenzy] = RETAIL_FRENZY
+    action[frenzy] = "AVOID"
+
+    # === 🧠 Memory-Based Signal Progression Logic ===
+    recent = _memory_flags(df, memory)
+
+    progressing = recent[SETUP] & (signal == WATCHLIST)
+    signal[progressing] = PROGRESSING
+    action[progressing] = "BUY SMALL"
+    flag(progressing, "Previously detected setup is strengthening — time to scale in.")
+
+    moon = recent[PROGRESSING] & (signal == INSTITUTIONAL)
+    signal[moon] = MOON_ALERT
+    action[moon] = "BUY CONFIRMED"
+    flag(moon, "Full institutional move confirmed.")
+
+    decaying = (
+        ((signal == WATCHLIST) | (signal == SETUP))
+        & recent[WATCHLIST]
+        & recent[SETUP]
+    )
+    flag(decaying, "Repeated weak signals — likely noise.", -20)
+    action[decaying] = "AVOID"
+
+    has_buy = np.fromiter(("BUY" in str(a) for a in action), dtype=bool, count=n)
+    retest = (signal == INSTITUTIONAL) & ~has_buy & (recent[SETUP] | recent[WATCHLIST])
+    flag(retest, "Signal re-emerging — possible retest.", 10)
+    action[retest] = "BUY SMALL"
+
+    # === Signal tier fallback ===
+    no_signal = signal == None  # noqa: E711 -- elementwise on object array
+    for threshold, tier, tier_action in (
+        (75, INSTITUTIONAL, "BUY"),
+        (60, SETUP, "WATCH"),
+        (40, WATCHLIST, "WATCH"),
+    ):
+        hit = no_signal & (score >= threshold)
+        signal[hit] = tier
+        action[hit] = tier_action
+        no_signal &= ~hit
+
+    # === 🔍 Trend Signal Boosters ===
+    # Truthiness as in row.get(...): NaN counts as set, like the row-wise rules
+    flag(_col(df, "volume_uptrend", 0) != 0, "15-Day Volume Uptrend", 10)
+    flag(_col(df, "inst_accum_30", 0) >= 10, "10 of 30 Days Institutional Pattern", 15)
+    flag(
+        _col(df, "stealth_accum", 0) != 0,
+        "Stealth Accumulation (Volume Up, Price Flat)",
+        20,
+    )
+
+    # === Override for Limit-Up
+    streak = np.nan_to_num(_col(df, "limit_up_streak", 0)).astype(np.int64)
+    flag(streak >= 1, LIMIT_UP_REASON, 40)
+    for hit, tier, tier_action in (
+        (streak == 1, "🚨 Limit-Up Watch", "WATCH"),
+        (streak == 2, "💡 Limit-Up Accumulation", "BUY SMALL"),
+        (streak >= 3, "🚀 Limit-Up Breakout", "BUY CONFIRMED"),
+    ):
+        signal[hit] = tier
+        action[hit] = tier_action
+
+    # === Retest Memory Logic
+    if last_close is not None:
+        last_close = np.asarray(last_close, dtype=float)
+        with np.errstate(invalid="ignore"):
+            retesting = (
+                ~np.isnan(last_close)
+                & (last_close != 0)
+                & (np.abs(close - last_close) <= 0.02 * last_close)
+            )
+        flag(retesting, "Retesting key level", 5)
+
+    if last_action is not None:
+        weakening = (np.asarray(last_action, dtype=object) == "BUY") & (
+            signal == "WATCH"
+        )
+        flag(weakening, "Signal weakening")
+        signal[weakening] = "EXIT"
+        action[weakening] = "EXIT"
+
+    return {
+        "score": score,
+        "signal": signal,
+        "action": action,
+        "reasons": reasons,
+        "limit_up_streak": streak,
+    }
+
+
+def decode_reasons(mask, streak=0):
+    """Expand a reasons bitmask back into the row-wise reason list."""
+    mask = int(mask)
+    return [
+        reason.format(streak=int(streak)) if reason == LIMIT_UP_REASON else reason
+        for i, reason in enumerate(REASONS)
+        if mask >> i & 1
+    ]
+
+
+def signal_tier(score):
+    if score >= 75:
+        return "confirmed"
+    if score >= 60:
+        return "setup"
+    if score >= 40:
+        return "watchlist"
+    return "none"
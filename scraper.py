@@ -6,13 +6,17 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import chromedriver_autoinstaller
+import lxml.html
 from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime
 import pandas as pd
-import sqlite3
+from db import connect
 import os
+import sys
 import time
 from datetime import datetime
+from price_store import refresh_store
+from sector_cube import update_sector_cube
 
 # Skip if it's Saturday (5) or Sunday (6)
 # if datetime.today().weekday() >= 5:
@@ -24,18 +28,27 @@ from datetime import datetime
 CHROMEDRIVER_PATH = "C:\\chromedriver\\chromedriver.exe"
 DB_PATH = "data/ngx_equities.db"
 START_URL = "https://ngxgroup.com/exchange/data/equities-price-list/"
+TABLE_CSS = "table.dataTable"
+ROWS_CSS = "table.dataTable tbody tr"
+WAIT_SECONDS = 30
+
+driver = None
+
 
 # === SETUP DRIVER ===
-# Automatically downloads & installs correct version
-chromedriver_autoinstaller.install()
-options = Options()
-options.add_argument("--headless")
-options.add_argument("--window-size=1920,1080")
-options.add_argument("--start-maximized")
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()), options=options
-)
-# driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
+def start_driver():
+    global driver
+    # Automatically downloads & installs correct version
+    chromedriver_autoinstaller.install()
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--start-maximized")
+    driver = webdriver.Chrome(
+        service=Service(ChromeDriverManager().install()), options=options
+    )
+    # driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
+    return driver
 
 
 # === UTILS ===
@@ -63,50 +76,89 @@ def safe_int(text):
         return 0
 
 
+# === PARSE PAGE SOURCE ===
+def parse_row(cells):
+    return {
+        "name": cells[0].strip(),
+        "previous_close": safe_float(cells[1]),
+        "open": safe_float(cells[2]),
+        "high": safe_float(cells[3]),
+        "low": safe_float(cells[4]),
+        "close": safe_float(cells[5]),
+        "change": safe_float(cells[6].replace("%", "")),
+        "trades": safe_int(cells[7]),
+        "volume": safe_int(cells[8]),
+        "value": safe_float(cells[9]),
+        "date": datetime.strptime(cells[10].strip(), "%d %b %y").strftime("%Y-%m-%d"),
+    }
+
+
+def parse_price_table(html):
+    """Parse every row of the price list table out of one HTML snapshot."""
+    tree = lxml.html.fromstring(html)
+    data = []
+    for tr in tree.xpath("//table[contains(concat(' ', @class, ' '), ' dataTable ')]/tbody/tr"):
+        cells = [td.text_content() for td in tr.xpath("./td")]
+        if len(cells) < 11:
+            continue
+        try:
+            data.append(parse_row(cells))
+        except Exception as e:
+            print(f"   ⚠️ Skipping row due to error: {e}")
+    return data
+
+
+# === WAIT CONDITIONS ===
+def table_rows_rendered(drv):
+    # DataTables knows how many rows the current page should show
+    return drv.execute_script(
+        """
+        const rows = document.querySelectorAll(arguments[0]).length;
+        if (window.jQuery && jQuery.fn.dataTable && jQuery(arguments[1]).length) {
+            const info = jQuery(arguments[1]).DataTable().page.info();
+            const expected = info.length < 0 ? info.recordsDisplay : info.end - info.start;
+            return rows > 0 && rows >= expected;
+        }
+        return rows > 0;
+        """,
+        ROWS_CSS,
+        TABLE_CSS,
+    )
+
+
+def show_all_rows():
+    """Switch the table's page length to "All" so one page_source has every row."""
+    try:
+        switched = driver.execute_script(
+            """
+            if (!(window.jQuery && jQuery.fn.dataTable)) return false;
+            const table = jQuery(arguments[0]).DataTable();
+            table.page.len(-1).draw();
+            return table.page.len() === -1;
+            """,
+            TABLE_CSS,
+        )
+        if switched:
+            WebDriverWait(driver, WAIT_SECONDS).until(table_rows_rendered)
+            return True
+    except Exception as e:
+        print(f"ℹ️ Could not set page length to All: {e}")
+    return False
+
+
 # === SCRAPE A SINGLE PAGE ===
 def scrape_current_page():
     try:
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table.dataTable"))
+        WebDriverWait(driver, WAIT_SECONDS).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, TABLE_CSS))
         )
-        time.sleep(1)  # let JS finish
-
-        rows = driver.find_elements(By.CSS_SELECTOR, "table.dataTable tbody tr")
-        print(f"   ⏳ Found {len(rows)} rows")
-
-        data = []
-        for i, row in enumerate(rows):
-            cols = row.find_elements(By.TAG_NAME, "td")
-            if len(cols) < 11:
-                continue
-
-            try:
-                if i == 0:
-                    print("🧪 Sample row data:")
-                    for idx, col in enumerate(cols):
-                        print(f"  Col {idx}: {col.text}")
-
-                record = {
-                    "name": cols[0].text.strip(),
-                    "previous_close": safe_float(cols[1].text),
-                    "open": safe_float(cols[2].text),
-                    "high": safe_float(cols[3].text),
-                    "low": safe_float(cols[4].text),
-                    "close": safe_float(cols[5].text),
-                    "change": safe_float(cols[6].text.replace("%", "")),
-                    "trades": safe_int(cols[7].text),
-                    "volume": safe_int(cols[8].text),
-                    "value": safe_float(cols[9].text),
-                    "date": datetime.strptime(
-                        cols[10].text.strip(), "%d %b %y"
-                    ).strftime("%Y-%m-%d"),
-                }
-                data.append(record)
-
-            except Exception as e:
-                print(f"   ⚠️ Skipping row due to error: {e}")
-
-        return data  # ✅ <-- this was missing
+        WebDriverWait(driver, WAIT_SECONDS).until(table_rows_rendered)
+
+        data = parse_price_table(driver.page_source)
+        print(f"   ⏳ Parsed {len(data)} rows")
+        if data:
+            print("🧪 Sample row data:", data[0])
+        return data
 
     except Exception as e:
         print(f"❌ Error scraping current page: {e}")
@@ -116,11 +168,22 @@ def scrape_current_page():
 
 
 # === HANDLE PAGINATION ===
-def scrape_all_pages():
+def scrape_all_pages(save_fixture=None):
     print("🚀 Starting NGX equities scrape...")
     driver.get(START_URL)
-    time.sleep(3)
+    WebDriverWait(driver, WAIT_SECONDS).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, TABLE_CSS))
+    )
+
+    if show_all_rows():
+        print("📄 Page length set to All")
+        if save_fixture:
+            with open(save_fixture, "w", encoding="utf-8") as f:
+                f.write(driver.page_source)
+            print(f"💾 Saved page source to {save_fixture}")
+        return pd.DataFrame(scrape_current_page())
 
+    # Fallback: walk the pages, waiting for each redraw instead of sleeping
     all_data = []
     page = 1
 
@@ -137,9 +200,10 @@ def scrape_all_pages():
             if "disabled" in next_btn.get_attribute("class"):
                 print("✅ Reached last page.")
                 break
+            first_row = driver.find_element(By.CSS_SELECTOR, ROWS_CSS)
             driver.execute_script("arguments[0].click();", next_btn)
+            WebDriverWait(driver, WAIT_SECONDS).until(EC.staleness_of(first_row))
             page += 1
-            time.sleep(2)
         except:
             print("✅ No more pages or pagination failed.")
             break
@@ -147,10 +211,23 @@ def scrape_all_pages():
     return pd.DataFrame(all_data)
 
 
+# === FIXTURE MODE ===
+def benchmark_fixture(path, repeat=20):
+    """Parse a saved page_source offline and report rows and parse time."""
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        data = parse_price_table(html)
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"🧪 {path}: {len(data)} rows parsed in {elapsed * 1000:.1f} ms (avg of {repeat})")
+    return pd.DataFrame(data)
+
+
 # === STORE TO SQLITE ===
 def store_to_db(df):
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
 
     # Check if df has a valid date
     if "date" not in df.columns or df.empty:
@@ -212,14 +289,27 @@ def store_to_db(df):
     )
 
     conn.commit()
+    update_sector_cube(conn, [new_date])
     conn.close()
     print(f"✅ Stored {len(df)} records into database.")
 
 
 # === MAIN ===
 if __name__ == "__main__":
+    # python scraper.py --fixture page.html   -> parse a saved page, no browser/DB
+    # python scraper.py --save-fixture page.html -> live scrape, also keep the HTML
+    if "--fixture" in sys.argv:
+        df = benchmark_fixture(sys.argv[sys.argv.index("--fixture") + 1])
+        print(df.head())
+        sys.exit()
+
+    save_fixture = None
+    if "--save-fixture" in sys.argv:
+        save_fixture = sys.argv[sys.argv.index("--save-fixture") + 1]
+
     os.makedirs("screenshots", exist_ok=True)
-    df = scrape_all_pages()
+    start_driver()
+    df = scrape_all_pages(save_fixture)
     expected_cols = [
         "name",
         "previous_close",
@@ -236,6 +326,7 @@ if __name__ == "__main__":
     if not all(col in df.columns for col in expected_cols):
         print("❌ Dataframe missing expected columns!")
         print("📋 Columns found:", df.columns.tolist())
+        driver.quit()
         exit()
 
     driver.quit()
@@ -248,6 +339,7 @@ if __name__ == "__main__":
         df["change_pct"] = df["change_pct"].round(2)
 
         store_to_db(df)
+        refresh_store(DB_PATH)
         print(df.head())
     else:
         print("⚠️ No data to store.")
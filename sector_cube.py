@@ -0,0 +1,177 @@
+# sector_cube.py
+"""Daily per-sector aggregates of equities, kept in sector_daily.
+
+One row per (date, main_sector, sub_sector) with volume, value, trades,
+advancers/decliners and average change, so the dashboard's sector views read a
+few dozen rows instead of grouping equities on every rerun. The ingest scripts
+call update_sector_cube() for the dates they wrote; without explicit dates only
+dates missing from the cube (plus its latest date, which a re-scrape may have
+replaced) are aggregated. Sectors come from the symbols table, so csv_db.py
+rebuilds the cube whenever a stock is re-classified.
+
+    python sector_cube.py            # aggregate new dates
+    python sector_cube.py --rebuild  # recompute every date
+"""
+import sys
+
+import pandas as pd
+
+from db import connect
+from symbols import SYMBOLS_TABLE, ensure_symbols
+
+# === CONFIG ===
+DB_PATH = "data/ngx_equities.db"
+CUBE_TABLE = "sector_daily"
+DATE_CHUNK = 500  # dates per INSERT ... SELECT, well under SQLite's variable limit
+
+
+def ensure_table(conn):
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {CUBE_TABLE} (
+            date TEXT,
+            main_sector TEXT,
+            sub_sector TEXT,
+            stocks INTEGER,
+            volume REAL,
+            value REAL,
+            trades REAL,
+            advancers INTEGER,
+            decliners INTEGER,
+            change_count INTEGER,
+            avg_change REAL,
+            PRIMARY KEY (date, main_sector, sub_sector)
+        )
+        """
+    )
+
+
+def pending_dates(conn):
+    """Dates in equities that the cube lacks, plus the cube's latest date."""
+    dates = {
+        d
+        for (d,) in conn.execute(
+            f"SELECT DISTINCT date FROM equities EXCEPT SELECT DISTINCT date FROM {CUBE_TABLE}"
+        )
+    }
+    last_date = conn.execute(f"SELECT MAX(date) FROM {CUBE_TABLE}").fetchone()[0]
+    if last_date is not None:
+        dates.add(last_date)
+    return sorted(d for d in dates if d is not None)
+
+
+def update_sector_cube(conn, dates=None, rebuild=False):
+    """(Re)aggregate `dates` (default: pending_dates) into sector_daily."""
+    ensure_symbols(conn)
+    ensure_table(conn)
+    if rebuild:
+        dates = [d for (d,) in conn.execute("SELECT DISTINCT date FROM equities") if d]
+    elif dates is None:
+        dates = pending_dates(conn)
+    dates = sorted(set(dates))
+
+    with conn:
+        for i in range(0, len(dates), DATE_CHUNK):
+            chunk = dates[i : i + DATE_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            conn.execute(f"DELETE FROM {CUBE_TABLE} WHERE date IN ({placeholders})", chunk)
+            conn.execute(
+                f"""
+                INSERT INTO {CUBE_TABLE}
+                SELECT e.date, s.main_sector, s.sub_sector,
+                       COUNT(*),
+                       SUM(e.volume),
+                       SUM(e.value),
+                       SUM(e.trades),
+                       SUM(e.close > e.previous_close),
+                       SUM(e.close < e.previous_close),
+                       COUNT(e.change_pct),
+                       AVG(e.change_pct)
+                FROM equities e
+                LEFT JOIN {SYMBOLS_TABLE} s ON s.symbol_id = e.symbol_id
+                WHERE e.date IN ({placeholders})
+                GROUP BY e.date, s.main_sector, s.sub_sector
+                """,
+                chunk,
+            )
+    return dates
+
+
+# === READERS ===
+def cube_dates(conn, before=None, through=None, limit=None):
+    """Trading dates in the cube, newest first."""
+    ensure_table(conn)
+    query = f"SELECT DISTINCT date FROM {CUBE_TABLE}"
+    params = []
+    if before is not None:
+        query += " WHERE date < ?"
+        params.append(before)
+    elif through is not None:
+        query += " WHERE date <= ?"
+        params.append(through)
+    query += " ORDER BY date DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return [d for (d,) in conn.execute(query, params)]
+
+
+def frame_cube_dates(cube, before=None, through=None, limit=None):
+    """cube_dates() for a sector_daily frame (e.g. from a dashboard snapshot)."""
+    dates = cube["date"].dropna()
+    if before is not None:
+        dates = dates[dates < before]
+    elif through is not None:
+        dates = dates[dates <= through]
+    dates = sorted(dates.unique(), reverse=True)
+    return dates[:limit] if limit is not None else dates
+
+
+def frame_sector_totals(cube, dates_list, level="main_sector"):
+    """sector_totals() over sector_daily rows already in memory."""
+    columns = [level, "total_volume", "total_value", "total_trades",
+               "advancers", "decliners", "avg_change", "vol_share"]
+    rows = cube[cube["date"].isin(list(dates_list))]
+    if rows.empty:
+        return pd.DataFrame(columns=columns)
+    rows = rows.assign(_weighted_change=rows["avg_change"] * rows["change_count"])
+    df = (
+        rows.groupby(level, dropna=False)
+        .agg(
+            total_volume=("volume", lambda s: s.sum(min_count=1)),
+            total_value=("value", lambda s: s.sum(min_count=1)),
+            total_trades=("trades", lambda s: s.sum(min_count=1)),
+            advancers=("advancers", lambda s: s.sum(min_count=1)),
+            decliners=("decliners", lambda s: s.sum(min_count=1)),
+            _weighted_change=("_weighted_change", lambda s: s.sum(min_count=1)),
+            change_count=("change_count", "sum"),
+        )
+        .reset_index()
+    )
+    df["avg_change"] = df["_weighted_change"] / df["change_count"].where(df["change_count"] > 0)
+    total = df["total_volume"].sum()
+    df["vol_share"] = (df["total_volume"] / total * 100) if total else 0.0
+    return df[columns]
+
+
+def sector_totals(conn, dates_list, level="main_sector"):
+    """Totals per sector (or sub-sector) over the given dates, with volume share (%)."""
+    if not dates_list:
+        return frame_sector_totals(pd.DataFrame(columns=["date"]), [], level)
+    placeholders = ",".join(["?"] * len(dates_list))
+    cube = pd.read_sql(
+        f"SELECT * FROM {CUBE_TABLE} WHERE date IN ({placeholders})",
+        conn,
+        params=list(dates_list),
+    )
+    return frame_sector_totals(cube, dates_list, level)
+
+
+if __name__ == "__main__":
+    conn = connect(DB_PATH)
+    dates = update_sector_cube(conn, rebuild="--rebuild" in sys.argv)
+    conn.close()
+    if dates:
+        print(f"✅ {CUBE_TABLE}: aggregated {len(dates)} date(s), {dates[0]} → {dates[-1]}")
+    else:
+        print(f"ℹ️ {CUBE_TABLE} is up to date.")
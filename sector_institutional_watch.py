@@ -1,9 +1,10 @@
 # sector_institutional.py
 
 import pandas as pd
-import sqlite3
+from db import connect
 from datetime import datetime
-from sector_map import sector_map
+from price_store import load_equities
+from symbols import attach_symbols, ensure_symbols
 
 # === CONFIG ===
 DB_PATH = "data/ngx_equities.db"
@@ -11,27 +12,16 @@ STEALTH_LOOKBACK_DAYS = 14
 MIN_BUIDUP_DAYS = 2
 MIN_ZONE_DAYS = 3
 
-preferred_stocks = set([
-    "ZENITHBANK", "GTCO", "ACCESSCORP", "UBA", "STANBIC", "FBNH", "MTNN", "BUACEMENT",
-    "DANGCEM", "SEPLAT", "NESTLE", "NB", "GUINNESS", "WAPCO", "FLOURMILL", "DANGSUGAR",
-    "INTBREW", "GEREGU", "ETI", "PZ", "CUSTODIAN", "UCAP", "STERLINGNG", "FIDELITYBK",
-    "TRANSCORP", "NASCON", "CADBURY", "UNILEVER", "BERGER", "OANDO", "JAIZBANK",
-    "WEMABANK", "UNITYBNK", "AIICO", "SOVRENINS", "MANSARD", "NEM", "AFRIPRUD",
-    "HONYFLOUR", "MAYBAKER", "VITAFOAM", "CHAMPION", "IKEJAHOTEL", "JOHNHOLT", "TIP",
-    "TRANSCORP HOTELS", "UACN", "BUAFOODS", "CORNERST", "LIVESTOCK", "UPDCREIT",
-    "NAHCO", "MCNICHOLS", "ETERNA", "FIDSON", "FCMB", "OKOMUOIL", "CWG", "PRESCO"
-])
-
 # === LOAD DATA ===
-conn = sqlite3.connect(DB_PATH)
-df = pd.read_sql("SELECT * FROM equities", conn)
-df["date"] = pd.to_datetime(df["date"])
+conn = connect(DB_PATH)
+ensure_symbols(conn)
+df = attach_symbols(load_equities(DB_PATH), conn, ["sub_sector", "preferred"])
 conn.close()
 
 cutoff = df["date"].max() - pd.Timedelta(days=STEALTH_LOOKBACK_DAYS)
 df = df[df["date"] >= cutoff].copy()
-#df = df[df["name"].isin(preferred_stocks)]
-df["sector"] = df["sub_sector"] #df["name"].map(sector_map).fillna("Other")
+#df = df[df["preferred"] == 1]
+df["sector"] = df["sub_sector"]
 df = df.sort_values(by=["name", "date"])
 
 # === DETECT STEALTH ===
@@ -88,7 +78,7 @@ sector_summary = (
 sector_summary["date_generated"] = datetime.today().strftime("%Y-%m-%d")
 
 # === SAVE TO DB ===
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH)
 conn.execute("DROP TABLE IF EXISTS sector_stealth_summary")
 sector_summary.to_sql("sector_stealth_summary", conn, index=False)
 
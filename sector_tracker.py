@@ -1,24 +1,25 @@
 # sector_tracker.py
 import pandas as pd
-import sqlite3
 from datetime import datetime
-from sector_map import sector_map  # This must be a dict: { 'ZENITHBANK': 'Banking', ... }
+from db import connect
+from price_store import load_equities
+from symbols import attach_symbols, ensure_symbols
 
 # === DB Config ===
 DB_PATH = "data/ngx_equities.db"
 
 def main():
     # === Load Latest Day's Data ===
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql("SELECT * FROM equities", conn)
-    conn.close()
-
-    df['date'] = pd.to_datetime(df['date'])
+    conn = connect(DB_PATH)
+    ensure_symbols(conn)
+    df = load_equities(DB_PATH)
     latest_date = df['date'].max()
     df_today = df[df['date'] == latest_date].copy()
 
-    # === Map sectors ===
-    df_today['sector'] = df_today['name'].map(sector_map)
+    # === Map sectors (symbols table, by symbol_id) ===
+    df_today = attach_symbols(df_today, conn, ['sub_sector'])
+    conn.close()
+    df_today['sector'] = df_today['sub_sector']
     df_today = df_today.dropna(subset=['sector'])
 
     # === Calculate metrics ===
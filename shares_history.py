@@ -0,0 +1,125 @@
+# shares_history.py
+"""Point-in-time shares outstanding, and the market-cap columns derived from it.
+
+shares_outstanding_history keeps one row per (symbol_id, effective_date), one
+version per NGX "SHARES OUTSTANDING FOR dd-mm-yyyy" PDF (see
+parse_shares_pdf.py). add_market_cap() as-of joins it onto an equities frame:
+each row gets the shares from the latest filing on or before its date, so
+history is never valued with shares issued later. Rows dated before the first
+filing get no market cap.
+"""
+import numpy as np
+import pandas as pd
+
+from symbols import SYMBOLS_TABLE, ensure_symbols
+
+# === CONFIG ===
+HISTORY_TABLE = "shares_outstanding_history"
+MARKET_CAP_COLUMNS = ["shares_outstanding", "market_cap", "turnover", "value_to_market_cap"]
+
+
+def ensure_table(conn):
+    ensure_symbols(conn)
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+            symbol_id INTEGER,
+            effective_date TEXT,
+            shares_outstanding REAL,
+            price REAL,
+            market_cap REAL,
+            source TEXT,
+            PRIMARY KEY (symbol_id, effective_date)
+        )
+        """
+    )
+
+
+def ingested_dates(conn):
+    ensure_table(conn)
+    return {d for (d,) in conn.execute(f"SELECT DISTINCT effective_date FROM {HISTORY_TABLE}")}
+
+
+def store_filing(conn, effective_date, rows, source=None):
+    """Replace one filing's rows. `rows` are dicts with symbol/shares_outstanding/price/market_cap."""
+    ensure_table(conn)
+    symbols = sorted({r["symbol"] for r in rows})
+    with conn:
+        # Same guard as the equities trigger: never replace an existing symbols row
+        conn.executemany(
+            f"""
+            INSERT INTO {SYMBOLS_TABLE} (symbol)
+            SELECT ? WHERE NOT EXISTS (SELECT 1 FROM {SYMBOLS_TABLE} WHERE symbol = ?)
+            """,
+            [(s, s) for s in symbols],
+        )
+        ids = dict(conn.execute(f"SELECT symbol, symbol_id FROM {SYMBOLS_TABLE}"))
+        conn.execute(f"DELETE FROM {HISTORY_TABLE} WHERE effective_date = ?", (effective_date,))
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO {HISTORY_TABLE}
+            (symbol_id, effective_date, shares_outstanding, price, market_cap, source)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    ids[r["symbol"]],
+                    effective_date,
+                    r["shares_outstanding"],
+                    r["price"],
+                    r["market_cap"],
+                    source,
+                )
+                for r in rows
+            ],
+        )
+    return len(rows)
+
+
+def load_history(conn):
+    ensure_table(conn)
+    history = pd.read_sql(
+        f"SELECT symbol_id, effective_date, shares_outstanding FROM {HISTORY_TABLE}", conn
+    )
+    history["effective_date"] = pd.to_datetime(history["effective_date"]).astype("datetime64[ns]")
+    return history
+
+
+# === AS-OF JOIN ===
+def add_market_cap(df, conn):
+    """Add MARKET_CAP_COLUMNS to an equities frame (needs symbol_id, date, close, volume, value).
+
+    turnover is volume / shares outstanding; the PDFs carry no free-float
+    figure, so it is measured against all shares in issue.
+    """
+    history = load_history(conn).sort_values("effective_date")
+    out = df.drop(columns=[c for c in MARKET_CAP_COLUMNS if c in df.columns])
+    if history.empty:
+        for col in MARKET_CAP_COLUMNS:
+            out[col] = np.nan
+        return out
+
+    left = out[["symbol_id", "date"]].copy()
+    left["date"] = pd.to_datetime(left["date"]).astype("datetime64[ns]")
+    left["_row"] = range(len(left))
+    history["symbol_id"] = history["symbol_id"].astype(left["symbol_id"].dtype)
+    matched = pd.merge_asof(
+        left.dropna(subset=["symbol_id", "date"]).sort_values("date"),
+        history,
+        left_on="date",
+        right_on="effective_date",
+        by="symbol_id",
+        direction="backward",
+    )
+    shares = np.full(len(left), np.nan)
+    shares[matched["_row"].to_numpy()] = matched["shares_outstanding"].to_numpy()
+
+    market_cap = pd.to_numeric(out["close"], errors="coerce").to_numpy() * shares
+    with np.errstate(divide="ignore", invalid="ignore"):
+        turnover = pd.to_numeric(out["volume"], errors="coerce").to_numpy() / shares
+        value_ratio = pd.to_numeric(out["value"], errors="coerce").to_numpy() / market_cap
+    out["shares_outstanding"] = shares
+    out["market_cap"] = market_cap
+    out["turnover"] = turnover
+    out["value_to_market_cap"] = value_ratio
+    return out
@@ -0,0 +1,160 @@
+# signals_grid.py
+"""Server-side filtering, sorting and paging of the signals table for app.py.
+
+The dashboard's Signals grid hands its filters (date range, signal tier,
+action, sector, minimum confidence, ...) and sort order to SQLite and fetches
+one page with LIMIT/OFFSET, instead of loading every signal since the cutoff
+into pandas. Row highlighting comes from signals.row_category, which
+analyser.py refreshes with one UPDATE per run, so the dashboard styles a page
+by lookup instead of testing every row in Python.
+"""
+import pandas as pd
+
+# === CONFIG ===
+SIGNALS_SINCE = "2025-11-01"
+GRID_COLUMNS = [
+    "name",
+    "date",
+    "signal",
+    "confidence_score",
+    "action",
+    "buy_range",
+    "explanation",
+    "signal_tier",
+    "main_sector",
+]
+SORT_COLUMNS = ["date", "confidence_score", "name", "signal", "action", "signal_tier"]
+JOINS = "FROM signals sg LEFT JOIN symbols s ON s.symbol = sg.name"
+
+# Limit-Up signals and confirmed/small buys are highlighted in the grid
+ROW_CATEGORY_SQL = (
+    "CASE WHEN instr(signal, 'Limit-Up') > 0 OR action IN ('BUY CONFIRMED', 'BUY SMALL') "
+    "THEN 'highlight' ELSE 'normal' END"
+)
+ROW_STYLES = {"highlight": "background-color: #fff7e6"}  # Light gold
+
+
+# === SCHEMA ===
+def _signal_columns(conn):
+    return {row[1] for row in conn.execute("PRAGMA table_info(signals)")}
+
+
+def ensure_signal_indexes(conn):
+    """row_category column plus the indexes the grid's filters and sorts use."""
+    if "row_category" not in _signal_columns(conn):
+        conn.execute("ALTER TABLE signals ADD COLUMN row_category TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_date ON signals (date)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_signals_tier_date ON signals (signal_tier, date)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_action_date ON signals (action, date)")
+
+
+def refresh_row_category(conn):
+    """Recompute row_category where it is missing or stale; returns rows changed."""
+    ensure_signal_indexes(conn)
+    cursor = conn.execute(
+        f"UPDATE signals SET row_category = {ROW_CATEGORY_SQL} "
+        f"WHERE row_category IS NOT {ROW_CATEGORY_SQL}"
+    )
+    return cursor.rowcount
+
+
+# === QUERIES ===
+def filter_options(conn, since=SIGNALS_SINCE):
+    """Values for the grid's filter widgets."""
+
+    def distinct(column):
+        return [
+            v
+            for (v,) in conn.execute(
+                f"SELECT DISTINCT {column} FROM signals "
+                f"WHERE date >= ? AND {column} IS NOT NULL ORDER BY {column}",
+                (since,),
+            )
+        ]
+
+    first, last = conn.execute(
+        "SELECT MIN(date), MAX(date) FROM signals WHERE date >= ?", (since,)
+    ).fetchone()
+    sectors = [
+        s
+        for (s,) in conn.execute(
+            "SELECT DISTINCT main_sector FROM symbols "
+            "WHERE main_sector IS NOT NULL ORDER BY main_sector"
+        )
+    ]
+    return {
+        "first_date": first,
+        "last_date": last,
+        "signals": distinct("signal"),
+        "actions": distinct("action"),
+        "tiers": distinct("signal_tier"),
+        "names": distinct("name"),
+        "sectors": sectors,
+    }
+
+
+def _where(filters):
+    clauses, params = ["sg.date >= ?"], [filters.get("start") or SIGNALS_SINCE]
+    if filters.get("end"):
+        clauses.append("sg.date <= ?")
+        params.append(filters["end"])
+    for key, column in (("tiers", "sg.signal_tier"), ("actions", "sg.action"), ("signals", "sg.signal")):
+        values = list(filters.get(key) or [])
+        if values:
+            clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params += values
+    if filters.get("name"):
+        clauses.append("sg.name = ?")
+        params.append(filters["name"])
+    if filters.get("sector"):
+        clauses.append("s.main_sector = ?")
+        params.append(filters["sector"])
+    if filters.get("min_confidence") is not None:
+        clauses.append("sg.confidence_score >= ?")
+        params.append(filters["min_confidence"])
+    return " AND ".join(clauses), params
+
+
+def count_signals(conn, filters):
+    where, params = _where(filters)
+    return conn.execute(f"SELECT COUNT(*) {JOINS} WHERE {where}", params).fetchone()[0]
+
+
+def signals_page(conn, filters, sort="date", descending=True, limit=100, offset=0):
+    """One page of GRID_COLUMNS + row_category matching `filters`.
+
+    `filters` keys (all optional): start, end, tiers, actions, signals, name,
+    sector, min_confidence.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort signals by {sort!r}")
+    where, params = _where(filters)
+    category = (
+        f"COALESCE(sg.row_category, {ROW_CATEGORY_SQL})"
+        if "row_category" in _signal_columns(conn)
+        else ROW_CATEGORY_SQL
+    )
+    direction = "DESC" if descending else "ASC"
+    columns = ", ".join(
+        "s.main_sector" if c == "main_sector" else f"sg.{c}" for c in GRID_COLUMNS
+    )
+    df = pd.read_sql(
+        f"""
+        SELECT {columns}, {category} AS row_category
+        {JOINS}
+        WHERE {where}
+        ORDER BY sg.{sort} {direction}, sg.date DESC, sg.name
+        LIMIT ? OFFSET ?
+        """,
+        conn,
+        params=params + [limit, offset],
+    )
+    return df
+
+
+def category_styles(df):
+    """Styler.apply(axis=None) callback: each row's ROW_STYLES entry, from row_category."""
+    css = df["row_category"].map(ROW_STYLES).fillna("")
+    return pd.DataFrame({col: css for col in df.columns}, index=df.index)
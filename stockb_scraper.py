@@ -1,7 +1,7 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
-import sqlite3
+from db import connect
 import time
 from datetime import date
 import re
@@ -61,7 +61,7 @@ def scrape_stockbubbles():
 
 
 def update_db(data):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
 
     today = date.today().isoformat()  # '2025-08-07' format
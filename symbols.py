@@ -0,0 +1,219 @@
+# symbols.py
+"""Symbol dimension table: one row per ticker.
+
+Company name, sectors, shares outstanding and tier flags live in `symbols`
+and equities rows only carry an integer symbol_id, so re-classifying a stock
+updates one row instead of every historical price row. The table is loaded
+from stocks_with_main_and_subsector.csv (written by parse_shares_pdf.py) and
+the preferred flag from stock_tiers.csv, so tier membership is edited in
+data rather than code. An
+insert trigger on equities gives every new ticker a symbols row and stamps
+its id, so the scrapers need no changes.
+
+    python symbols.py    # load the CSVs, assign ids, drop the old sector columns
+"""
+import sqlite3
+
+import pandas as pd
+
+from db import connect
+
+# === CONFIG ===
+DB_PATH = "data/ngx_equities.db"
+SYMBOLS_TABLE = "symbols"
+SYMBOLS_CSV = "stocks_with_main_and_subsector.csv"
+
+# symbol,tier rows; a "preferred" tier (roughly NGX30 plus a few liquid mid
+# caps) is what institutional_watch.py limits itself to
+TIERS_CSV = "stock_tiers.csv"
+PREFERRED_TIER = "preferred"
+
+ATTRIBUTE_COLUMNS = ["company_name", "main_sector", "sub_sector", "shares_outstanding"]
+LEGACY_COLUMNS = ["main_sector", "sub_sector"]  # formerly denormalized onto equities
+
+
+# === SCHEMA ===
+def _equities_columns(conn):
+    return [row[1] for row in conn.execute("PRAGMA table_info(equities)")]
+
+
+def ensure_symbols(conn):
+    """Create symbols, equities.symbol_id and the insert trigger; fill missing ids."""
+    with conn:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {SYMBOLS_TABLE} (
+                symbol_id INTEGER PRIMARY KEY,
+                symbol TEXT NOT NULL UNIQUE,
+                company_name TEXT,
+                main_sector TEXT,
+                sub_sector TEXT,
+                shares_outstanding REAL,
+                preferred INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        if "symbol_id" not in _equities_columns(conn):
+            conn.execute("ALTER TABLE equities ADD COLUMN symbol_id INTEGER")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_equities_symbol_date ON equities (symbol_id, date)"
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS equities_symbol_id
+            AFTER INSERT ON equities
+            WHEN NEW.symbol_id IS NULL
+            BEGIN
+                -- Not INSERT OR IGNORE: an outer INSERT OR REPLACE (scraper.py) would
+                -- override it and replace the existing symbols row with a new id
+                INSERT INTO {SYMBOLS_TABLE} (symbol)
+                SELECT UPPER(TRIM(NEW.name))
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {SYMBOLS_TABLE} WHERE symbol = UPPER(TRIM(NEW.name))
+                );
+                UPDATE equities
+                SET symbol_id = (
+                    SELECT symbol_id FROM {SYMBOLS_TABLE} WHERE symbol = UPPER(TRIM(NEW.name))
+                )
+                WHERE rowid = NEW.rowid;
+            END
+            """
+        )
+        # Rows written before the trigger existed
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO {SYMBOLS_TABLE} (symbol)
+            SELECT DISTINCT UPPER(TRIM(name)) FROM equities
+            WHERE symbol_id IS NULL AND name IS NOT NULL
+            """
+        )
+        conn.execute(
+            f"""
+            UPDATE equities SET symbol_id = s.symbol_id
+            FROM {SYMBOLS_TABLE} AS s
+            WHERE equities.symbol_id IS NULL AND s.symbol = UPPER(TRIM(equities.name))
+            """
+        )
+
+
+def drop_legacy_columns(conn):
+    """Move any sector values only equities knows about into symbols, then drop the columns."""
+    present = [c for c in LEGACY_COLUMNS if c in _equities_columns(conn)]
+    if not present:
+        return []
+    with conn:
+        for col in present:
+            conn.execute(
+                f"""
+                UPDATE {SYMBOLS_TABLE} SET {col} = latest.{col}
+                FROM (
+                    -- bare column: SQLite takes {col} from the MAX(date) row
+                    SELECT symbol_id, {col}, MAX(date) FROM equities
+                    WHERE {col} IS NOT NULL
+                    GROUP BY symbol_id
+                ) AS latest
+                WHERE {SYMBOLS_TABLE}.symbol_id = latest.symbol_id
+                  AND {SYMBOLS_TABLE}.{col} IS NULL
+                """
+            )
+    try:
+        for col in present:
+            conn.execute(f"ALTER TABLE equities DROP COLUMN {col}")
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Could not drop {col} from equities ({e}); it is no longer read.")
+    return present
+
+
+# === LOAD ===
+def load_tiers(conn, csv_path=TIERS_CSV):
+    """Set symbols.preferred from the tiers CSV; returns the preferred symbols.
+
+    Symbols the table does not know yet are added, so the flag is in place
+    when they first trade. Without the CSV the stored flags are left alone.
+    """
+    try:
+        tiers = pd.read_csv(csv_path)
+    except FileNotFoundError:
+        print(f"⚠️ {csv_path} not found; keeping the stored preferred flags")
+        return None
+    tiers["symbol"] = tiers["symbol"].astype(str).str.strip().str.upper()
+    preferred = sorted(set(tiers.loc[tiers["tier"].str.strip() == PREFERRED_TIER, "symbol"]))
+    with conn:
+        conn.executemany(
+            f"INSERT OR IGNORE INTO {SYMBOLS_TABLE} (symbol) VALUES (?)",
+            [(s,) for s in preferred],
+        )
+        conn.execute(
+            f"UPDATE {SYMBOLS_TABLE} SET preferred = symbol IN "
+            f"({', '.join('?' for _ in preferred)})",
+            preferred,
+        )
+    return preferred
+
+
+def load_symbols(conn, csv_path=SYMBOLS_CSV):
+    """Upsert symbols from the sector CSV. Returns the symbols whose sector changed."""
+    df = pd.read_csv(csv_path)
+    df["symbol"] = df["symbol"].astype(str).str.strip().str.upper()
+    df = df.rename(columns={"name": "company_name"}).drop_duplicates("symbol", keep="last")
+    df = df[["symbol"] + ATTRIBUTE_COLUMNS]
+
+    before = pd.read_sql(
+        f"SELECT symbol, main_sector, sub_sector FROM {SYMBOLS_TABLE}", conn
+    ).set_index("symbol")
+    rows = df.astype(object).where(df.notna(), None)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in ATTRIBUTE_COLUMNS)
+    with conn:
+        conn.executemany(
+            f"""
+            INSERT INTO {SYMBOLS_TABLE} (symbol, {', '.join(ATTRIBUTE_COLUMNS)})
+            VALUES ({', '.join('?' for _ in range(len(ATTRIBUTE_COLUMNS) + 1))})
+            ON CONFLICT(symbol) DO UPDATE SET {updates}
+            """,
+            rows.itertuples(index=False, name=None),
+        )
+
+    after = df.set_index("symbol")[["main_sector", "sub_sector"]]
+    old = before.reindex(after.index)
+    changed = (old.fillna("") != after.fillna("")).any(axis=1)
+    return sorted(after.index[changed])
+
+
+def sync_symbols(conn, csv_path=SYMBOLS_CSV):
+    """ensure + load + tiers + drop; returns (re-classified symbols, dropped equities columns)."""
+    ensure_symbols(conn)
+    changed = load_symbols(conn, csv_path)
+    load_tiers(conn)
+    dropped = drop_legacy_columns(conn)
+    return changed, dropped
+
+
+# === READERS ===
+def symbol_frame(conn, columns=None):
+    cols = ", ".join(["symbol_id", "symbol"] + list(columns or ATTRIBUTE_COLUMNS + ["preferred"]))
+    return pd.read_sql(f"SELECT {cols} FROM {SYMBOLS_TABLE}", conn)
+
+
+def attach_symbols(df, conn, columns=("main_sector", "sub_sector")):
+    """Add symbol attributes to an equities frame, matched on symbol_id."""
+    lookup = symbol_frame(conn, columns).set_index("symbol_id")
+    df = df.copy()
+    for col in columns:
+        df[col] = df["symbol_id"].map(lookup[col])
+    return df
+
+
+def preferred_symbols(conn):
+    return {
+        s for (s,) in conn.execute(f"SELECT symbol FROM {SYMBOLS_TABLE} WHERE preferred = 1")
+    }
+
+
+if __name__ == "__main__":
+    conn = connect(DB_PATH)
+    changed, dropped = sync_symbols(conn)
+    count = conn.execute(f"SELECT COUNT(*) FROM {SYMBOLS_TABLE}").fetchone()[0]
+    conn.close()
+    if dropped:
+        print(f"🧹 Dropped {', '.join(dropped)} from equities")
+    print(f"✅ {SYMBOLS_TABLE}: {count} symbols, {len(changed)} re-classified")
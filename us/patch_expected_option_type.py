@@ -1,7 +1,13 @@
 # patch_expected_option_type.py
+import os
 import sqlite3
+import sys
+
 import pandas as pd
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import bulk_update  # noqa: E402
+
 DB_PATH = "data/us_equities.db"
 conn = sqlite3.connect(DB_PATH)
 df = pd.read_sql("SELECT * FROM signals_us", conn)
@@ -19,14 +25,6 @@ def infer_option_type(row):
 df["expected_option_type"] = df.apply(infer_option_type, axis=1)
 
 # === Write back to DB
-cursor = conn.cursor()
-for _, row in df.iterrows():
-    cursor.execute("""
-        UPDATE signals_us
-        SET expected_option_type = ?
-        WHERE name = ? AND date = ?
-    """, (row["expected_option_type"], row["name"], row["date"]))
-
-conn.commit()
+bulk_update(conn, "signals_us", df, ["name", "date"], ["expected_option_type"])
 conn.close()
 print("✅ expected_option_type updated for all rows.")
@@ -1,9 +1,11 @@
-import sqlite3
+from db import connect
 import pandas as pd
+from symbols import ensure_symbols
 
 
 def compute_accumulation_signals_3days(db_path="data/ngx_equities.db"):
-    conn = sqlite3.connect(db_path)
+    conn = connect(db_path)
+    ensure_symbols(conn)
 
     # Step 1: Get last 3 available trading dates (non-weekend safe)
     last_3_dates_query = """
@@ -19,9 +21,10 @@ def compute_accumulation_signals_3days(db_path="data/ngx_equities.db"):
     # Step 2: Load relevant data for those 3 dates
     placeholders = ",".join("?" for _ in last_3_dates)
     data_query = f"""
-        SELECT date, name, volume, value, trades, close AS price, sub_sector
-        FROM equities
-        WHERE date IN ({placeholders})
+        SELECT e.date, e.name, e.volume, e.value, e.trades, e.close AS price, s.sub_sector
+        FROM equities e
+        LEFT JOIN symbols s ON s.symbol_id = e.symbol_id
+        WHERE e.date IN ({placeholders})
     """
     df = pd.read_sql_query(data_query, conn, params=last_3_dates, parse_dates=["date"])
 
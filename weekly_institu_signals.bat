@@ -33,35 +33,8 @@ echo Running task...
 cd C:\Users\joyag\Projects\ngx_tracker
 :: python your_script.py
 
-echo running scraper
-python scraper.py
-
-echo running analyser
-python analyser.py
-
-echo 🕵️ Running Institutional Watch...
-python institutional_watch.py
-
-echo 🔍 Running Weekly Trade Intelligence..30
-python weekly_intel.py
-
-echo Running Weekly 10
-python weekly_intel_short.py
-
-echo Running Weekly comparator
-python intel_comparator.py
-
-echo updating sector
-python csv_db.py
-
-echo 🔍 Running sector watch
-python sector_institutional_watch.py
-
-echo 🔍 Running sector tracker
-python sector_tracker.py
-
-echo 🔍 Running volume ranking
-python volume_ranking.py
+echo 🔍 Running weekly pipeline (scraper, analyser, institutional watch, weekly intel, comparator, sectors, volume ranking)
+python pipeline.py weekly
 
 
 